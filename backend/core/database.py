@@ -0,0 +1,76 @@
+"""
+Database configuration, selected with DB_ENGINE.
+
+sqlite (default): the db.sqlite3 file, tuned for background workers writing
+while the API reads. Every connection switches to WAL (readers no longer
+block the writer), synchronous=NORMAL (no fsync per commit, still safe in
+WAL mode), a busy timeout instead of immediate "database is locked" errors,
+and memory-mapped reads. Transactions start IMMEDIATE, taking the write lock
+up front, because a deferred transaction that later upgrades to a writer
+fails at once when another writer holds the lock, whatever the busy timeout.
+
+postgres: Django's psycopg 3 connection pool (DB_POOL_MIN_SIZE..
+DB_POOL_MAX_SIZE connections per process) or, with DB_POOL=False,
+persistent connections kept for DB_CONN_MAX_AGE seconds. Requires
+`pip install "psycopg[binary,pool]"`.
+
+`manage.py benchmark_db` compares the write throughput of the modes.
+"""
+
+import os
+from django.core.exceptions import ImproperlyConfigured
+
+
+def sqlite_config(path, tuned=True):
+    """DATABASES entry for a SQLite file; tuned=False gives Django's defaults (rollback journal)."""
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+    }
+    if tuned:
+        busy_timeout = float(os.getenv('SQLITE_BUSY_TIMEOUT_SECONDS', 20))
+        config['OPTIONS'] = {
+            'timeout': busy_timeout,
+            'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            'init_command': ';'.join([
+                'PRAGMA journal_mode=WAL',
+                'PRAGMA synchronous=NORMAL',
+                f'PRAGMA busy_timeout={int(busy_timeout * 1000)}',
+                f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+            ]),
+        }
+    return config
+
+
+def postgres_config():
+    """DATABASES entry for PostgreSQL from the DB_* environment variables."""
+    pooled = os.getenv('DB_POOL', 'True') == 'True'
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('DB_NAME', 'hr_system'),
+        'USER': os.getenv('DB_USER', 'postgres'),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+        # A pooled connection goes back to the pool after each request instead
+        # (Django rejects CONN_MAX_AGE together with the pool)
+        'CONN_MAX_AGE': 0 if pooled else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {},
+    }
+    if pooled:
+        config['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT_SECONDS', 10)),
+        }
+    return config
+
+
+def database_config(base_dir):
+    engine = os.getenv('DB_ENGINE', 'sqlite').lower()
+    if engine in ('postgres', 'postgresql'):
+        return postgres_config()
+    if engine != 'sqlite':
+        raise ImproperlyConfigured(f"DB_ENGINE must be 'sqlite' or 'postgres', not {engine!r}")
+    return sqlite_config(os.getenv('SQLITE_PATH', str(base_dir / 'db.sqlite3')), tuned=os.getenv('SQLITE_TUNED', 'True') == 'True')
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from .database import database_config
 
 # Load environment variables from .env file
 load_dotenv()
@@ -34,6 +35,109 @@ ALLOWED_HOSTS = ['*'] # Allow all for dev
 
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
 
+# Outgoing email. The console backend prints messages; use
+# django.core.mail.backends.smtp.EmailBackend to send through EMAIL_HOST
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 30))
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER or 'webmaster@localhost')
+
+# Email dispatcher (see hr_system/email_dispatch.py): emails per batch over one
+# connection, send rate shared by all workers, and retries with backoff
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+EMAIL_SEND_RATE_PER_MINUTE = int(os.getenv('EMAIL_SEND_RATE_PER_MINUTE', 60))
+EMAIL_MAX_RETRIES = int(os.getenv('EMAIL_MAX_RETRIES', 5))
+EMAIL_RETRY_BACKOFF_SECONDS = int(os.getenv('EMAIL_RETRY_BACKOFF_SECONDS', 60))
+
+# Generate resume metadata, oral and coding questions in one Gemini call per
+# candidate instead of three. The separate calls remain the fallback.
+GEMINI_COMBINED_GENERATION = os.getenv('GEMINI_COMBINED_GENERATION', 'True') == 'True'
+
+# Size limit for the shared parsed-resume cache (least recently used entries are evicted)
+RESUME_CACHE_MAX_BYTES = int(os.getenv('RESUME_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Resumes longer than this are cut down to their most job-relevant sections
+# before being sent to Gemini (see hr_system/resume_compression.py)
+RESUME_PROMPT_TOKEN_BUDGET = int(os.getenv('RESUME_PROMPT_TOKEN_BUDGET', 1500))
+
+# PDF text extraction runs in a process pool (see hr_system/pdf_extraction.py)
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', 2))
+PDF_EXTRACTION_DEADLINE_SECONDS = float(os.getenv('PDF_EXTRACTION_DEADLINE_SECONDS', 30))
+PDF_EXTRACTION_MAX_PAGES = int(os.getenv('PDF_EXTRACTION_MAX_PAGES', 50))
+PDF_EXTRACTION_PAGES_PER_CHUNK = int(os.getenv('PDF_EXTRACTION_PAGES_PER_CHUNK', 10))
+PDF_EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv('PDF_EXTRACTION_MEMORY_LIMIT_MB', 1024))
+PDF_EXTRACTION_TASKS_PER_CHILD = int(os.getenv('PDF_EXTRACTION_TASKS_PER_CHILD', 50))
+
+# Resume link fetcher (see hr_system/resume_fetcher.py)
+RESUME_FETCH_CACHE_DIR = os.getenv('RESUME_FETCH_CACHE_DIR', str(BASE_DIR / 'cache' / 'resume_fetch'))
+RESUME_FETCH_MAX_BYTES = int(os.getenv('RESUME_FETCH_MAX_BYTES', 5 * 1024 * 1024))
+RESUME_FETCH_TIMEOUT_SECONDS = float(os.getenv('RESUME_FETCH_TIMEOUT_SECONDS', 15))
+RESUME_FETCH_DEADLINE_SECONDS = float(os.getenv('RESUME_FETCH_DEADLINE_SECONDS', 60))
+RESUME_FETCH_CONCURRENCY = int(os.getenv('RESUME_FETCH_CONCURRENCY', 32))
+RESUME_FETCH_PER_HOST_LIMIT = int(os.getenv('RESUME_FETCH_PER_HOST_LIMIT', 4))
+RESUME_FETCH_REVALIDATE_SECONDS = int(os.getenv('RESUME_FETCH_REVALIDATE_SECONDS', 3600))
+RESUME_FETCH_CACHE_MAX_BYTES = int(os.getenv('RESUME_FETCH_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+RESUME_FETCH_CACHE_MAX_AGE_SECONDS = int(os.getenv('RESUME_FETCH_CACHE_MAX_AGE_SECONDS', 30 * 24 * 3600))
+
+# Gemini response cache (see hr_system/llm_cache.py): an in-process LRU in front
+# of a database table. Entries older than the TTL are ignored and pruned.
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True') == 'True'
+LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 256))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 20000))
+
+# Shared Gemini rate limit across all worker processes (see hr_system/rate_limiter.py).
+# Calls wait for capacity; 429 responses halve the effective rate until it recovers.
+GEMINI_RPM_LIMIT = int(os.getenv('GEMINI_RPM_LIMIT', 60))
+GEMINI_TPM_LIMIT = int(os.getenv('GEMINI_TPM_LIMIT', 1000000))
+GEMINI_OUTPUT_TOKEN_ESTIMATE = int(os.getenv('GEMINI_OUTPUT_TOKEN_ESTIMATE', 2048))
+GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv('GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS', 600))
+
+# Per-job JD prefix shared by every candidate's prompt (see hr_system/job_context.py).
+# Prefixes above Gemini's minimum cacheable size are uploaded once as cached content.
+GEMINI_CONTEXT_CACHING = os.getenv('GEMINI_CONTEXT_CACHING', 'True') == 'True'
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL_SECONDS', 3600))
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv('GEMINI_CONTEXT_CACHE_MIN_TOKENS', 1024))
+
+# Requests in flight for batch generation (manage.py generate_questions)
+GEMINI_BATCH_CONCURRENCY = int(os.getenv('GEMINI_BATCH_CONCURRENCY', 50))
+
+# Latency SLA for the pipeline's question generation. When Gemini has not
+# answered within this many seconds the session is filled from the question
+# bank and templates so the invitation goes out, and personalized questions
+# replace them QUESTION_UPGRADE_DELAY_SECONDS later unless the candidate has
+# opened the link. 0 disables the deadline (see hr_system/question_bank.py)
+QUESTION_GENERATION_DEADLINE_SECONDS = float(os.getenv('QUESTION_GENERATION_DEADLINE_SECONDS', 0))
+QUESTION_UPGRADE_DELAY_SECONDS = int(os.getenv('QUESTION_UPGRADE_DELAY_SECONDS', 30))
+
+# Candidates per bulk processing task, and per WriteBatch flush of cheap
+# writes such as bulk-created sessions (see hr_system/persistence.py)
+PIPELINE_BATCH_SIZE = int(os.getenv('PIPELINE_BATCH_SIZE', 20))
+
+# Skills taxonomy used to detect skills in resumes (see hr_system/skill_matcher.py)
+SKILL_TAXONOMY_PATH = os.getenv('SKILL_TAXONOMY_PATH', str(BASE_DIR / 'hr_system' / 'data' / 'skills.json'))
+
+# `manage.py run_workers` pool (see hr_system/workers.py): worker processes, tasks
+# claimed per batch, idle poll interval and seconds between queue reports
+TASK_WORKER_PROCESSES = int(os.getenv('TASK_WORKER_PROCESSES', 4))
+TASK_WORKER_BATCH_SIZE = int(os.getenv('TASK_WORKER_BATCH_SIZE', 5))
+TASK_WORKER_POLL_SECONDS = float(os.getenv('TASK_WORKER_POLL_SECONDS', 1))
+TASK_QUEUE_REPORT_SECONDS = float(os.getenv('TASK_QUEUE_REPORT_SECONDS', 30))
+
+# Server-Sent Events for the status board (see hr_system/job_events.py): how often
+# a stream polls for new events, sends a keepalive comment and is closed for
+# the browser to reconnect, how long events are kept for resuming, and how
+# long a stream token (issued by /jobs/{id}/events/token/) can open a stream
+SSE_POLL_SECONDS = float(os.getenv('SSE_POLL_SECONDS', 1))
+SSE_KEEPALIVE_SECONDS = int(os.getenv('SSE_KEEPALIVE_SECONDS', 15))
+SSE_STREAM_SECONDS = int(os.getenv('SSE_STREAM_SECONDS', 300))
+SSE_EVENT_RETENTION_HOURS = int(os.getenv('SSE_EVENT_RETENTION_HOURS', 24))
+SSE_TOKEN_MAX_AGE_SECONDS = int(os.getenv('SSE_TOKEN_MAX_AGE_SECONDS', 60))
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://localhost:3000",
@@ -90,11 +194,9 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_ENGINE=sqlite (WAL-tuned db.sqlite3, the default) or postgres (pooled); see core/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR)
 }
 
 
@@ -143,6 +245,22 @@ AUTH_USER_MODEL = 'hr_system.HRUser'
 
 CORS_ALLOW_ALL_ORIGINS = True # For development
 
+# hr_system error paths (failed stages, unsaved writes, Gemini fallbacks) are
+# logged to the console; progress messages are still printed
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s [%(levelname)s] %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'hr_system': {'handlers': ['console'], 'level': os.getenv('HR_SYSTEM_LOG_LEVEL', 'INFO')},
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
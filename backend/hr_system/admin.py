@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import HRUser, Job, Candidate, InterviewSession, Question, Answer, Evaluation, CheatingLog, EmailLog, CodingQuestionBank
+from .models import HRUser, Job, Candidate, InterviewSession, Question, Answer, Evaluation, CheatingLog, EmailLog, CodingQuestionBank, CandidateImport, CandidateProcessing, CacheCounter, ResumeCacheEntry, LLMCacheEntry, RateLimitBucket, Skill, JobStats, CandidateEvent
 
 admin.site.register(HRUser, UserAdmin)
 admin.site.register(Job)
@@ -12,3 +12,12 @@ admin.site.register(Evaluation)
 admin.site.register(CheatingLog)
 admin.site.register(EmailLog)
 admin.site.register(CodingQuestionBank)
+admin.site.register(CandidateImport)
+admin.site.register(CandidateProcessing)
+admin.site.register(CacheCounter)
+admin.site.register(ResumeCacheEntry)
+admin.site.register(LLMCacheEntry)
+admin.site.register(RateLimitBucket)
+admin.site.register(Skill)
+admin.site.register(JobStats)
+admin.site.register(CandidateEvent)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HrSystemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hr_system'
+
+    def ready(self):
+        from . import signals  # noqa: F401
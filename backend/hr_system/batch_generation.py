@@ -0,0 +1,177 @@
+"""
+Concurrent question generation for many candidates from one process.
+
+The per-candidate pipeline makes one blocking Gemini call at a time per
+worker, so throughput is workers / LLM latency. generate_for_candidates()
+instead drives the async generator with asyncio.gather, keeping up to
+`concurrency` requests in flight (still within the shared rate limit), and
+saves each batch's questions with bulk inserts. The generate_questions
+management command runs it over every candidate of a job that has a parsed
+resume but no questions yet.
+
+Questions are saved through persistence.CandidateWrites with the
+candidate's CandidateProcessing row locked. A checkpoint at SESSION or
+QUESTIONS moves on to EMAIL and the invitation is scheduled, leaving any
+queued task for the earlier stage stale. A candidate whose pipeline is
+RUNNING is skipped, since that run is generating its own questions. An
+earlier checkpoint (METADATA) is left alone; when the pipeline gets to
+SESSION and QUESTIONS, it finds the session and questions already there.
+"""
+
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from . import persistence
+from .gemini_service import get_gemini_generator
+from .models import Candidate, CandidateProcessing, InterviewSession, Question, Resume
+from .persistence import CandidateWrites, WriteBatch
+from .resume_compression import compress_resume
+from .tasks import build_oral_questions, build_coding_questions, run_pipeline_stage_task
+from .workers import task_options
+
+# Checkpoints that generated questions complete: the session exists, so the invitation is next
+STAGES_BEFORE_EMAIL = ('SESSION', 'QUESTIONS')
+
+
+def prepare_job_sessions(job):
+    """
+    Creates missing sessions for the job's parsed candidates and returns
+    (sessions still without questions, number of candidates not parsed yet).
+    Sessions come with candidate, job and resume loaded so they can be used
+    from async code.
+    """
+    # Candidates whose pipeline is running make their own session and questions
+    parsed = Candidate.objects.filter(job=job, resume_data__isnull=False).exclude(processing__status='RUNNING')
+    batch = WriteBatch()
+    for candidate in parsed.filter(session__isnull=True).select_related('job'):
+        writes = CandidateWrites(candidate)
+        writes.ensure_session()
+        batch.add(writes)
+    batch.flush()
+
+    sessions = list(
+        InterviewSession.objects
+        .filter(candidate__in=parsed, questions__isnull=True)
+        .select_related('candidate__job', 'candidate__resume_data')
+        .order_by('candidate_id')
+    )
+    # Resumes parsed before compression existed get their prompt form now
+    stale = [s.candidate.resume_data for s in sessions if not s.candidate.resume_data.compressed_text]
+    for resume in stale:
+        resume.compressed_text = compress_resume(resume.raw_text, job.required_skills, job.description)
+    Resume.objects.bulk_update(stale, ['compressed_text'], batch_size=500)
+
+    unparsed = Candidate.objects.filter(job=job, resume_data__isnull=True).count()
+    return sessions, unparsed
+
+
+def _save_batch(results):
+    """
+    Saves generated questions with each candidate's checkpoint, skipping
+    question types a session gained meanwhile and pipelines that started
+    running. Returns the number of questions saved.
+    """
+    session_ids = [session.id for session, _, _ in results]
+    with transaction.atomic():
+        checkpoints = {
+            processing.candidate_id: processing
+            for processing in CandidateProcessing.objects.select_for_update().select_related('candidate__job')
+            .filter(candidate__session__id__in=session_ids)
+        }
+        existing = set(
+            Question.objects.filter(session_id__in=session_ids)
+            .values_list('session_id', 'question_type').distinct()
+        )
+        generated_by = 'gemini-batch' if get_gemini_generator().is_available() else 'fallback'
+        batch = []
+        for session, oral, coding in results:
+            processing = checkpoints.get(session.candidate_id)
+            if processing is not None and processing.status == 'RUNNING':
+                continue
+            if processing is not None and processing.pipeline_stage not in STAGES_BEFORE_EMAIL:
+                # Saved only when the checkpoint moves
+                processing = None
+            writes = CandidateWrites(session.candidate, processing, session=session)
+            if (session.id, 'ORAL') not in existing:
+                writes.add_questions(build_oral_questions(session, oral, generated_by))
+            if (session.id, 'CODING') not in existing:
+                writes.add_questions(build_coding_questions(session, coding, generated_by))
+            if processing is not None:
+                processing.pipeline_stage = 'EMAIL'
+                processing.status = 'PENDING'
+                processing.attempts = 0
+                processing.last_error = None
+                processing.failed_at = None
+                processing.generated_questions = {}
+                writes.defer(run_pipeline_stage_task, session.candidate_id, 'EMAIL', **task_options(processing))
+            batch.append(writes)
+        persistence.flush(batch)
+    return sum(len(writes.questions) for writes in batch)
+
+
+async def generate_for_candidates(batch, concurrency=None, use_cache=True):
+    """
+    Generates oral and coding questions for a batch of InterviewSessions (as
+    returned by prepare_job_sessions) with at most `concurrency` Gemini
+    requests in flight, then saves them in one transaction.
+
+    Gemini errors are not replaced by fallback questions: the candidate is
+    reported under "failed" and its session keeps no questions, so the next
+    run picks it up again.
+
+    Returns {"generated": [candidate ids], "failed": {candidate id: error},
+    "questions": number of questions saved}.
+    """
+    concurrency = concurrency or settings.GEMINI_BATCH_CONCURRENCY
+    semaphore = asyncio.BoundedSemaphore(concurrency)
+    generator = get_gemini_generator()
+
+    async def limited(coro):
+        async with semaphore:
+            return await coro
+
+    async def generate(session):
+        candidate = session.candidate
+        job = candidate.job
+        resume_text = candidate.resume_data.prompt_text
+        oral, coding = await asyncio.gather(
+            limited(generator.generate_oral_questions_async(
+                jd_text=job.description,
+                resume_text=resume_text,
+                candidate_name=candidate.name,
+                experience_level=job.experience_level,
+                required_skills=job.required_skills,
+                num_questions=session.oral_question_count,
+                allow_fallback=False,
+                use_cache=use_cache,
+                job_id=job.id
+            )),
+            limited(generator.generate_coding_questions_async(
+                jd_text=job.description,
+                resume_text=resume_text,
+                experience_level=job.experience_level,
+                required_skills=job.required_skills,
+                num_questions=session.coding_question_count,
+                allow_fallback=False,
+                use_cache=use_cache,
+                job_id=job.id
+            ))
+        )
+        return session, oral, coding
+
+    outcomes = await asyncio.gather(*(generate(session) for session in batch), return_exceptions=True)
+
+    results, failed = [], {}
+    for session, outcome in zip(batch, outcomes):
+        if isinstance(outcome, BaseException):
+            failed[session.candidate_id] = f"{type(outcome).__name__}: {outcome}"
+        else:
+            results.append(outcome)
+
+    saved = await sync_to_async(_save_batch)(results) if results else 0
+    return {
+        "generated": [session.candidate_id for session, _, _ in results],
+        "failed": failed,
+        "questions": saved,
+    }
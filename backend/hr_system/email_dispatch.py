@@ -0,0 +1,170 @@
+"""
+Outgoing email dispatcher.
+
+Emails are queued as PENDING EmailLog rows and sent by dispatch_emails_task,
+not by the code that queues them. The dispatcher drains due rows in batches
+of EMAIL_BATCH_SIZE over one SMTP connection, opened once per run and
+reused for every message, instead of a connection per email.
+
+A message the server refuses is retried with exponential backoff
+(EMAIL_RETRY_BACKOFF_SECONDS, doubling per retry_count, capped at an hour)
+through next_attempt_at, and marked FAILED after EMAIL_MAX_RETRIES.
+
+Sending is shaped to EMAIL_SEND_RATE_PER_MINUTE by a RateLimiter bucket
+shared by all workers (see rate_limiter.py), so invitations for a large
+roster go out over time instead of starting every interview at once.
+When the bucket is empty the run ends and the task is scheduled again for
+when capacity is back.
+
+Rows are claimed by pushing their next_attempt_at EMAIL_CLAIM_SECONDS into
+the future, so two dispatchers never send the same email; a dispatcher that
+dies mid-batch leaves its rows to be retried once the claim runs out. Send
+capacity is reserved for the rows actually claimed, and a claim the bucket
+cannot cover yet is handed back.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Min
+from django.utils import timezone
+from .job_events import interview_url
+from .models import EmailLog
+from .rate_limiter import RateLimiter
+
+BUCKET_NAME = 'email'
+EMAIL_CLAIM_SECONDS = 300
+MAX_BACKOFF_SECONDS = 3600
+
+
+def retry_delay(retry_count):
+    """Seconds before the next attempt of an email that has failed `retry_count` times."""
+    return min(settings.EMAIL_RETRY_BACKOFF_SECONDS * 2 ** (retry_count - 1), MAX_BACKOFF_SECONDS)
+
+
+def queue_email(candidate, subject, body):
+    """Queues an email to a candidate and makes sure the dispatcher will run."""
+    email_log = EmailLog.objects.create(candidate=candidate, subject=subject, body=body)
+    schedule_dispatch()
+    return email_log
+
+
+def queue_invitation(candidate, token):
+    """Queues a candidate's interview invitation."""
+    return queue_email(
+        candidate,
+        f"Interview Invitation for {candidate.job.title}",
+        f"Hello {candidate.name},\n\nYou have been invited for an initial screening interview.\n\n"
+        f"Please use the following link to start your interview: {interview_url(token)}\n\n"
+        f"This link is for single-use and will expire in 7 days."
+    )
+
+
+def schedule_dispatch(delay=0):
+    """
+    Schedules dispatch_emails_task in `delay` seconds, or moves a waiting one
+    forward to then; one waiting dispatcher is enough.
+    """
+    from background_task.models import Task
+    from .tasks import dispatch_emails_task
+
+    run_at = timezone.now() + timedelta(seconds=delay)
+    waiting = Task.objects.filter(task_name=dispatch_emails_task.name, locked_by=None, failed_at=None)
+    if waiting.exists():
+        waiting.filter(run_at__gt=run_at).update(run_at=run_at)
+    else:
+        dispatch_emails_task(schedule=run_at)
+
+
+def _due():
+    return EmailLog.objects.filter(status='PENDING', next_attempt_at__lte=timezone.now())
+
+
+def _claim(email_ids):
+    """Claims the still due emails among email_ids and returns them."""
+    lease = timezone.now() + timedelta(seconds=EMAIL_CLAIM_SECONDS)
+    _due().filter(id__in=email_ids).update(next_attempt_at=lease)
+    return list(
+        EmailLog.objects.select_related('candidate')
+        .filter(id__in=email_ids, status='PENDING', next_attempt_at=lease).order_by('id')
+    )
+
+
+def _release(batch, due_at):
+    """Hands claimed emails back, due again when they were before the claim."""
+    for email_log in batch:
+        email_log.next_attempt_at = due_at[email_log.id]
+    EmailLog.objects.bulk_update(batch, ['next_attempt_at'])
+
+
+def _send_batch(connection, batch):
+    """Sends a claimed batch over the open connection and records each outcome."""
+    sent, failed = [], []
+    for email_log in batch:
+        message = EmailMessage(
+            email_log.subject, email_log.body, settings.DEFAULT_FROM_EMAIL, [email_log.candidate.email],
+            connection=connection
+        )
+        try:
+            # Connects on the first message and after a failure, otherwise a no-op
+            connection.open()
+            if connection.send_messages([message]) != 1:
+                raise RuntimeError("Message was not accepted")
+        except Exception as e:
+            email_log.last_error = f"{type(e).__name__}: {e}"
+            failed.append(email_log)
+            # Start the next message on a fresh connection
+            connection.close()
+        else:
+            sent.append(email_log.id)
+
+    now = timezone.now()
+    EmailLog.objects.filter(id__in=sent).update(status='SENT', sent_at=now, last_error=None)
+    for email_log in failed:
+        email_log.retry_count += 1
+        if email_log.retry_count >= settings.EMAIL_MAX_RETRIES:
+            email_log.status = 'FAILED'
+        else:
+            email_log.next_attempt_at = now + timedelta(seconds=retry_delay(email_log.retry_count))
+    EmailLog.objects.bulk_update(failed, ['status', 'retry_count', 'next_attempt_at', 'last_error'])
+    return len(sent), len(failed)
+
+
+def dispatch():
+    """
+    Sends due emails until none are left or the send rate is used up.
+    Returns (sent, failed, seconds until the dispatcher should run again or
+    None when nothing is pending).
+    """
+    rate = settings.EMAIL_SEND_RATE_PER_MINUTE
+    limiter = RateLimiter(BUCKET_NAME, rpm_limit=rate, tpm_limit=rate, max_wait=0)
+    # Each batch takes one token per email, and the bucket holds a minute of sending
+    batch_size = max(1, min(settings.EMAIL_BATCH_SIZE, rate))
+    sent = failed = 0
+    connection = None
+    try:
+        while True:
+            due = dict(_due().order_by('next_attempt_at', 'id').values_list('id', 'next_attempt_at')[:batch_size])
+            if not due:
+                break
+            # Claim first so only emails this run will really send take tokens
+            batch = _claim(list(due))
+            if not batch:
+                continue
+            wait = limiter.reserve(len(batch))
+            if wait > 0:
+                _release(batch, due)
+                return sent, failed, wait
+            if connection is None:
+                connection = get_connection(fail_silently=False)
+            batch_sent, batch_failed = _send_batch(connection, batch)
+            sent += batch_sent
+            failed += batch_failed
+    finally:
+        if connection is not None:
+            connection.close()
+
+    next_due = EmailLog.objects.filter(status='PENDING').aggregate(at=Min('next_attempt_at'))['at']
+    if next_due is None:
+        return sent, failed, None
+    return sent, failed, max((next_due - timezone.now()).total_seconds(), 0)
@@ -7,8 +7,11 @@ interview questions based on candidate resumes and job descriptions.
 
 import os
 import json
+import logging
 import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
 
 
 class GeminiQuestionGenerator:
@@ -17,34 +20,128 @@ class GeminiQuestionGenerator:
     Each candidate receives unique questions based on their resume and the JD.
     """
     
-    def __init__(self):
-     self.api_key = os.environ.get("GEMINI_API_KEY")
-
-
-     
-     if self.api_key:
-        # Configure Gemini
-        genai.configure(api_key=self.api_key)
+    MODEL_NAME = 'gemini-2.5-flash'
 
-        # 👉 USE NEW MODEL
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+    def __init__(self):
+        self.api_key = os.environ.get("GEMINI_API_KEY")
+        # Passed to every generate_content call and part of the response cache key
+        self.generation_config = {}
+        
+        if self.api_key:
+            # Configure Gemini
+            genai.configure(api_key=self.api_key)
 
-    else:
-        self.model = None
+            # 👉 USE NEW MODEL
+            self.model = genai.GenerativeModel(self.MODEL_NAME)
+        else:
+            self.model = None
 
     def test_connection(self):
-    try:
-        r = self.model.generate_content("hello")
-        return True, r.text
-    except Exception as e:
-        return False, str(e)
-
-
+        from .rate_limiter import get_rate_limiter
+        try:
+            r = get_rate_limiter().call(lambda: self.model.generate_content("hello"), "hello")
+            return True, r.text
+        except Exception as e:
+            return False, str(e)
 
     def is_available(self) -> bool:
         """Check if Gemini API is configured and available"""
         return self.model is not None
     
+    def _generate_json(self, prompt: str, is_valid=None, use_cache: bool = True, context=None) -> Any:
+        """
+        Send a prompt to Gemini and parse the JSON reply, going through the
+        response cache (see llm_cache.py) and, on a miss, the shared rate
+        limiter (see rate_limiter.py). Only replies that parse and pass
+        is_valid are cached, so a malformed answer is not replayed on retry.
+        use_cache=False skips the lookup and overwrites any cached reply.
+        
+        With a job context (see job_context.py), `prompt` is only the
+        per-candidate request; the job prefix comes from the context's
+        cached-content handle or is prepended inline.
+        """
+        from django.conf import settings
+        from .llm_cache import get_llm_cache, make_key
+        from .rate_limiter import get_rate_limiter
+        
+        full_prompt = context.full_prompt(prompt) if context else prompt
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        cache = get_llm_cache()
+        key = make_key(self.MODEL_NAME, full_prompt, self.generation_config)
+        
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return self._parse_json_response(cached)
+        
+        response = get_rate_limiter().call(lambda: self._send(prompt, context), full_prompt)
+        data = self._parse_json_response(response.text)
+        
+        if settings.LLM_CACHE_ENABLED and (is_valid is None or is_valid(data)):
+            cache.set(key, self.MODEL_NAME, response.text)
+        return data
+    
+    def _send(self, prompt: str, context=None):
+        """One generate_content call, against the job's cached context when it has one"""
+        from .rate_limiter import is_rate_limit_error
+        
+        cached_model = context.cached_model() if context else None
+        if cached_model is not None:
+            try:
+                return cached_model.generate_content(prompt, generation_config=self.generation_config or None)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    raise
+                # Handle expired or deleted server-side: fall back to the inline prefix
+                logger.warning("Cached job context failed, sending the full prompt: %s: %s", type(e).__name__, e)
+                context.drop_cache()
+        
+        full_prompt = context.full_prompt(prompt) if context else prompt
+        return self.model.generate_content(full_prompt, generation_config=self.generation_config or None)
+    
+    async def _generate_json_async(self, prompt: str, is_valid=None, use_cache: bool = True, context=None) -> Any:
+        """Async counterpart of _generate_json, using the SDK's generate_content_async."""
+        from asgiref.sync import sync_to_async
+        from django.conf import settings
+        from .llm_cache import get_llm_cache, make_key
+        from .rate_limiter import get_rate_limiter
+        
+        full_prompt = context.full_prompt(prompt) if context else prompt
+        use_cache = use_cache and settings.LLM_CACHE_ENABLED
+        cache = get_llm_cache()
+        key = make_key(self.MODEL_NAME, full_prompt, self.generation_config)
+        
+        if use_cache:
+            cached = await sync_to_async(cache.get)(key)
+            if cached is not None:
+                return self._parse_json_response(cached)
+        
+        response = await get_rate_limiter().call_async(lambda: self._send_async(prompt, context), full_prompt)
+        data = self._parse_json_response(response.text)
+        
+        if settings.LLM_CACHE_ENABLED and (is_valid is None or is_valid(data)):
+            await sync_to_async(cache.set)(key, self.MODEL_NAME, response.text)
+        return data
+    
+    async def _send_async(self, prompt: str, context=None):
+        """Async counterpart of _send"""
+        from asgiref.sync import sync_to_async
+        from .rate_limiter import is_rate_limit_error
+        
+        # Creating the handle is a blocking API call; keep it off the event loop
+        cached_model = await sync_to_async(context.cached_model, thread_sensitive=False)() if context else None
+        if cached_model is not None:
+            try:
+                return await cached_model.generate_content_async(prompt, generation_config=self.generation_config or None)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    raise
+                logger.warning("Cached job context failed, sending the full prompt: %s: %s", type(e).__name__, e)
+                context.drop_cache()
+        
+        full_prompt = context.full_prompt(prompt) if context else prompt
+        return await self.model.generate_content_async(full_prompt, generation_config=self.generation_config or None)
+    
     def generate_oral_questions(
         self,
         jd_text: str,
@@ -52,7 +149,10 @@ class GeminiQuestionGenerator:
         candidate_name: str,
         experience_level: str,
         required_skills: str,
-        num_questions: int
+        num_questions: int,
+        allow_fallback: bool = True,
+        use_cache: bool = True,
+        job_id: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Generate personalized oral interview questions.
@@ -64,6 +164,12 @@ class GeminiQuestionGenerator:
             experience_level: Expected experience level from JD
             required_skills: Required skills from JD
             num_questions: Number of questions to generate
+            allow_fallback: If False, Gemini errors are raised instead of
+                falling back to template questions (so the caller can retry)
+            use_cache: If False, ask Gemini for fresh questions instead of
+                reusing a cached response for the same prompt
+            job_id: The Job the JD fields belong to, so its shared prompt
+                context is dropped when the Job is edited
             
         Returns:
             List of question dictionaries with structure:
@@ -75,72 +181,32 @@ class GeminiQuestionGenerator:
             }
         """
         if not self.is_available():
-            return self._fallback_oral_questions(
+            return self.fallback_oral_questions(
                 candidate_name, resume_text, required_skills, num_questions
             )
         
-        prompt = f"""You are an expert technical interviewer conducting a personalized interview.
-
-CANDIDATE INFORMATION:
-Name: {candidate_name}
-Experience Level Expected: {experience_level}
-
-JOB DESCRIPTION:
-{jd_text}
-
-REQUIRED SKILLS FOR THIS ROLE:
-{required_skills}
-
-CANDIDATE'S RESUME:
-{resume_text}
-
-TASK:
-Generate exactly {num_questions} personalized, open-ended oral interview questions that:
-
-1. **Are Based on Real Resume Projects**: Reference specific projects, technologies, or achievements mentioned in the candidate's resume
-2. **Test JD Required Skills**: Focus on skills listed in the job description that the candidate claims to have
-3. **Match Experience Level**: Difficulty should match the expected experience level ({experience_level})
-4. **Avoid Yes/No Questions**: All questions must be open-ended and require detailed explanations
-5. **Are Role-Relevant**: Questions must be directly relevant to the job responsibilities
-6. **Test Depth**: Go beyond surface-level knowledge to assess true understanding
-
-RULES:
-- NO generic template questions
-- Each question MUST reference something specific from the resume
-- Questions should progressively test deeper understanding
-- Include scenario-based questions relevant to the role
-- Test both technical knowledge and problem-solving ability
-
-OUTPUT FORMAT (JSON):
-Return a valid JSON array with exactly {num_questions} questions in this format:
-
-[
-  {{
-    "question": "Based on your work with [specific technology from resume] in [specific project], how would you...",
-    "focus_area": "Technology/Skill being tested",
-    "difficulty": "Easy/Medium/Hard",
-    "expected_skills": ["skill1", "skill2"]
-  }}
-]
-
-Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
+        context = self._job_context('oral', jd_text, experience_level, required_skills, job_id)
+        request = self._oral_request(resume_text, candidate_name, num_questions)
 
         try:
-            response = self.model.generate_content(prompt)
-            questions_data = self._parse_json_response(response.text)
+            questions_data = self._generate_json(request, is_valid=_is_question_list, use_cache=use_cache, context=context)
             
             # Validate and ensure we have the right number of questions
             if isinstance(questions_data, list) and len(questions_data) > 0:
                 return questions_data[:num_questions]
             else:
-                print(f"[GEMINI] Invalid response format, using fallback")
-                return self._fallback_oral_questions(
+                if not allow_fallback:
+                    raise ValueError("Invalid oral questions response format")
+                logger.warning("Invalid response format, using fallback questions")
+                return self.fallback_oral_questions(
                     candidate_name, resume_text, required_skills, num_questions
                 )
                 
         except Exception as e:
-            print(f"[GEMINI] Error generating oral questions: {str(e)}")
-            return self._fallback_oral_questions(
+            if not allow_fallback:
+                raise
+            logger.warning("Error generating oral questions, using fallback: %s: %s", type(e).__name__, e)
+            return self.fallback_oral_questions(
                 candidate_name, resume_text, required_skills, num_questions
             )
     
@@ -150,7 +216,10 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
         resume_text: str,
         experience_level: str,
         required_skills: str,
-        num_questions: int
+        num_questions: int,
+        allow_fallback: bool = True,
+        use_cache: bool = True,
+        job_id: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Generate personalized coding questions.
@@ -161,6 +230,12 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
             experience_level: Expected experience level from JD
             required_skills: Required skills from JD
             num_questions: Number of coding questions to generate
+            allow_fallback: If False, Gemini errors are raised instead of
+                falling back to template questions (so the caller can retry)
+            use_cache: If False, ask Gemini for fresh questions instead of
+                reusing a cached response for the same prompt
+            job_id: The Job the JD fields belong to, so its shared prompt
+                context is dropped when the Job is edited
             
         Returns:
             List of coding question dictionaries with structure:
@@ -173,25 +248,296 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
             }
         """
         if not self.is_available():
-            return self._fallback_coding_questions(
+            return self.fallback_coding_questions(
                 resume_text, required_skills, num_questions
             )
         
-        prompt = f"""You are an expert technical interviewer creating coding challenges.
+        context = self._job_context('coding', jd_text, experience_level, required_skills, job_id)
+        request = self._coding_request(resume_text, num_questions)
+
+        try:
+            questions_data = self._generate_json(request, is_valid=_is_question_list, use_cache=use_cache, context=context)
+            
+            if isinstance(questions_data, list) and len(questions_data) > 0:
+                return questions_data[:num_questions]
+            else:
+                if not allow_fallback:
+                    raise ValueError("Invalid coding questions response format")
+                logger.warning("Invalid response format, using fallback questions")
+                return self.fallback_coding_questions(
+                    resume_text, required_skills, num_questions
+                )
+                
+        except Exception as e:
+            if not allow_fallback:
+                raise
+            logger.warning("Error generating coding questions, using fallback: %s: %s", type(e).__name__, e)
+            return self.fallback_coding_questions(
+                resume_text, required_skills, num_questions
+            )
+    
+    async def generate_oral_questions_async(
+        self,
+        jd_text: str,
+        resume_text: str,
+        candidate_name: str,
+        experience_level: str,
+        required_skills: str,
+        num_questions: int,
+        allow_fallback: bool = True,
+        use_cache: bool = True,
+        job_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Async variant of generate_oral_questions, for batch generation (see batch_generation.py)."""
+        if not self.is_available():
+            return self.fallback_oral_questions(
+                candidate_name, resume_text, required_skills, num_questions
+            )
+        
+        context = self._job_context('oral', jd_text, experience_level, required_skills, job_id)
+        request = self._oral_request(resume_text, candidate_name, num_questions)
+        
+        try:
+            questions_data = await self._generate_json_async(request, is_valid=_is_question_list, use_cache=use_cache, context=context)
+            if not _is_question_list(questions_data):
+                raise ValueError("Invalid oral questions response format")
+            return questions_data[:num_questions]
+        except Exception as e:
+            if not allow_fallback:
+                raise
+            logger.warning("Error generating oral questions, using fallback: %s: %s", type(e).__name__, e)
+            return self.fallback_oral_questions(
+                candidate_name, resume_text, required_skills, num_questions
+            )
+    
+    async def generate_coding_questions_async(
+        self,
+        jd_text: str,
+        resume_text: str,
+        experience_level: str,
+        required_skills: str,
+        num_questions: int,
+        allow_fallback: bool = True,
+        use_cache: bool = True,
+        job_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Async variant of generate_coding_questions, for batch generation (see batch_generation.py)."""
+        if not self.is_available():
+            return self.fallback_coding_questions(
+                resume_text, required_skills, num_questions
+            )
+        
+        context = self._job_context('coding', jd_text, experience_level, required_skills, job_id)
+        request = self._coding_request(resume_text, num_questions)
+        
+        try:
+            questions_data = await self._generate_json_async(request, is_valid=_is_question_list, use_cache=use_cache, context=context)
+            if not _is_question_list(questions_data):
+                raise ValueError("Invalid coding questions response format")
+            return questions_data[:num_questions]
+        except Exception as e:
+            if not allow_fallback:
+                raise
+            logger.warning("Error generating coding questions, using fallback: %s: %s", type(e).__name__, e)
+            return self.fallback_coding_questions(
+                resume_text, required_skills, num_questions
+            )
+    
+    def extract_resume_metadata(self, resume_text: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Extract structured metadata from raw resume text.
+        
+        Raises on API errors or an unusable response; callers decide whether
+        to fall back (see tasks.extract_resume_metadata).
+        
+        Returns:
+            {
+                "full_name": str,
+                "email": str,
+                "top_skills": List[str],
+                "experience_years": int,
+                "summary": str,
+                "education": str
+            }
+        """
+        prompt = f"""
+    Act as a professional HR Data Parser. I will provide you with raw text extracted from a candidate's resume (which may be from a PDF or a CSV table). 
+
+    Your task:
+    1. Extract the following information into a valid JSON object.
+    2. If a field is missing, use "Not Provided".
+    3. For 'top_skills', create a list of the 5 most relevant technical skills.
+    4. For 'experience_years', provide a single integer (e.g., 5). If it's a range, take the highest number.
+
+    JSON Schema:
+    {{
+      "full_name": "string",
+      "email": "string",
+      "top_skills": ["skill1", "skill2"],
+      "experience_years": integer,
+      "summary": "A 2-sentence professional overview",
+      "education": "Highest degree and institution"
+    }}
+
+    Raw Resume Text:
+    ---
+    {resume_text}
+    ---
+
+    Return ONLY the JSON object. Do not include any introductory text or markdown code blocks.
+    """
+        
+        metadata = self._generate_json(prompt, is_valid=lambda data: isinstance(data, dict), use_cache=use_cache)
+        if not isinstance(metadata, dict):
+            raise ValueError("Invalid metadata response format")
+        return metadata
+    
+    def generate_interview_bundle(
+        self,
+        jd_text: str,
+        resume_text: str,
+        candidate_name: str,
+        experience_level: str,
+        required_skills: str,
+        num_oral: int,
+        num_coding: int,
+        use_cache: bool = True,
+        job_id: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Generate resume metadata, oral questions and coding questions in a
+        single round trip, so the resume and JD are only sent once.
+        
+        Args:
+            jd_text: Full job description text
+            resume_text: Full resume text of the candidate
+            candidate_name: Name of the candidate
+            experience_level: Expected experience level from JD
+            required_skills: Required skills from JD
+            num_oral: Number of oral questions to generate
+            num_coding: Number of coding questions to generate
+            use_cache: If False, ask Gemini again instead of reusing a cached
+                response for the same prompt
+            job_id: The Job the JD fields belong to, so its shared prompt
+                context is dropped when the Job is edited
+            
+        Returns:
+            {
+                "metadata": Dict (same schema as extract_resume_metadata),
+                "oral_questions": List (same schema as generate_oral_questions),
+                "coding_questions": List (same schema as generate_coding_questions)
+            }
+            or None if Gemini is unavailable or the response is unusable, in
+            which case callers fall back to the separate per-part calls.
+            API errors, including 429s and RateLimitTimeout, are raised so
+            the caller's retry policy applies.
+        """
+        if not self.is_available():
+            return None
+        
+        context = self._job_context('bundle', jd_text, experience_level, required_skills, job_id)
+        request = self._bundle_request(resume_text, candidate_name, num_oral, num_coding)
+
+        def is_valid_bundle(bundle):
+            if not isinstance(bundle, dict):
+                return False
+            metadata = bundle.get('metadata')
+            oral = bundle.get('oral_questions')
+            coding = bundle.get('coding_questions')
+            return isinstance(metadata, dict) and isinstance(oral, list) and isinstance(coding, list) \
+                and not (num_oral and not oral) and not (num_coding and not coding)
+        
+        try:
+            bundle = self._generate_json(request, is_valid=is_valid_bundle, use_cache=use_cache, context=context)
+            
+            if not is_valid_bundle(bundle):
+                logger.warning("Invalid combined response format, using separate calls")
+                return None
+            metadata = bundle['metadata']
+            oral = bundle['oral_questions']
+            coding = bundle['coding_questions']
+            
+            return {
+                "metadata": metadata,
+                "oral_questions": oral[:num_oral],
+                "coding_questions": coding[:num_coding]
+            }
+        except ValueError as e:
+            # Not JSON, or a blocked response without text
+            logger.warning("Unusable combined response, using separate calls: %s: %s", type(e).__name__, e)
+            return None
+    
+    # --- Prompts ---
+    # Each prompt is a job-level prefix, identical for every candidate of a job
+    # (see job_context.py), followed by a short per-candidate request.
+    
+    def _oral_prefix(self, jd_text, experience_level, required_skills) -> str:
+        """Job-level part of the oral questions prompt"""
+        return f"""You are an expert technical interviewer conducting a personalized interview.
+
+EXPERIENCE LEVEL EXPECTED: {experience_level}
 
 JOB DESCRIPTION:
 {jd_text}
 
-REQUIRED SKILLS:
+REQUIRED SKILLS FOR THIS ROLE:
 {required_skills}
 
-EXPERIENCE LEVEL: {experience_level}
+TASK:
+For the candidate given after these instructions, generate the requested number of personalized, open-ended oral interview questions that:
+
+1. **Are Based on Real Resume Projects**: Reference specific projects, technologies, or achievements mentioned in the candidate's resume
+2. **Test JD Required Skills**: Focus on skills listed in the job description that the candidate claims to have
+3. **Match Experience Level**: Difficulty should match the expected experience level ({experience_level})
+4. **Avoid Yes/No Questions**: All questions must be open-ended and require detailed explanations
+5. **Are Role-Relevant**: Questions must be directly relevant to the job responsibilities
+6. **Test Depth**: Go beyond surface-level knowledge to assess true understanding
+
+RULES:
+- NO generic template questions
+- Each question MUST reference something specific from the resume
+- Questions should progressively test deeper understanding
+- Include scenario-based questions relevant to the role
+- Test both technical knowledge and problem-solving ability
+
+OUTPUT FORMAT (JSON):
+Return a valid JSON array with exactly the requested number of questions in this format:
 
-CANDIDATE'S RESUME (for context on their background):
+[
+  {{
+    "question": "Based on your work with [specific technology from resume] in [specific project], how would you...",
+    "focus_area": "Technology/Skill being tested",
+    "difficulty": "Easy/Medium/Hard",
+    "expected_skills": ["skill1", "skill2"]
+  }}
+]
+
+Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
+    
+    def _oral_request(self, resume_text, candidate_name, num_questions) -> str:
+        """Per-candidate part of the oral questions prompt"""
+        return f"""CANDIDATE INFORMATION:
+Name: {candidate_name}
+
+CANDIDATE'S RESUME:
 {resume_text}
 
+Generate exactly {num_questions} oral interview questions for this candidate."""
+    
+    def _coding_prefix(self, jd_text, experience_level, required_skills) -> str:
+        """Job-level part of the coding questions prompt"""
+        return f"""You are an expert technical interviewer creating coding challenges.
+
+JOB DESCRIPTION:
+{jd_text}
+
+REQUIRED SKILLS:
+{required_skills}
+
+EXPERIENCE LEVEL: {experience_level}
+
 TASK:
-Generate exactly {num_questions} coding problem(s) that:
+For the candidate given after these instructions, generate the requested number of coding problem(s) that:
 
 1. **Test JD Required Skills**: Focus on programming languages and technologies mentioned in the job description
 2. **Are Role-Relevant**: Problems should reflect real challenges in this specific role
@@ -207,7 +553,7 @@ RULES:
 - Provide context on why this problem matters for the role
 
 OUTPUT FORMAT (JSON):
-Return a valid JSON array with exactly {num_questions} coding problem(s):
+Return a valid JSON array with exactly the requested number of coding problem(s):
 
 [
   {{
@@ -220,24 +566,100 @@ Return a valid JSON array with exactly {num_questions} coding problem(s):
 ]
 
 Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
+    
+    def _coding_request(self, resume_text, num_questions) -> str:
+        """Per-candidate part of the coding questions prompt"""
+        return f"""CANDIDATE'S RESUME (for context on their background):
+{resume_text}
 
-        try:
-            response = self.model.generate_content(prompt)
-            questions_data = self._parse_json_response(response.text)
-            
-            if isinstance(questions_data, list) and len(questions_data) > 0:
-                return questions_data[:num_questions]
-            else:
-                print(f"[GEMINI] Invalid response format, using fallback")
-                return self._fallback_coding_questions(
-                    resume_text, required_skills, num_questions
-                )
-                
-        except Exception as e:
-            print(f"[GEMINI] Error generating coding questions: {str(e)}")
-            return self._fallback_coding_questions(
-                resume_text, required_skills, num_questions
-            )
+Generate exactly {num_questions} coding problem(s) for this candidate."""
+    
+    def _bundle_prefix(self, jd_text, experience_level, required_skills) -> str:
+        """Job-level part of the combined metadata + questions prompt"""
+        return f"""You are an expert technical interviewer and HR data parser preparing a personalized interview.
+
+EXPERIENCE LEVEL EXPECTED: {experience_level}
+
+JOB DESCRIPTION:
+{jd_text}
+
+REQUIRED SKILLS FOR THIS ROLE:
+{required_skills}
+
+TASK:
+For the candidate given after these instructions (resume as raw text from a PDF or a CSV table),
+produce ONE JSON object with three parts:
+
+1. "metadata": structured data extracted from the resume.
+   - If a field is missing, use "Not Provided".
+   - "top_skills" is a list of the 5 most relevant technical skills.
+   - "experience_years" is a single integer; if it's a range, take the highest number.
+
+2. "oral_questions": exactly the requested number of personalized, open-ended oral interview questions that
+   reference specific projects, technologies or achievements from the resume, test the JD required
+   skills the candidate claims to have, match the {experience_level} level, are never yes/no questions,
+   and progressively test deeper understanding. NO generic template questions.
+
+3. "coding_questions": exactly the requested number of coding problem(s) that test the JD's languages and
+   technologies, reflect real challenges in this role, match the {experience_level} level, are solvable
+   in 30-60 minutes and include clear input/output specifications. NO generic LeetCode-style problems
+   unless highly relevant.
+
+OUTPUT FORMAT (JSON):
+{{
+  "metadata": {{
+    "full_name": "string",
+    "email": "string",
+    "top_skills": ["skill1", "skill2"],
+    "experience_years": 0,
+    "summary": "A 2-sentence professional overview",
+    "education": "Highest degree and institution"
+  }},
+  "oral_questions": [
+    {{
+      "question": "Based on your work with [specific technology from resume] in [specific project], how would you...",
+      "focus_area": "Technology/Skill being tested",
+      "difficulty": "Easy/Medium/Hard",
+      "expected_skills": ["skill1", "skill2"]
+    }}
+  ],
+  "coding_questions": [
+    {{
+      "problem": "Detailed problem statement with context...",
+      "expected_skills": ["skill1", "skill2"],
+      "input_output_format": "Input: ... Output: ... Example: ...",
+      "difficulty": "Easy/Medium/Hard",
+      "focus_area": "What this tests (e.g., 'API Design', 'Data Structures')"
+    }}
+  ]
+}}
+
+Return ONLY the JSON object. No markdown, no explanations, no code blocks."""
+    
+    def _bundle_request(self, resume_text, candidate_name, num_oral, num_coding) -> str:
+        """Per-candidate part of the combined metadata + questions prompt"""
+        return f"""CANDIDATE INFORMATION:
+Name: {candidate_name}
+
+CANDIDATE'S RESUME:
+{resume_text}
+
+Generate exactly {num_oral} oral question(s) and exactly {num_coding} coding problem(s) for this candidate."""
+    
+    def _job_context(self, kind, jd_text, experience_level, required_skills, job_id=None):
+        """The shared per-job prefix (and cached-content handle) for a prompt kind"""
+        from .job_context import get_job_context
+        
+        build_prefix = {
+            'oral': self._oral_prefix,
+            'coding': self._coding_prefix,
+            'bundle': self._bundle_prefix,
+        }[kind]
+        return get_job_context(
+            kind, jd_text, required_skills, experience_level,
+            lambda: build_prefix(jd_text, experience_level, required_skills),
+            self.MODEL_NAME, job_id=job_id
+        )
     
     def _parse_json_response(self, response_text: str) -> Any:
         """Parse JSON from Gemini response, handling markdown code blocks"""
@@ -254,7 +676,7 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
         
         return json.loads(cleaned.strip())
     
-    def _fallback_oral_questions(
+    def fallback_oral_questions(
         self,
         candidate_name: str,
         resume_text: str,
@@ -265,19 +687,12 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
         Fallback question generation when Gemini is not available.
         Still attempts to be dynamic based on resume content.
         """
-        import re
-        
-        # Detect skills from resume
-        detected_skills = []
-        keywords = [
-            "Python", "Java", "JavaScript", "React", "Node", "Django", 
-            "SQL", "AWS", "Docker", "Kubernetes", "Machine Learning",
-            "TypeScript", "Angular", "Vue", "MongoDB", "PostgreSQL"
-        ]
-        
-        for kw in keywords:
-            if kw.lower() in resume_text.lower():
-                detected_skills.append(kw)
+        from .skill_matcher import get_skill_matcher, split_skills
+
+        # Detect skills from resume, the job's required skills first
+        detected_skills = get_skill_matcher().top_skills(
+            resume_text, limit=3, prefer=split_skills(required_skills)
+        )
         
         skill_str = ", ".join(detected_skills[:3]) if detected_skills else required_skills
         
@@ -327,7 +742,7 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
         
         return questions[:num_questions]
     
-    def _fallback_coding_questions(
+    def fallback_coding_questions(
         self,
         resume_text: str,
         required_skills: str,
@@ -336,14 +751,11 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
         """
         Fallback coding question generation when Gemini is not available.
         """
-        # Detect primary language from resume
-        languages = ["Python", "Java", "JavaScript", "C++", "Go", "Ruby"]
-        detected_lang = "Python"  # default
-        
-        for lang in languages:
-            if lang.lower() in resume_text.lower():
-                detected_lang = lang
-                break
+        from .skill_matcher import get_skill_matcher
+
+        # Detect primary language from resume: the most mentioned one
+        languages = get_skill_matcher().top_skills(resume_text, limit=1, category="Programming Languages")
+        detected_lang = languages[0] if languages else "Python"  # default
         
         questions = [
             {
@@ -365,6 +777,10 @@ Return ONLY the JSON array. No markdown, no explanations, no code blocks."""
         return questions[:num_questions]
 
 
+def _is_question_list(data: Any) -> bool:
+    return isinstance(data, list) and len(data) > 0
+
+
 # Singleton instance
 _gemini_generator = None
 
@@ -0,0 +1,60 @@
+"""
+Pre-serialized question bundles for the candidate interview API.
+
+Everything the interview page needs that does not change once questions are
+generated (candidate and job names, the session's timing config and the
+questions) is serialized to JSON once and stored on
+InterviewSession.question_bundle. The candidate endpoints (see
+CandidateInterviewView) then answer from one indexed query on
+InterviewLink.token joined to its session, without reading Job, Resume or
+Question rows or running a serializer per request.
+
+Bundles are rebuilt where questions are written: persistence.flush(),
+batch_generation and upgrade_provisional_questions() call refresh() in the
+transaction that saves the questions. Saving or deleting a single Question
+(the admin) drops the session's bundle (see signals.py) and the next request
+builds it again.
+"""
+
+import json
+from collections import defaultdict
+from .models import InterviewSession, Question
+
+CONFIG_FIELDS = ('oral_question_count', 'coding_question_count', 'thinking_time', 'recording_time', 'coding_time')
+QUESTION_FIELDS = ('id', 'question_type', 'text', 'time_limit', 'order')
+
+
+def build(session, questions):
+    """The bundle JSON of a session (candidate and job loaded) and its questions in order."""
+    return json.dumps({
+        'candidate': session.candidate.name,
+        'job': session.candidate.job.title,
+        'config': {field: getattr(session, field) for field in CONFIG_FIELDS},
+        'questions': [{field: getattr(q, field) for field in QUESTION_FIELDS} for q in questions],
+    }, separators=(',', ':'))
+
+
+def refresh(session_ids):
+    """Rebuilds and stores the bundles of the given sessions with three queries."""
+    session_ids = set(session_ids)
+    if not session_ids:
+        return []
+    sessions = list(
+        InterviewSession.objects.filter(pk__in=session_ids)
+        .select_related('candidate__job').only(*CONFIG_FIELDS, 'candidate__name', 'candidate__job__title')
+    )
+    questions = defaultdict(list)
+    for question in Question.objects.filter(session_id__in=session_ids).only('session_id', *QUESTION_FIELDS).order_by('session_id', 'order', 'id'):
+        questions[question.session_id].append(question)
+    for session in sessions:
+        session.question_bundle = build(session, questions[session.id])
+    InterviewSession.objects.bulk_update(sessions, ['question_bundle'], batch_size=500)
+    return sessions
+
+
+def get(session):
+    """The session's bundle JSON, built and stored first if it has none."""
+    if session.question_bundle is None:
+        refreshed = refresh([session.id])
+        session.question_bundle = refreshed[0].question_bundle if refreshed else None
+    return session.question_bundle
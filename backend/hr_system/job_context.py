@@ -0,0 +1,173 @@
+"""
+Per-job prompt context for Gemini requests.
+
+Every candidate of a job is sent the same prefix: the job description,
+required skills, experience level and the instruction block. Prompts are
+split into that job-level prefix and a per-candidate request (name, resume,
+question count). The prefix is built once per job and prompt kind and kept
+in memory. When it is large enough for Gemini context caching, it is also
+uploaded once as a CachedContent handle, so each call ships only the
+candidate part. Otherwise the prebuilt prefix is prepended to the request.
+When creating the handle fails, the prefix is sent inline: for good if
+caching is unsupported for the model or API tier, or for
+CACHING_RETRY_SECONDS after a transient error such as a 429 or a 5xx.
+
+Contexts are looked up by a fingerprint of the job fields they are built
+from, so an edit made in another process is picked up on the next lookup.
+The post_save signal on Job (see signals.py) drops the job's contexts in
+this process and deletes their server-side handles.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from .rate_limiter import CHARS_PER_TOKEN, get_rate_limiter
+
+MAX_CONTEXTS = 256
+# Recreate a handle this long before it expires rather than racing the expiry
+EXPIRY_MARGIN_SECONDS = 60
+# After a transient failure to create a handle, the prefix is sent inline this long
+CACHING_RETRY_SECONDS = 300
+
+
+def is_permanent_caching_error(exc):
+    """True for errors retrying won't fix: caching unsupported by the model or API tier, or a rejected prefix."""
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:
+        return False
+    return isinstance(exc, (
+        google_exceptions.InvalidArgument, google_exceptions.FailedPrecondition,
+        google_exceptions.PermissionDenied, google_exceptions.NotFound, google_exceptions.MethodNotImplemented
+    ))
+
+
+def job_fingerprint(kind, jd_text, required_skills, experience_level):
+    payload = "\x1f".join([kind, jd_text or '', required_skills or '', experience_level or ''])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class JobPromptContext:
+    """A job's prompt prefix for one prompt kind, plus its cached-content handle when there is one."""
+
+    def __init__(self, kind, fingerprint, prefix, model_name):
+        self.kind = kind
+        self.fingerprint = fingerprint
+        self.prefix = prefix
+        self.model_name = model_name
+        self.cached_content = None
+        self._model = None
+        self._expires_at = 0
+        self._caching_failed = False
+        self._retry_caching_at = 0
+        self._lock = threading.Lock()
+
+    def full_prompt(self, request):
+        """The complete prompt text: prefix followed by the per-candidate request."""
+        return f"{self.prefix}\n\n{request}"
+
+    def _cacheable(self):
+        return (
+            settings.GEMINI_CONTEXT_CACHING
+            and not self._caching_failed
+            and time.time() >= self._retry_caching_at
+            and len(self.prefix) // CHARS_PER_TOKEN >= settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+        )
+
+    def cached_model(self):
+        """
+        A GenerativeModel bound to the cached prefix, creating the handle on
+        first use, or None when caching is disabled, unsupported or the
+        prefix is below Gemini's minimum cacheable size.
+        """
+        if not self._cacheable():
+            return None
+        with self._lock:
+            if self._model is None or time.time() >= self._expires_at - EXPIRY_MARGIN_SECONDS:
+                self._create()
+            return self._model
+
+    def _create(self):
+        import google.generativeai as genai
+        from google.generativeai import caching
+
+        self.drop_cache()
+        ttl = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+        try:
+            cached = get_rate_limiter().call(
+                lambda: caching.CachedContent.create(
+                    model=f"models/{self.model_name}",
+                    display_name=f"job-{self.kind}-{self.fingerprint[:12]}",
+                    system_instruction=self.prefix,
+                    ttl=timedelta(seconds=ttl)
+                ),
+                self.prefix
+            )
+            self._model = genai.GenerativeModel.from_cached_content(cached)
+            self.cached_content = cached
+            self._expires_at = time.time() + ttl
+            print(f"[GEMINI] Cached {self.kind} job context {cached.name}")
+        except Exception as e:
+            if is_permanent_caching_error(e):
+                # Unsupported model/API tier or prefix too small: keep using the inline prefix
+                print(f"[GEMINI] Context caching unavailable, sending the prefix inline: {type(e).__name__}: {e}")
+                self._caching_failed = True
+            else:
+                print(f"[GEMINI] Could not cache {self.kind} job context, retrying in {CACHING_RETRY_SECONDS}s: "
+                      f"{type(e).__name__}: {e}")
+                self._retry_caching_at = time.time() + CACHING_RETRY_SECONDS
+
+    def drop_cache(self):
+        """Forgets the cached-content handle and deletes it server-side."""
+        cached, self.cached_content, self._model = self.cached_content, None, None
+        if cached is not None:
+            try:
+                cached.delete()
+            except Exception:
+                # It expires on its own; nothing else depends on it
+                pass
+
+
+_contexts = OrderedDict()
+_job_keys = {}
+_contexts_lock = threading.Lock()
+
+
+def get_job_context(kind, jd_text, required_skills, experience_level, build_prefix, model_name, job_id=None):
+    """
+    Returns the JobPromptContext for a job's fields and a prompt kind,
+    calling build_prefix() only the first time those fields are seen.
+    Pass job_id so the context is dropped when that Job is edited.
+    """
+    fingerprint = job_fingerprint(kind, jd_text, required_skills, experience_level)
+    key = (kind, fingerprint)
+    evicted = []
+    with _contexts_lock:
+        context = _contexts.get(key)
+        if context is None:
+            context = JobPromptContext(kind, fingerprint, build_prefix(), model_name)
+            _contexts[key] = context
+            while len(_contexts) > MAX_CONTEXTS:
+                _, old = _contexts.popitem(last=False)
+                evicted.append(old)
+        else:
+            _contexts.move_to_end(key)
+        if job_id is not None:
+            _job_keys.setdefault(job_id, set()).add(key)
+
+    for old in evicted:
+        old.drop_cache()
+    return context
+
+
+def invalidate_job(job_id):
+    """Drops every context built for a job (called when the Job is saved or deleted)."""
+    with _contexts_lock:
+        keys = _job_keys.pop(job_id, set())
+        dropped = [_contexts.pop(key) for key in keys if key in _contexts]
+    for context in dropped:
+        context.drop_cache()
+    return len(dropped)
@@ -0,0 +1,209 @@
+"""
+Server-Sent Events for the job status board.
+
+The InterviewStatus page used to re-fetch the whole /jobs/{id}/status/
+payload every 30 seconds. Changes are now recorded as CandidateEvent rows
+(by the signal handlers in signals.py and by CandidateIngestor.flush for
+bulk-created candidates) and streamed from /jobs/{id}/events/:
+
+    id: 42
+    event: status
+    data: {"id": 7, "status": "NOT_ATTEMPTED", "link": "http://.../interview/<token>"}
+
+`candidate` events carry a full status-board row, `processing` events the
+candidate's pipeline stage and state, and `status` events the session
+status and/or interview link, so the page patches rows in place. A client
+that reconnects sends Last-Event-ID (or ?last_event_id=) and receives what
+it missed; when those events have already been pruned it gets a `reset`
+event and re-fetches the board once.
+
+EventSource cannot send an Authorization header, so the page first asks
+/jobs/{id}/events/token/ for a signed token scoped to that job's stream and
+valid for SSE_TOKEN_MAX_AGE_SECONDS, and passes it as ?stream_token=. The
+long-lived API token never appears in a URL (and so in access logs).
+
+The stream works under both servers. Under ASGI (`uvicorn core.asgi:application`)
+an open stream is a coroutine polling the (job, id) index every
+SSE_POLL_SECONDS. Under WSGI (`manage.py runserver`) it is a plain
+generator that holds one server thread while it is open. Streams close
+after SSE_STREAM_SECONDS and the browser reconnects from its last event id.
+Old events are deleted by `manage.py prune_job_events`, not by the stream.
+"""
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from .models import CandidateEvent, HRUser, Job
+
+BATCH_SIZE = 200
+STREAM_TOKEN_SALT = 'hr_system.job_events'
+
+
+def interview_url(token):
+    return f"{settings.FRONTEND_URL}/interview/{token}"
+
+
+def status_row(candidate, session=None, link=None):
+    """A candidate's row on the status board (/jobs/{id}/status/ and `candidate` events)."""
+    return {
+        "id": candidate.id,
+        "name": candidate.name,
+        "email": candidate.email,
+        "link": interview_url(link.token) if link else "Generating...",
+        "status": session.status if session else "Processing",
+        "resume_file": candidate.resume_file.url if candidate.resume_file else None,
+        "resume_url": candidate.resume_url
+    }
+
+
+def record(job_id, candidate_id, kind, data):
+    CandidateEvent.objects.create(job_id=job_id, candidate_id=candidate_id, kind=kind, data=data)
+
+
+def record_new_candidates(candidates):
+    """`candidate` events for rows inserted with bulk_create, which sends no post_save."""
+    CandidateEvent.objects.bulk_create([
+        CandidateEvent(job_id=c.job_id, candidate_id=c.id, kind='candidate', data=status_row(c))
+        for c in candidates
+    ])
+
+
+def record_new_sessions(sessions, links):
+    """`status` events for sessions and links inserted with bulk_create (see persistence.flush)."""
+    events = [
+        CandidateEvent(job_id=s.candidate.job_id, candidate_id=s.candidate_id, kind='status',
+                       data={"id": s.candidate_id, "status": s.status})
+        for s in sessions
+    ]
+    for link in links:
+        candidate = link.session.candidate
+        events.append(CandidateEvent(job_id=candidate.job_id, candidate_id=candidate.id, kind='status',
+                                     data={"id": candidate.id, "link": interview_url(link.token)}))
+    CandidateEvent.objects.bulk_create(events)
+
+
+def prune():
+    """Deletes events older than SSE_EVENT_RETENTION_HOURS (see `manage.py prune_job_events`)."""
+    cutoff = timezone.now() - timedelta(hours=settings.SSE_EVENT_RETENTION_HOURS)
+    return CandidateEvent.objects.filter(created_at__lt=cutoff).delete()[0]
+
+
+def stream_token(user, job_id):
+    """A signed token that opens one job's event stream for SSE_TOKEN_MAX_AGE_SECONDS."""
+    return signing.dumps({'user': user.pk, 'job': job_id}, salt=STREAM_TOKEN_SALT)
+
+
+def format_event(event_id, kind, data):
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _authenticate(request, job_id):
+    """The HR user of the session, or of a ?stream_token= issued for this job's stream."""
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    try:
+        claims = signing.loads(
+            request.GET.get('stream_token', ''), salt=STREAM_TOKEN_SALT, max_age=settings.SSE_TOKEN_MAX_AGE_SECONDS
+        )
+    except signing.BadSignature:
+        return None
+    if claims.get('job') != job_id:
+        return None
+    return await HRUser.objects.filter(pk=claims.get('user'), is_active=True).afirst()
+
+
+async def _last_event_id(request, job_id):
+    """
+    Where the stream starts: the client's Last-Event-ID, or the job's latest
+    event for a fresh subscription. Returns (id, reset); reset is True when
+    events after the client's id have been pruned, and the stream then
+    restarts from the latest event after the client re-fetches the board.
+    """
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(value) if value is not None else None
+    except ValueError:
+        last_id = None
+    if last_id is not None:
+        oldest = await CandidateEvent.objects.order_by('id').values_list('id', flat=True).afirst()
+        if oldest is None or oldest <= last_id + 1:
+            return last_id, False
+    latest = await CandidateEvent.objects.filter(job_id=job_id).order_by('-id').values_list('id', flat=True).afirst()
+    return latest or 0, last_id is not None
+
+
+def _events_after(job_id, last_id):
+    return (
+        CandidateEvent.objects.filter(job_id=job_id, id__gt=last_id).order_by('id')
+        .values_list('id', 'kind', 'data')[:BATCH_SIZE]
+    )
+
+
+def _opening(last_id, reset):
+    yield f"retry: {int(settings.SSE_POLL_SECONDS * 1000) + 1000}\n\n"
+    if reset:
+        yield format_event(last_id, 'reset', {})
+
+
+async def _stream(job_id, last_id, reset):
+    """The event stream for ASGI servers."""
+    for line in _opening(last_id, reset):
+        yield line
+    closes_at = time.monotonic() + settings.SSE_STREAM_SECONDS
+    quiet_since = time.monotonic()
+    while time.monotonic() < closes_at:
+        sent = False
+        async for event_id, kind, data in _events_after(job_id, last_id):
+            yield format_event(event_id, kind, data)
+            last_id, sent = event_id, True
+        if sent:
+            quiet_since = time.monotonic()
+            continue
+        if time.monotonic() - quiet_since >= settings.SSE_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            quiet_since = time.monotonic()
+        await asyncio.sleep(settings.SSE_POLL_SECONDS)
+
+
+def _stream_sync(job_id, last_id, reset):
+    """
+    The same stream for WSGI servers, which would buffer an async iterator
+    until it ends; each chunk is written as soon as it is yielded.
+    """
+    yield from _opening(last_id, reset)
+    closes_at = time.monotonic() + settings.SSE_STREAM_SECONDS
+    quiet_since = time.monotonic()
+    while time.monotonic() < closes_at:
+        sent = False
+        for event_id, kind, data in _events_after(job_id, last_id):
+            yield format_event(event_id, kind, data)
+            last_id, sent = event_id, True
+        if sent:
+            quiet_since = time.monotonic()
+            continue
+        if time.monotonic() - quiet_since >= settings.SSE_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            quiet_since = time.monotonic()
+        time.sleep(settings.SSE_POLL_SECONDS)
+
+
+async def job_events(request, job_id):
+    """GET /jobs/{id}/events/: the job's status board changes as text/event-stream."""
+    if await _authenticate(request, job_id) is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    if not await Job.objects.filter(pk=job_id).aexists():
+        return JsonResponse({"detail": "No Job matches the given query."}, status=404)
+
+    last_id, reset = await _last_event_id(request, job_id)
+    stream = _stream if isinstance(request, ASGIRequest) else _stream_sync
+    response = StreamingHttpResponse(stream(job_id, last_id, reset), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,105 @@
+"""
+Materialized per-job dashboard aggregates (JobStats).
+
+The Dashboard listed every job with `candidates.count()` and a filtered
+count of completed sessions, two queries per job that grew with the roster.
+JobStats keeps those numbers, plus score and failure aggregates, in one row
+per job. The signal handlers in signals.py adjust it with F() updates as
+candidates, sessions, evaluations and processing rows change; the few bulk
+paths that bypass signals (CandidateIngestor.flush, pipeline.retry_failed,
+persistence.flush) call adjust() themselves. rebuild() recomputes a row from scratch, and
+`manage.py rebuild_job_stats` runs it to repair any drift.
+"""
+
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Candidate, Evaluation, JobStats
+
+SESSION_STATUS_FIELDS = {
+    'NOT_ATTEMPTED': 'not_attempted',
+    'IN_PROGRESS': 'in_progress',
+    'COMPLETED': 'completed',
+    'EXPIRED': 'expired',
+}
+
+
+def adjust(job_id, create=True, **deltas):
+    """
+    Adds the deltas to a job's counters. A job without a stats row is rebuilt
+    instead (the rebuild already sees the change) unless create is False, as
+    in delete handlers that run while the job itself is being deleted.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if job_id is None or not deltas:
+        return
+    updated = JobStats.objects.filter(job_id=job_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated and create:
+        rebuild(job_id)
+
+
+def session_status_changed(job_id, old_status, new_status, create=True):
+    """Moves a candidate between the session-status counters (None = no session)."""
+    deltas = {}
+    if old_status in SESSION_STATUS_FIELDS:
+        deltas[SESSION_STATUS_FIELDS[old_status]] = -1
+    if new_status in SESSION_STATUS_FIELDS:
+        field = SESSION_STATUS_FIELDS[new_status]
+        deltas[field] = deltas.get(field, 0) + 1
+    adjust(job_id, create=create, **deltas)
+
+
+def processing_status_changed(job_id, old_status, new_status, create=True):
+    adjust(job_id, create=create, processing_failures=(new_status == 'FAILED') - (old_status == 'FAILED'))
+
+
+def evaluation_changed(job_id, old, new):
+    """
+    Applies an evaluation change; `old` and `new` are (overall_score,
+    cheating_flag) pairs, None when the evaluation is being created or deleted.
+    """
+    if job_id is None:
+        return
+    old_score, old_flag = old or (0.0, False)
+    new_score, new_flag = new or (0.0, False)
+    adjust(
+        job_id, create=new is not None,
+        evaluated=(new is not None) - (old is not None),
+        score_total=float(new_score - old_score),
+        cheating_flags=int(bool(new_flag)) - int(bool(old_flag)),
+    )
+
+    stats = JobStats.objects.filter(job_id=job_id)
+    if new is not None and (old is None or new_score >= old_score):
+        stats.update(max_score=Case(
+            When(Q(max_score__isnull=True) | Q(max_score__lt=new_score), then=Value(float(new_score))),
+            default=F('max_score'),
+        ))
+    elif old is not None:
+        # Only a lowered or deleted top score needs the maximum looked up again,
+        # which reads the first row of the (job, -overall_score) index
+        top = Evaluation.objects.filter(job_id=OuterRef('job_id')).order_by('-overall_score')
+        stats.filter(max_score__lte=old_score).update(max_score=Subquery(top.values('overall_score')[:1]))
+
+
+def rebuild(job_id):
+    """Recomputes a job's stats row from its candidates and evaluations."""
+    values = Candidate.objects.filter(job_id=job_id).aggregate(
+        candidates=Count('id'),
+        processing_failures=Count('id', filter=Q(processing__status='FAILED')),
+        **{
+            field: Count('id', filter=Q(session__status=status))
+            for status, field in SESSION_STATUS_FIELDS.items()
+        }
+    )
+    values.update(Evaluation.objects.filter(job_id=job_id).aggregate(
+        evaluated=Count('id'),
+        score_total=Coalesce(Sum('overall_score'), Value(0.0)),
+        max_score=Max('overall_score'),
+        cheating_flags=Count('id', filter=Q(cheating_flag=True)),
+    ))
+    stats, _ = JobStats.objects.update_or_create(job_id=job_id, defaults=values)
+    return stats
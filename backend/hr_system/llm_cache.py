@@ -0,0 +1,194 @@
+"""
+Two-tier cache for Gemini responses.
+
+Responses are keyed by a SHA-256 of the model name, the prompt and the
+generation parameters, so re-running a candidate, a retried task or
+reprocessing a job after an outage reuses the text Gemini already returned.
+Lookups go to an in-process LRU first and then to the LLMCacheEntry table,
+which is shared by every worker. Entries expire after LLM_CACHE_TTL_SECONDS
+and the table is kept under LLM_CACHE_MAX_ENTRIES by evicting the least
+recently used rows every EVICT_EVERY_INSERTS stores, so it may run over by
+that many rows per process in between.
+
+Hits and misses are counted in memory and added to the shared CacheCounter
+row every COUNTER_FLUSH_SECONDS (and by stats()), so an in-process hit costs
+no database write.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import LLMCacheEntry, CacheCounter
+
+COUNTER_NAME = 'llm_cache'
+EVICTION_BATCH_SIZE = 100
+EVICT_EVERY_INSERTS = 100
+COUNTER_FLUSH_SECONDS = 30
+
+
+def make_key(model_name, prompt, params=None):
+    """SHA-256 of the model name, prompt and generation parameters."""
+    payload = json.dumps(
+        {'model': model_name, 'prompt': prompt, 'params': params or {}},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    In-process LRU in front of the persistent table. Safe to share between
+    threads; get_llm_cache() returns the process-wide instance.
+    """
+
+    def __init__(self, ttl_seconds=None, memory_entries=None, max_entries=None):
+        self.ttl_seconds = settings.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.memory_entries = settings.LLM_CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._counts_flushed_at = time.monotonic()
+        self._inserts = 0
+
+    # --- In-process tier ---
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            text, expires_at = item
+            if expires_at <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return text
+
+    def _memory_set(self, key, text, expires_at):
+        if self.memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = (text, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    # --- Counters ---
+
+    def _count(self, field):
+        with self._lock:
+            self._counts[field] += 1
+            due = time.monotonic() - self._counts_flushed_at >= COUNTER_FLUSH_SECONDS
+        if due:
+            self.flush_counts()
+
+    def flush_counts(self):
+        """Adds the hits and misses counted in this process to the shared counters."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._counts_flushed_at = time.monotonic()
+        for field, amount in counts.items():
+            CacheCounter.increment(COUNTER_NAME, field, amount)
+
+    # --- Public API ---
+
+    def get(self, key):
+        """Cached response text for a key (recording a hit) or None (recording a miss)."""
+        now = timezone.now()
+        text = self._memory_get(key, now)
+        if text is not None:
+            self._count('hits')
+            return text
+
+        entry = LLMCacheEntry.objects.filter(key=key, expires_at__gt=now).only('response_text', 'expires_at').first()
+        if entry is None:
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        LLMCacheEntry.objects.filter(pk=entry.pk).update(last_accessed_at=now)
+        self._memory_set(key, entry.response_text, entry.expires_at)
+        return entry.response_text
+
+    def set(self, key, model_name, text):
+        """Stores a response in both tiers; every EVICT_EVERY_INSERTS stores, enforces the size limit."""
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        LLMCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'model_name': model_name,
+                'response_text': text,
+                'expires_at': expires_at,
+                'last_accessed_at': now
+            }
+        )
+        self._memory_set(key, text, expires_at)
+        with self._lock:
+            self._inserts += 1
+            due = self._inserts % EVICT_EVERY_INSERTS == 0
+        if due:
+            self.evict()
+
+    def delete(self, key):
+        """Drops a key from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+        LLMCacheEntry.objects.filter(key=key).delete()
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def evict(self, max_entries=None):
+        """Deletes expired rows, then least recently used rows beyond max_entries."""
+        max_entries = self.max_entries if max_entries is None else max_entries
+        evicted, _ = LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+
+        excess = LLMCacheEntry.objects.count() - max_entries
+        while excess > 0:
+            batch = list(
+                LLMCacheEntry.objects.order_by('last_accessed_at').values_list('pk', flat=True)[:min(excess, EVICTION_BATCH_SIZE)]
+            )
+            if not batch:
+                break
+            deleted, _ = LLMCacheEntry.objects.filter(pk__in=batch).delete()
+            evicted += deleted
+            excess -= len(batch)
+
+        if evicted:
+            CacheCounter.increment(COUNTER_NAME, 'evictions', evicted)
+        return evicted
+
+    def stats(self):
+        """Current hit/miss/eviction counts and the size of both tiers."""
+        self.flush_counts()
+        counter = CacheCounter.objects.filter(name=COUNTER_NAME).first()
+        return {
+            'hits': counter.hits if counter else 0,
+            'misses': counter.misses if counter else 0,
+            'evictions': counter.evictions if counter else 0,
+            'entries': LLMCacheEntry.objects.count(),
+            'memory_entries': len(self._memory),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+        }
+
+
+# Singleton instance
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get or create the process-wide Gemini response cache"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache()
+        return _llm_cache
@@ -0,0 +1,128 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from core.database import sqlite_config, postgres_config
+
+MODES = ('sqlite-default', 'sqlite-wal', 'postgres')
+TABLE = 'benchmark_writes'
+
+
+class Command(BaseCommand):
+    help = ('Concurrent write throughput of the database modes side by side: untuned SQLite, '
+            'WAL-tuned SQLite and pooled PostgreSQL (the DB_* variables, e.g. a local server)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES), help=f'Comma-separated subset of {", ".join(MODES)}')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent writer threads (like pipeline workers)')
+        parser.add_argument('--transactions', type=int, default=100, help='Transactions per writer')
+        parser.add_argument('--rows', type=int, default=8, help='Rows inserted per transaction (a session\'s questions)')
+        parser.add_argument('--readers', type=int, default=2, help='Threads polling with reads meanwhile (status board)')
+
+    def handle(self, *args, **options):
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+        self.stdout.write(f"{options['workers']} writers x {options['transactions']} transactions x "
+                          f"{options['rows']} rows, {options['readers']} readers")
+        self.stdout.write(f"{'mode':<16}{'tx/s':>10}{'rows/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}{'reads/s':>10}")
+        with tempfile.TemporaryDirectory() as tmp:
+            configs = {
+                'sqlite-default': sqlite_config(os.path.join(tmp, 'default.sqlite3'), tuned=False),
+                'sqlite-wal': sqlite_config(os.path.join(tmp, 'wal.sqlite3')),
+                'postgres': postgres_config(),
+            }
+            for mode in modes:
+                alias = f'benchmark-{mode}'
+                connections.settings[alias] = connections.configure_settings({DEFAULT_DB_ALIAS: {}, alias: configs[mode]})[alias]
+                try:
+                    result = self._run(alias, options)
+                except Exception as e:
+                    # e.g. psycopg not installed or no server at DB_HOST
+                    self.stdout.write(self.style.WARNING(f"{mode:<16}skipped: {type(e).__name__}: {e}"))
+                    continue
+                self.stdout.write(f"{mode:<16}{result['tx']:>10.0f}{result['rows']:>10.0f}{result['p50']:>10.1f}"
+                                  f"{result['p95']:>10.1f}{result['errors']:>8}{result['reads']:>10.0f}")
+
+    def _run(self, alias, options):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+            cursor.execute(f'CREATE TABLE {TABLE} (worker integer NOT NULL, n integer NOT NULL, payload text NOT NULL)')
+            cursor.execute(f'CREATE INDEX {TABLE}_worker ON {TABLE} (worker)')
+
+        latencies, errors, reads = [], [], []
+        lock = threading.Lock()
+        writing = threading.Event()
+        payload = 'x' * 500
+
+        def writer(worker):
+            own, failed = [], 0
+            try:
+                for n in range(options['transactions']):
+                    started = time.perf_counter()
+                    try:
+                        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                            cursor.executemany(
+                                f'INSERT INTO {TABLE} (worker, n, payload) VALUES (%s, %s, %s)',
+                                [(worker, n, payload)] * options['rows']
+                            )
+                        own.append(time.perf_counter() - started)
+                    except DatabaseError:
+                        # "database is locked" once the busy timeout runs out
+                        failed += 1
+            finally:
+                connections[alias].close()
+            with lock:
+                latencies.extend(own)
+                errors.append(failed)
+
+        def reader(worker):
+            count = 0
+            try:
+                while writing.is_set():
+                    try:
+                        with connections[alias].cursor() as cursor:
+                            cursor.execute(f'SELECT COUNT(*) FROM {TABLE} WHERE worker = %s', [worker])
+                            cursor.fetchone()
+                        count += 1
+                    except DatabaseError:
+                        pass
+            finally:
+                connections[alias].close()
+            with lock:
+                reads.append(count)
+
+        writers = [threading.Thread(target=writer, args=(i,)) for i in range(options['workers'])]
+        readers = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+        writing.set()
+        started = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for thread in readers:
+            thread.join()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {TABLE}')
+        connection.close()
+
+        if not latencies:
+            raise DatabaseError('every transaction failed')
+        latencies.sort()
+        return {
+            'tx': len(latencies) / elapsed,
+            'rows': len(latencies) * options['rows'] / elapsed,
+            'p50': statistics.median(latencies) * 1000,
+            'p95': latencies[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0] * 1000,
+            'errors': sum(errors),
+            'reads': sum(reads) / elapsed,
+        }
@@ -0,0 +1,54 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from hr_system.models import Job
+from hr_system.batch_generation import prepare_job_sessions, generate_for_candidates
+
+class Command(BaseCommand):
+    help = 'Generate interview questions for every parsed candidate of a job that has none yet, concurrently'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, required=True, help='Job ID')
+        parser.add_argument('--concurrency', type=int, default=settings.GEMINI_BATCH_CONCURRENCY,
+                            help='Maximum Gemini requests in flight')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Candidates generated and saved per batch')
+        parser.add_argument('--fresh', action='store_true',
+                            help='Ignore cached Gemini responses')
+
+    def handle(self, *args, **options):
+        try:
+            job = Job.objects.get(id=options['job'])
+        except Job.DoesNotExist:
+            raise CommandError(f"Job {options['job']} does not exist")
+
+        sessions, unparsed = prepare_job_sessions(job)
+        if unparsed:
+            self.stdout.write(self.style.WARNING(f'Skipping {unparsed} candidates whose resume is not parsed yet'))
+        if not sessions:
+            self.stdout.write(self.style.SUCCESS(f'No candidates of "{job.title}" need questions'))
+            return
+
+        self.stdout.write(f'Generating questions for {len(sessions)} candidates of "{job.title}" '
+                          f'with {options["concurrency"]} requests in flight')
+        generated, failed = asyncio.run(self._run(sessions, options))
+
+        self.stdout.write(self.style.SUCCESS(f'Generated questions for {generated} candidates'))
+        for candidate_id, error in failed.items():
+            self.stdout.write(self.style.ERROR(f'Candidate {candidate_id}: {error}'))
+
+    async def _run(self, sessions, options):
+        # One event loop for every batch: the SDK's async client is bound to the loop it was created on
+        generated, failed = 0, {}
+        batch_size = options['batch_size']
+        for start in range(0, len(sessions), batch_size):
+            result = await generate_for_candidates(
+                sessions[start:start + batch_size],
+                concurrency=options['concurrency'],
+                use_cache=not options['fresh']
+            )
+            generated += len(result['generated'])
+            failed.update(result['failed'])
+            self.stdout.write(f'  {min(start + batch_size, len(sessions))}/{len(sessions)} candidates, '
+                              f'{result["questions"]} questions saved')
+        return generated, failed
@@ -0,0 +1,24 @@
+from background_task.models import Task
+from django.core.management.base import BaseCommand
+from hr_system.job_events import prune
+from hr_system.tasks import prune_job_events_task
+
+
+class Command(BaseCommand):
+    help = ('Delete status board events older than SSE_EVENT_RETENTION_HOURS, '
+            'or with --schedule, have the task workers do it every hour')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', action='store_true',
+                            help='Queue an hourly prune task (once) instead of pruning now')
+
+    def handle(self, *args, **options):
+        if not options['schedule']:
+            self.stdout.write(self.style.SUCCESS(f'Pruned {prune()} status board events'))
+            return
+
+        if Task.objects.filter(task_name=prune_job_events_task.name, repeat=Task.HOURLY).exists():
+            self.stdout.write('An hourly prune task is already scheduled')
+            return
+        prune_job_events_task(repeat=Task.HOURLY)
+        self.stdout.write(self.style.SUCCESS('Scheduled an hourly prune task'))
@@ -0,0 +1,88 @@
+import multiprocessing
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from hr_system.workers import work, release_tasks, queue_stats
+
+
+class Command(BaseCommand):
+    help = ('Run background tasks in a pool of worker processes, manual adds before bulk imports '
+            'and round-robin across jobs, reporting queue depth and lag')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.TASK_WORKER_PROCESSES,
+                            help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=settings.TASK_WORKER_BATCH_SIZE,
+                            help='Tasks each worker claims at a time')
+        parser.add_argument('--poll', type=float, default=settings.TASK_WORKER_POLL_SECONDS,
+                            help='Seconds an idle worker waits before looking for tasks again')
+        parser.add_argument('--report-every', type=float, default=settings.TASK_QUEUE_REPORT_SECONDS,
+                            help='Seconds between queue depth and lag reports (0 = never)')
+        parser.add_argument('--report', action='store_true',
+                            help='Print the queue depth and lag once and exit')
+
+    def handle(self, *args, **options):
+        if options['report']:
+            self._report()
+            return
+
+        # Spawned rather than forked: the parent's DB connections and Gemini
+        # client threads must not be shared with the workers
+        context = multiprocessing.get_context('spawn')
+        stop = context.Event()
+        worker_args = (stop, options['batch_size'], options['poll'])
+        workers = {}
+        stopping = []
+
+        def start_worker(slot):
+            # Not daemonic: tasks start their own processes (the PDF extraction pool)
+            process = context.Process(target=work, args=worker_args, name=f'worker-{slot}')
+            process.start()
+            workers[slot] = process
+
+        def shutdown(signum, frame):
+            # Only note it here: setting the Event from a signal handler can
+            # deadlock on its lock when the signal lands inside stop.wait()
+            stopping.append(signum)
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(f"--- [WORKERS] Starting {options['processes']} workers ---")
+        for slot in range(options['processes']):
+            start_worker(slot)
+
+        next_report = time.monotonic()
+        while not stopping:
+            for slot, process in list(workers.items()):
+                if not process.is_alive():
+                    close_old_connections()
+                    released = release_tasks(str(process.pid))
+                    self.stdout.write(self.style.WARNING(
+                        f"--- [WORKERS] Worker {process.pid} exited ({process.exitcode}), "
+                        f"released {released} claimed tasks, restarting ---"
+                    ))
+                    start_worker(slot)
+            if options['report_every'] and time.monotonic() >= next_report:
+                self._report()
+                next_report = time.monotonic() + options['report_every']
+            time.sleep(1)
+
+        stop.set()
+        self.stdout.write("--- [WORKERS] Stopping workers after their current task ---")
+        for process in workers.values():
+            process.join()
+        self.stdout.write(self.style.SUCCESS("--- [WORKERS] All workers stopped ---"))
+
+    def _report(self):
+        close_old_connections()
+        stats = queue_stats()
+        self.stdout.write(
+            f"--- [WORKERS] {stats['ready']} ready, {stats['running']} running, {stats['scheduled']} scheduled ---"
+        )
+        for row in stats['by_priority']:
+            self.stdout.write(f"    priority {row['priority']:>4}: {row['depth']:>6} ready, oldest {row['lag_seconds']}s")
+        for row in stats['by_queue'][:10]:
+            self.stdout.write(f"    {row['queue'] or '(no queue)':<16} {row['depth']:>6} ready, oldest {row['lag_seconds']}s")
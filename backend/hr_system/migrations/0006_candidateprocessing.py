@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0005_candidateimport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateProcessing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pipeline_stage', models.CharField(choices=[('PARSE', 'Resume Parse'), ('METADATA', 'Metadata Extraction'), ('SESSION', 'Session & Link'), ('QUESTIONS', 'Question Generation'), ('EMAIL', 'Invitation Email'), ('DONE', 'Done')], default='PARSE', max_length=20)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('RETRYING', 'Retrying'), ('FAILED', 'Failed'), ('DONE', 'Done')], default='PENDING', max_length=10)),
+                ('attempts', models.IntegerField(default=0, help_text='Attempts made at the current stage')),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('failed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='processing', to='hr_system.candidate')),
+            ],
+        ),
+    ]
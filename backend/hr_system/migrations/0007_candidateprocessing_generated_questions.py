@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0006_candidateprocessing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidateprocessing',
+            name='generated_questions',
+            field=models.JSONField(blank=True, default=dict, help_text='Questions from combined generation awaiting the QUESTIONS stage'),
+        ),
+    ]
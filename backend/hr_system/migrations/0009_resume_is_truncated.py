@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0008_resume_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='is_truncated',
+            field=models.BooleanField(default=False, help_text='PDF extraction stopped at the deadline, page cap or memory limit'),
+        ),
+    ]
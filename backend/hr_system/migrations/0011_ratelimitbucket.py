@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0010_llmcacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('request_tokens', models.FloatField(default=0)),
+                ('token_tokens', models.FloatField(default=0)),
+                ('refilled_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rate_scale', models.FloatField(default=1.0, help_text='AIMD multiplier applied to the configured limits')),
+                ('throttled_at', models.DateTimeField(blank=True, null=True)),
+                ('throttle_count', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
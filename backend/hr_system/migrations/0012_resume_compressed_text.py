@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0011_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resume',
+            name='compressed_text',
+            field=models.TextField(blank=True, default='', help_text='Job-relevant sections of raw_text within the prompt token budget'),
+        ),
+    ]
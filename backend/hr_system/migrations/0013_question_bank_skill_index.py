@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:09
+
+import json
+
+from django.db import migrations, models
+
+
+def index_bank_skills(apps, schema_editor):
+    """Fills skill_set from the existing comma-separated/JSON `skills` text."""
+    Skill = apps.get_model('hr_system', 'Skill')
+    CodingQuestionBank = apps.get_model('hr_system', 'CodingQuestionBank')
+
+    def names_for(skills):
+        try:
+            names = json.loads(skills)
+            if not isinstance(names, list):
+                names = [str(names)]
+        except (TypeError, ValueError):
+            names = (skills or "").split(",")
+        return {" ".join(n.lower().split()) for n in names if n and n.strip()}
+
+    entries = [(q, names_for(q.skills)) for q in CodingQuestionBank.objects.all()]
+    all_names = set().union(*(names for _, names in entries)) if entries else set()
+    Skill.objects.bulk_create([Skill(name=n) for n in all_names], ignore_conflicts=True)
+    skill_ids = dict(Skill.objects.filter(name__in=all_names).values_list('name', 'id'))
+
+    Through = CodingQuestionBank.skill_set.through
+    Through.objects.bulk_create([
+        Through(codingquestionbank_id=q.id, skill_id=skill_ids[n])
+        for q, names in entries for n in names
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0012_resume_compressed_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='codingquestionbank',
+            name='difficulty',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='codingquestionbank',
+            name='role_type',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='codingquestionbank',
+            name='skill_set',
+            field=models.ManyToManyField(blank=True, related_name='coding_questions', to='hr_system.skill'),
+        ),
+        migrations.RunPython(index_bank_skills, migrations.RunPython.noop),
+    ]
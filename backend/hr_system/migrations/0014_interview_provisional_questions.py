@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0013_question_bank_skill_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewlink',
+            name='opened_at',
+            field=models.DateTimeField(blank=True, help_text='First time the candidate opened the link', null=True),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='questions_provisional',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0014_interview_provisional_questions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='status_changed_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['job', 'status_changed_at'], name='hr_system_c_job_id_23947c_idx'),
+        ),
+    ]
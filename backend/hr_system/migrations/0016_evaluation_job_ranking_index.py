@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_evaluation_jobs(apps, schema_editor):
+    """Copies each existing evaluation's job from its session's candidate."""
+    Evaluation = apps.get_model('hr_system', 'Evaluation')
+    InterviewSession = apps.get_model('hr_system', 'InterviewSession')
+    Evaluation.objects.filter(job__isnull=True).update(job_id=Subquery(
+        InterviewSession.objects.filter(pk=OuterRef('session_id')).values('candidate__job_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0015_candidate_status_changed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evaluation',
+            name='job',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='evaluations', to='hr_system.job'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['job', '-overall_score'], name='hr_system_e_job_id_d045ba_idx'),
+        ),
+        migrations.RunPython(fill_evaluation_jobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def build_job_stats(apps, schema_editor):
+    """Computes the stats row of every existing job (the same queries as job_stats.rebuild)."""
+    Job = apps.get_model('hr_system', 'Job')
+    JobStats = apps.get_model('hr_system', 'JobStats')
+    statuses = {'NOT_ATTEMPTED': 'not_attempted', 'IN_PROGRESS': 'in_progress',
+                'COMPLETED': 'completed', 'EXPIRED': 'expired'}
+    for job in Job.objects.all():
+        values = job.candidates.aggregate(
+            candidates=Count('id'),
+            processing_failures=Count('id', filter=Q(processing__status='FAILED')),
+            **{field: Count('id', filter=Q(session__status=status)) for status, field in statuses.items()}
+        )
+        values.update(job.evaluations.aggregate(
+            evaluated=Count('id'),
+            score_total=Coalesce(Sum('overall_score'), Value(0.0)),
+            max_score=Max('overall_score'),
+            cheating_flags=Count('id', filter=Q(cheating_flag=True)),
+        ))
+        JobStats.objects.update_or_create(job=job, defaults=values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0016_evaluation_job_ranking_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobStats',
+            fields=[
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='hr_system.job')),
+                ('candidates', models.IntegerField(default=0)),
+                ('not_attempted', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('expired', models.IntegerField(default=0)),
+                ('evaluated', models.IntegerField(default=0)),
+                ('score_total', models.FloatField(default=0.0)),
+                ('max_score', models.FloatField(blank=True, null=True)),
+                ('cheating_flags', models.IntegerField(default=0)),
+                ('processing_failures', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_job_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0017_job_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('candidate', 'Candidate added'), ('processing', 'Processing'), ('status', 'Interview status')], max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='hr_system.candidate')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='hr_system.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'id'], name='hr_system_c_job_id_d87e21_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('hr_system', '0018_candidate_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidateprocessing',
+            index=models.Index(fields=['status', '-failed_at'], name='hr_system_c_status_98dd6d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cheatinglog',
+            index=models.Index(fields=['session', 'timestamp'], name='hr_system_c_session_10344d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hruser',
+            index=models.Index(fields=['email'], name='hr_system_h_email_bd06b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['session', 'question_type'], name='hr_system_q_session_58daa0_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0019_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidateprocessing',
+            name='priority',
+            field=models.IntegerField(default=0, help_text='Task priority of every stage: manual adds outrank bulk imports (see workers.py)'),
+        ),
+    ]
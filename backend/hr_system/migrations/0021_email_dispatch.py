@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0020_candidate_processing_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emaillog',
+            name='body',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='emaillog',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When a PENDING email is due to be (re)sent'),
+        ),
+        migrations.AddField(
+            model_name='emaillog',
+            name='subject',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='hr_system_e_status_49a676_idx'),
+        ),
+    ]
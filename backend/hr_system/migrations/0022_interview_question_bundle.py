@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0021_email_dispatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='question_bundle',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+    ]
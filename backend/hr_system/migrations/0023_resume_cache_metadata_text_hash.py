@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0022_interview_question_bundle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumecacheentry',
+            name='metadata_text_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
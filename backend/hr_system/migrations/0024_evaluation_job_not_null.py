@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_system', '0023_resume_cache_metadata_text_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='evaluation',
+            name='job',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='evaluations', to='hr_system.job'),
+        ),
+    ]
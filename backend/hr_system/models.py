@@ -7,7 +7,9 @@ class HRUser(AbstractUser):
     """
     HR User model. HR accounts are created by Super Admin.
     """
-    pass
+    class Meta(AbstractUser.Meta):
+        # LoginView also accepts the email address
+        indexes = [models.Index(fields=['email'])]
 
 class Job(models.Model):
     title = models.CharField(max_length=255)
@@ -34,9 +36,13 @@ class Candidate(models.Model):
     resume_file = models.FileField(upload_to='resumes/', null=True, blank=True)
     resume_url = models.URLField(max_length=500, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on save and whenever the candidate's session or link changes (see
+    # signals.py); drives `since=` and the ETag of the job status endpoint
+    status_changed_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('job', 'email')
+        indexes = [models.Index(fields=['job', 'status_changed_at'])]
 
     def __str__(self):
         return f"{self.name} - {self.job.title}"
@@ -45,8 +51,16 @@ class Resume(models.Model):
     candidate = models.OneToOneField(Candidate, on_delete=models.CASCADE, related_name='resume_data')
     raw_text = models.TextField()
     extracted_metadata = models.JSONField(default=dict)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, help_text="ResumeCacheEntry key of the parsed content")
+    is_truncated = models.BooleanField(default=False, help_text="PDF extraction stopped at the deadline, page cap or memory limit")
+    compressed_text = models.TextField(blank=True, default='', help_text="Job-relevant sections of raw_text within the prompt token budget")
     parsed_at = models.DateTimeField(auto_now_add=True)
 
+    @property
+    def prompt_text(self):
+        """Resume text to send to Gemini: the compressed form when there is one."""
+        return self.compressed_text or self.raw_text
+
 class InterviewSession(models.Model):
     STATUS_CHOICES = [
         ('NOT_ATTEMPTED', 'Not Attempted'),
@@ -64,6 +78,12 @@ class InterviewSession(models.Model):
     recording_time = models.IntegerField()
     coding_time = models.IntegerField()
     
+    # Set when questions came from the bank/templates because Gemini missed the
+    # generation deadline; cleared once personalized questions replace them
+    questions_provisional = models.BooleanField(default=False)
+    # Candidate-facing config and questions as JSON, rebuilt when questions change (see interview_bundle.py)
+    question_bundle = models.TextField(null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -73,16 +93,56 @@ class InterviewLink(models.Model):
     token = models.CharField(max_length=100, unique=True, default=uuid.uuid4)
     expires_at = models.DateTimeField()
     is_used = models.BooleanField(default=False)
+    opened_at = models.DateTimeField(null=True, blank=True, help_text="First time the candidate opened the link")
 
     @property
     def is_expired(self):
         return timezone.now() > self.expires_at or self.is_used
 
+    def mark_opened(self):
+        """Records the first open; returns True if this call was the first."""
+        now = timezone.now()
+        first = InterviewLink.objects.filter(pk=self.pk, opened_at__isnull=True).update(opened_at=now) == 1
+        if first:
+            self.opened_at = now
+        return first
+
+class Skill(models.Model):
+    """A normalized skill name, used to index CodingQuestionBank entries."""
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def normalize(name):
+        return " ".join((name or "").lower().split())
+
 class CodingQuestionBank(models.Model):
     text = models.TextField()
-    difficulty = models.CharField(max_length=50)
+    difficulty = models.CharField(max_length=50, db_index=True)
     skills = models.TextField() # CSV or JSON
-    role_type = models.CharField(max_length=100)
+    role_type = models.CharField(max_length=100, db_index=True)
+    # Indexed form of `skills`, kept in sync on save (see signals.py)
+    skill_set = models.ManyToManyField(Skill, related_name='coding_questions', blank=True)
+
+    def skill_names(self):
+        """Normalized skill names from the `skills` field (comma-separated or a JSON list)."""
+        import json
+        try:
+            names = json.loads(self.skills)
+            if not isinstance(names, list):
+                names = [str(names)]
+        except (TypeError, ValueError):
+            names = (self.skills or "").split(",")
+        return sorted({Skill.normalize(n) for n in names if Skill.normalize(n)})
+
+    def sync_skills(self):
+        """Rebuilds skill_set from the `skills` field."""
+        names = self.skill_names()
+        existing = set(Skill.objects.filter(name__in=names).values_list('name', flat=True))
+        Skill.objects.bulk_create([Skill(name=n) for n in names if n not in existing], ignore_conflicts=True)
+        self.skill_set.set(Skill.objects.filter(name__in=names))
 
 class Question(models.Model):
     TYPE_CHOICES = [('ORAL', 'Oral'), ('CODING', 'Coding')]
@@ -100,6 +160,9 @@ class Question(models.Model):
     generated_at = models.DateTimeField(auto_now_add=True, help_text="When this question was generated")
     is_dynamic = models.BooleanField(default=True, help_text="Whether this was dynamically generated")
 
+    class Meta:
+        indexes = [models.Index(fields=['session', 'question_type'])]
+
 class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
     response_text = models.TextField(null=True, blank=True)
@@ -109,21 +172,210 @@ class Answer(models.Model):
 
 class Evaluation(models.Model):
     session = models.OneToOneField(InterviewSession, on_delete=models.CASCADE, related_name='evaluation')
+    # The session's job, copied on save so a job's ranking is one indexed range scan
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='evaluations', editable=False)
     overall_score = models.FloatField(default=0.0)
     summary = models.TextField()
     cheating_flag = models.BooleanField(default=False)
     rank = models.IntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['job', '-overall_score'])]
+
+    def save(self, *args, **kwargs):
+        if self.job_id is None:
+            self.job_id = InterviewSession.objects.filter(pk=self.session_id).values_list('candidate__job_id', flat=True).first()
+        super().save(*args, **kwargs)
+
 class CheatingLog(models.Model):
     session = models.ForeignKey(InterviewSession, on_delete=models.CASCADE, related_name='cheating_logs')
     event_type = models.CharField(max_length=100) # e.g., 'tab_switch', 'camera_disabled'
     timestamp = models.DateTimeField(auto_now_add=True)
     details = models.TextField()
 
+    class Meta:
+        indexes = [models.Index(fields=['session', 'timestamp'])]
+
+class CandidateEvent(models.Model):
+    """
+    A change on a job's status board (new candidate, processing stage, session
+    status or link), streamed to the InterviewStatus page over SSE (see job_events.py).
+    """
+    KIND_CHOICES = [('candidate', 'Candidate added'), ('processing', 'Processing'), ('status', 'Interview status')]
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='events')
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['job', 'id'])]
+
 class EmailLog(models.Model):
+    """An outgoing email, sent by the dispatcher in email_dispatch.py."""
     STATUS_CHOICES = [('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')]
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='email_logs')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    subject = models.CharField(max_length=255, blank=True, default='')
+    body = models.TextField(blank=True, default='')
     retry_count = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="When a PENDING email is due to be (re)sent")
     last_error = models.TextField(null=True, blank=True)
     sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+class CandidateImport(models.Model):
+    """
+    A CSV roster uploaded for asynchronous ingestion.
+    The file is streamed row by row by a background task that records progress here.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='imports')
+    file = models.FileField(upload_to='imports/')
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+
+    rows_processed = models.IntegerField(default=0)
+    rows_succeeded = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="Per-row errors (capped)")
+    last_error = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('job', 'idempotency_key')
+
+class CandidateProcessing(models.Model):
+    """
+    Checkpoint of a candidate's staged processing pipeline (see pipeline.py).
+    Candidates whose stage exhausted its retries stay FAILED (the dead-letter list)
+    until they are retried from pipeline_stage.
+    """
+    STAGE_CHOICES = [
+        ('PARSE', 'Resume Parse'),
+        ('METADATA', 'Metadata Extraction'),
+        ('SESSION', 'Session & Link'),
+        ('QUESTIONS', 'Question Generation'),
+        ('EMAIL', 'Invitation Email'),
+        ('DONE', 'Done'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('RETRYING', 'Retrying'),
+        ('FAILED', 'Failed'),
+        ('DONE', 'Done'),
+    ]
+    candidate = models.OneToOneField(Candidate, on_delete=models.CASCADE, related_name='processing')
+    pipeline_stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default='PARSE')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0, help_text="Attempts made at the current stage")
+    last_error = models.TextField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    generated_questions = models.JSONField(default=dict, blank=True, help_text="Questions from combined generation awaiting the QUESTIONS stage")
+    priority = models.IntegerField(default=0, help_text="Task priority of every stage: manual adds outrank bulk imports (see workers.py)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # The dead-letter list: status='FAILED' newest first
+        indexes = [models.Index(fields=['status', '-failed_at'])]
+
+class JobStats(models.Model):
+    """
+    Dashboard aggregates for one job, adjusted incrementally by signals and
+    rebuilt by `manage.py rebuild_job_stats` (see job_stats.py).
+    """
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    candidates = models.IntegerField(default=0)
+    # Candidates by session status; candidates without a session are still processing
+    not_attempted = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    expired = models.IntegerField(default=0)
+    evaluated = models.IntegerField(default=0)
+    score_total = models.FloatField(default=0.0)
+    max_score = models.FloatField(null=True, blank=True)
+    cheating_flags = models.IntegerField(default=0)
+    processing_failures = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for job {self.job_id}"
+
+    @property
+    def processing(self):
+        return max(self.candidates - self.not_attempted - self.in_progress - self.completed - self.expired, 0)
+
+    @property
+    def average_score(self):
+        return self.score_total / self.evaluated if self.evaluated else None
+
+class CacheCounter(models.Model):
+    """Hit/miss/eviction counters for a named cache, shared across worker processes."""
+    name = models.CharField(max_length=50, unique=True)
+    hits = models.BigIntegerField(default=0)
+    misses = models.BigIntegerField(default=0)
+    evictions = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def increment(cls, name, field, amount=1):
+        """Atomically bumps one counter, creating the row on first use."""
+        if not cls.objects.filter(name=name).update(**{field: models.F(field) + amount}):
+            cls.objects.get_or_create(name=name)
+            cls.objects.filter(name=name).update(**{field: models.F(field) + amount})
+
+class ResumeCacheEntry(models.Model):
+    """
+    Parsed resume text and extracted metadata, keyed by a SHA-256 of the resume
+    bytes (uploads) or of the normalized URL plus its ETag/Last-Modified (links).
+    Shared across jobs so repeat applicants skip the parse and metadata call.
+    """
+    SOURCE_CHOICES = [('FILE', 'Uploaded File'), ('URL', 'External Link')]
+    content_hash = models.CharField(max_length=64, unique=True)
+    source = models.CharField(max_length=4, choices=SOURCE_CHOICES)
+    raw_text = models.TextField()
+    extracted_metadata = models.JSONField(default=dict, blank=True)
+    # SHA-256 of the prompt text the metadata was extracted from (compressed per job)
+    metadata_text_hash = models.CharField(max_length=64, blank=True, default='')
+    size_bytes = models.IntegerField(default=0)
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+class LLMCacheEntry(models.Model):
+    """Persistent tier of the Gemini response cache (see llm_cache.py)."""
+    key = models.CharField(max_length=64, unique=True, help_text="SHA-256 of model name, prompt and generation parameters")
+    model_name = models.CharField(max_length=100)
+    response_text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+class RateLimitBucket(models.Model):
+    """
+    Shared token-bucket state for an external API (see rate_limiter.py).
+    Every worker process reserves capacity from the same row.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    request_tokens = models.FloatField(default=0)
+    token_tokens = models.FloatField(default=0)
+    refilled_at = models.DateTimeField(default=timezone.now)
+    rate_scale = models.FloatField(default=1.0, help_text="AIMD multiplier applied to the configured limits")
+    throttled_at = models.DateTimeField(null=True, blank=True)
+    throttle_count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} (x{self.rate_scale:.2f})"
@@ -0,0 +1,192 @@
+"""
+Bounded PDF text extraction in a worker process pool.
+
+pypdf runs in child processes so a malformed or huge PDF cannot hang or
+bloat the background worker that asked for it. Every document gets a
+deadline and a page cap, each child runs under an address-space limit and
+is recycled after a number of tasks, and the pages of large documents are
+split into chunks that are extracted in parallel. When a limit is hit the
+caller gets whatever pages finished, flagged as truncated.
+
+A ProcessPoolExecutor can't kill one worker without failing every pending
+future, so a deadline miss retires the pool instead: new callers get a
+fresh one, callers already waiting on the old one keep their futures, and
+its workers (including the one stuck on the expired document) are killed
+once the last of those callers is done.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import multiprocessing
+from django.conf import settings
+
+PdfExtractionResult = namedtuple(
+    'PdfExtractionResult', ['text', 'pages_total', 'pages_extracted', 'truncated', 'reason']
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# --- Child process side (must not touch Django) ---
+
+def _limit_child_memory(max_bytes):
+    """Pool initializer: caps the child's address space where the OS supports it."""
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+    except (ImportError, ValueError, OSError):
+        # No resource module on Windows; the deadline still applies
+        pass
+
+
+def _count_pages(path):
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_pages(path, start, stop):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    texts = []
+    for page in reader.pages[start:stop]:
+        texts.append(page.extract_text() or "")
+    return texts
+
+
+# --- Parent side ---
+
+class _WorkerPool:
+    """The process pool and how many extract_pdf_text calls are using it."""
+
+    def __init__(self):
+        # spawn: children must not inherit the worker's DB connections, and
+        # max_tasks_per_child is incompatible with fork
+        self.executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_limit_child_memory,
+            initargs=(settings.PDF_EXTRACTION_MEMORY_LIMIT_MB * 1024 * 1024,),
+            max_tasks_per_child=settings.PDF_EXTRACTION_TASKS_PER_CHILD,
+        )
+        self.callers = 0
+        self.retired = False
+
+    def terminate(self):
+        """Kills the workers, stuck ones included, and shuts the executor down."""
+        for process in list((getattr(self.executor, '_processes', None) or {}).values()):
+            process.terminate()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _acquire_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _WorkerPool()
+        _pool.callers += 1
+        return _pool
+
+
+def _release_pool(pool, retire=False):
+    """
+    Ends a caller's use of the pool. retire=True (after a deadline miss or
+    a broken pool) hands new callers a fresh pool; a retired pool is
+    terminated when its last caller releases it.
+    """
+    global _pool
+    with _pool_lock:
+        pool.callers -= 1
+        if retire:
+            pool.retired = True
+            if _pool is pool:
+                _pool = None
+        finished = pool.retired and pool.callers == 0
+    if finished:
+        pool.terminate()
+
+
+def _reset_pool():
+    """Terminates the current pool, whoever is using it (for shutdown and tests)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.terminate()
+
+
+def _failure_reason(exc):
+    if isinstance(exc, (MemoryError, BrokenProcessPool)):
+        return 'memory_limit'
+    return 'error'
+
+
+def extract_pdf_text(path, deadline=None, max_pages=None):
+    """
+    Extracts text from a PDF within a deadline (seconds) and page cap.
+    Returns a PdfExtractionResult; `truncated` is set and `reason` explains
+    why ('page_limit', 'deadline', 'memory_limit' or 'error') when not every
+    page made it into `text`.
+    """
+    deadline = settings.PDF_EXTRACTION_DEADLINE_SECONDS if deadline is None else deadline
+    max_pages = settings.PDF_EXTRACTION_MAX_PAGES if max_pages is None else max_pages
+    chunk_size = settings.PDF_EXTRACTION_PAGES_PER_CHUNK
+    deadline_at = time.monotonic() + deadline
+
+    def remaining():
+        return max(deadline_at - time.monotonic(), 0)
+
+    pool = _acquire_pool()
+    try:
+        pages_total = pool.executor.submit(_count_pages, path).result(timeout=remaining())
+    except FutureTimeoutError:
+        _release_pool(pool, retire=True)
+        return PdfExtractionResult('', 0, 0, True, 'deadline')
+    except BrokenProcessPool:
+        _release_pool(pool, retire=True)
+        raise MemoryError("PDF worker exceeded its memory limit while opening the document")
+    except BaseException:
+        _release_pool(pool)
+        raise
+
+    pages = min(pages_total, max_pages)
+    reason = 'page_limit' if pages < pages_total else None
+
+    chunks = {}
+    try:
+        for start in range(0, pages, chunk_size):
+            future = pool.executor.submit(_extract_pages, path, start, min(start + chunk_size, pages))
+            chunks[future] = start
+    except BrokenProcessPool:
+        _release_pool(pool, retire=True)
+        raise MemoryError("PDF worker exceeded its memory limit")
+
+    done, not_done = wait(chunks, timeout=remaining())
+    texts = {}
+    broken = False
+    for future in done:
+        try:
+            texts[chunks[future]] = future.result()
+        except Exception as e:
+            reason = reason or _failure_reason(e)
+            broken = broken or isinstance(e, BrokenProcessPool)
+
+    if not_done:
+        reason = reason or 'deadline'
+        for future in not_done:
+            # Chunks no worker has picked up yet never run
+            future.cancel()
+    _release_pool(pool, retire=broken or bool(not_done))
+
+    page_texts = [text for start in sorted(texts) for text in texts[start]]
+    return PdfExtractionResult(
+        text="".join(page_texts),
+        pages_total=pages_total,
+        pages_extracted=len(page_texts),
+        truncated=len(page_texts) < pages_total,
+        reason=reason,
+    )
@@ -0,0 +1,222 @@
+"""
+Buffered pipeline writes, saved in one transaction per flush.
+
+A pipeline run used to commit as it went: the Resume with update_or_create,
+the session and link with get_or_create, each question set, every
+checkpoint and every scheduled task on its own, and on SQLite each commit is
+an fsync. The stages now record what they produce on a CandidateWrites, and
+flush() saves the writes of one or many candidates together: new rows with
+bulk_create, changed ones with bulk_update, the CandidateProcessing
+checkpoints, then the deferred calls (scheduling the next tasks, resume
+cache stores), in a single transaction. WriteBatch groups cheap writes of
+many candidates (sessions created in bulk, say) and flushes them every
+PIPELINE_BATCH_SIZE candidates; a pipeline run is flushed as soon as it ends.
+
+bulk_create sends no post_save, so flush() applies what the InterviewSession
+and InterviewLink handlers in signals.py would have: the JobStats counters,
+the status board events and Candidate.status_changed_at. Sessions that
+gained questions get their candidate interview bundle rebuilt
+(interview_bundle.py) in the same transaction.
+"""
+
+import logging
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from . import job_stats, job_events, interview_bundle
+from .models import Candidate, Resume, InterviewSession, InterviewLink, Question
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_FIELDS = [
+    'pipeline_stage', 'status', 'attempts', 'last_error', 'failed_at', 'generated_questions', 'updated_at'
+]
+
+
+class CandidateWrites:
+    """The rows a pipeline run creates or changes for one candidate, unsaved until flush()."""
+
+    def __init__(self, candidate, processing=None, session=None):
+        self.candidate = candidate
+        self.processing = processing
+        self.started_stage = processing.pipeline_stage if processing else None
+        self.resume_fields = set()
+        self.session_fields = set()
+        self.questions = []
+        self.deferred = []
+        self._resume = None
+        # A stored session the caller already loaded
+        self._session = session
+        self._link = None
+
+    def get_resume(self):
+        """The candidate's Resume, pending or stored; raises Resume.DoesNotExist if there is none."""
+        if self._resume is None:
+            self._resume = Resume.objects.get(candidate=self.candidate)
+        return self._resume
+
+    def update_resume(self, **fields):
+        """Sets fields on the candidate's Resume, creating it if needed."""
+        if self._resume is None:
+            self._resume = Resume.objects.filter(candidate=self.candidate).first() or Resume(candidate=self.candidate)
+        for name, value in fields.items():
+            setattr(self._resume, name, value)
+        self.resume_fields.update(fields)
+
+    def get_session(self):
+        """The candidate's interview session (link loaded), pending or stored."""
+        if self._session is None:
+            self._session = InterviewSession.objects.select_related('link').get(candidate=self.candidate)
+        return self._session
+
+    def ensure_session(self):
+        """The candidate's interview session, with a new session and link if they don't exist yet."""
+        if self._session is None:
+            self._session = (
+                InterviewSession.objects.select_related('link').filter(candidate=self.candidate).first()
+            )
+        if self._session is None:
+            job = self.candidate.job
+            # Config snapshot: immutable even if the Job configuration changes later
+            self._session = InterviewSession(
+                candidate=self.candidate,
+                oral_question_count=job.oral_question_count,
+                coding_question_count=job.coding_question_count,
+                thinking_time=job.thinking_time,
+                recording_time=job.recording_time,
+                coding_time=job.coding_time
+            )
+        elif hasattr(self._session, 'link'):
+            return self._session
+        if self._link is None:
+            self._link = InterviewLink(
+                session=self._session,
+                token=str(uuid.uuid4()),
+                expires_at=timezone.now() + timedelta(days=7)
+            )
+        return self._session
+
+    def update_session(self, **fields):
+        session = self.get_session()
+        for name, value in fields.items():
+            setattr(session, name, value)
+        self.session_fields.update(fields)
+
+    def question_types(self):
+        """Question types the session has, stored or pending."""
+        session = self.get_session()
+        types = {question.question_type for question in self.questions}
+        if session.pk is not None:
+            types.update(session.questions.values_list('question_type', flat=True).distinct())
+        return types
+
+    def add_questions(self, questions):
+        self.questions.extend(questions)
+
+    def defer(self, fn, *args, **kwargs):
+        """Calls fn(*args, **kwargs) inside the flush transaction, once the rows are saved."""
+        self.deferred.append((fn, args, kwargs))
+
+    def _new_rows(self):
+        rows = [self._resume, self._session, self._link] + self.questions
+        return [row for row in rows if row is not None and row.pk is None]
+
+
+def _save_rows(model, rows):
+    """bulk_create the new rows of (row, changed fields) pairs and bulk_update the others; returns the new rows."""
+    new = [row for row, _ in rows if row.pk is None]
+    changed = defaultdict(list)
+    for row, fields in rows:
+        if row.pk is not None and fields:
+            changed[tuple(sorted(fields))].append(row)
+    model.objects.bulk_create(new)
+    for fields, group in changed.items():
+        model.objects.bulk_update(group, fields)
+    return new
+
+
+def _announce(new_sessions, new_links, changed_sessions):
+    """What the InterviewSession and InterviewLink post_save handlers would have done."""
+    per_job = Counter((session.candidate.job_id, session.status) for session in new_sessions)
+    for (job_id, status), count in per_job.items():
+        job_stats.adjust(job_id, **{job_stats.SESSION_STATUS_FIELDS[status]: count})
+    job_events.record_new_sessions(new_sessions, new_links)
+    candidate_ids = {session.candidate_id for session in new_sessions + changed_sessions}
+    candidate_ids.update(link.session.candidate_id for link in new_links)
+    if candidate_ids:
+        Candidate.objects.filter(pk__in=candidate_ids).update(status_changed_at=timezone.now())
+
+
+def flush(batch):
+    """Saves the writes of one or more candidates in a single transaction."""
+    batch = list(batch)
+    new_rows = [row for writes in batch for row in writes._new_rows()]
+    changed_sessions = [w._session for w in batch if w._session is not None and w._session.pk and w.session_fields]
+    try:
+        with transaction.atomic():
+            _save_rows(Resume, [(w._resume, w.resume_fields) for w in batch if w._resume is not None])
+            new_sessions = _save_rows(InterviewSession, [
+                (w._session, w.session_fields) for w in batch if w._session is not None
+            ])
+            for writes in batch:
+                # Point links and questions at the now saved session
+                if writes._link is not None:
+                    writes._link.session = writes._session
+                for question in writes.questions:
+                    question.session = writes._session
+            new_links = InterviewLink.objects.bulk_create([w._link for w in batch if w._link is not None])
+            Question.objects.bulk_create([q for w in batch for q in w.questions])
+            interview_bundle.refresh(w._session.pk for w in batch if w.questions)
+            for writes in batch:
+                if writes.processing is not None:
+                    writes.processing.save(update_fields=PROCESSING_FIELDS)
+            _announce(new_sessions, new_links, changed_sessions)
+            for writes in batch:
+                for fn, args, kwargs in writes.deferred:
+                    fn(*args, **kwargs)
+    except Exception:
+        # Rolled back: the rows bulk_create gave ids to were not saved after all
+        for row in new_rows:
+            row.pk = None
+            row._state.adding = True
+        raise
+
+
+class WriteBatch:
+    """
+    Collects CandidateWrites across candidates and flushes them together,
+    every `size` candidates and on flush(). When a batch cannot be saved
+    (a row colliding with one written meanwhile, say), its candidates are
+    saved one at a time so the others still land; the writes that fail
+    again are kept in `failed`.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or settings.PIPELINE_BATCH_SIZE
+        self.pending = []
+        self.failed = []
+
+    def add(self, writes):
+        self.pending.append(writes)
+        if len(self.pending) >= self.size:
+            self.flush()
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        try:
+            flush(pending)
+            return
+        except DatabaseError as e:
+            logger.warning("Could not save a batch of %d candidates, saving them one by one: %s: %s",
+                           len(pending), type(e).__name__, e)
+        for writes in pending:
+            try:
+                flush([writes])
+            except DatabaseError as e:
+                logger.error("Could not save Candidate %s: %s: %s", writes.candidate.id, type(e).__name__, e)
+                self.failed.append(writes)
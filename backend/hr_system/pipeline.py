@@ -0,0 +1,539 @@
+"""
+Staged candidate processing pipeline.
+
+Processing a candidate is split into stages (resume parse, metadata
+extraction, session and link creation, question generation, email). A task
+runs the candidate's stages back to back from its checkpoint, collecting
+their rows on a persistence.CandidateWrites, and saves them together with
+the new checkpoint in one transaction: when every stage succeeds, the
+Resume, session, link and questions land in a single commit. A stage that
+fails is retried with backoff as its own task, the stages before it being
+saved as the checkpoint, so a Gemini hiccup during question generation does
+not redo the PDF parse. process_candidates() runs a chunk of candidates in
+one task, saving each candidate's writes as soon as its run ends.
+
+Progress lives on CandidateProcessing. A stage that exhausts its retries
+leaves the candidate FAILED, which is the dead-letter list; retry_failed()
+requeues those candidates from the stage where they stopped.
+
+With QUESTION_GENERATION_DEADLINE_SECONDS set, the Gemini calls of the
+METADATA and QUESTIONS stages are given that long to answer. A session whose
+questions missed the deadline is filled from the question bank so the email
+goes out right away, and upgrade_provisional_questions() swaps in
+personalized questions later if the candidate hasn't opened the link. A
+Gemini error within the deadline is retried like any other stage failure.
+"""
+
+import logging
+import requests
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from .gemini_service import get_gemini_generator
+from .resume_fetcher import get_resume_fetcher
+from . import resume_cache, job_stats, persistence, interview_bundle
+from .resume_compression import compress_resume
+from .question_bank import provisional_questions
+from .email_dispatch import queue_invitation
+from .workers import PRIORITY_BULK, job_queue, task_options
+from .models import CandidateProcessing, InterviewSession, InterviewLink, Question
+from .tasks import (
+    parse_resume, normalize_resume_url, extract_resume_metadata, fallback_resume_metadata,
+    generate_oral_questions, generate_coding_questions, build_oral_questions, build_coding_questions,
+    run_pipeline_stage_task, enqueue_pipeline_stages, upgrade_questions_task
+)
+
+logger = logging.getLogger(__name__)
+
+StagePolicy = namedtuple('StagePolicy', ['max_attempts', 'backoff_seconds'])
+
+STAGES = ['PARSE', 'METADATA', 'SESSION', 'QUESTIONS', 'EMAIL']
+
+STAGE_POLICIES = {
+    'PARSE': StagePolicy(max_attempts=3, backoff_seconds=10),
+    'METADATA': StagePolicy(max_attempts=5, backoff_seconds=30),
+    'SESSION': StagePolicy(max_attempts=3, backoff_seconds=5),
+    'QUESTIONS': StagePolicy(max_attempts=5, backoff_seconds=30),
+    'EMAIL': StagePolicy(max_attempts=5, backoff_seconds=60),
+}
+
+MAX_BACKOFF_SECONDS = 3600
+
+
+def backoff_delay(stage, attempts):
+    """Exponential backoff in seconds before retrying a stage after `attempts` failures."""
+    policy = STAGE_POLICIES[stage]
+    return min(policy.backoff_seconds * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+# Gemini calls made under the generation deadline run here, so the stage can
+# stop waiting without cancelling the request
+_deadline_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='gemini-deadline')
+
+
+def _call_with_deadline(fn, seconds, is_last_attempt, candidate_id):
+    """
+    Runs fn on a helper thread and waits up to `seconds` for it. Returns
+    (True, result), or (False, None) if it is still running. A call that
+    overruns keeps going; its response still lands in the LLM cache, where
+    the later upgrade picks it up.
+
+    Errors raised by fn propagate so the stage is retried under its policy,
+    except on the stage's final attempt, where they count as a miss and the
+    provisional path takes over.
+    """
+    def run():
+        try:
+            return fn()
+        finally:
+            connections.close_all()
+
+    future = _deadline_executor.submit(run)
+    try:
+        return True, future.result(timeout=seconds)
+    except FutureTimeout:
+        print(f"--- [PIPELINE] Gemini did not answer within {seconds}s ---")
+    except Exception as e:
+        if not is_last_attempt:
+            raise
+        logger.warning("Candidate %s: Gemini call failed on the final attempt, using the provisional path: %s: %s",
+                       candidate_id, type(e).__name__, e)
+    return False, None
+
+
+# --- Stages ---
+# Each stage receives the CandidateProcessing checkpoint, the candidate's
+# CandidateWrites to record its rows on, and whether this is its final
+# attempt. Gemini-backed stages only fall back to template output on the
+# final attempt, so transient API errors are retried first.
+
+def _resume_cache_key(candidate):
+    """Content-addressed cache key for the candidate's resume, or None if it can't be derived."""
+    if candidate.resume_file:
+        return resume_cache.file_cache_key(candidate.resume_file)
+    if candidate.resume_url:
+        final_url = normalize_resume_url(candidate.resume_url)
+        try:
+            # Served from the fetcher's HTTP cache (revalidated if stale), so
+            # parse_resume below does not download the link a second time
+            response = get_resume_fetcher().fetch(final_url)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200 or response.truncated:
+            return None
+        return resume_cache.url_cache_key(final_url, response.validator)
+    return None
+
+
+def _parse_stage(processing, writes, is_last_attempt):
+    candidate = processing.candidate
+    key = _resume_cache_key(candidate)
+    cached = resume_cache.lookup(key)
+
+    if cached:
+        print(f"--- [PIPELINE] Resume cache hit for Candidate {candidate.id} ---")
+        resume_text, truncated = cached.raw_text, False
+    else:
+        parsed = parse_resume(candidate)
+        resume_text, truncated = parsed.text, parsed.truncated
+        if parsed.parsed_ok and not parsed.truncated:
+            writes.defer(resume_cache.store, key, 'FILE' if candidate.resume_file else 'URL', resume_text)
+        else:
+            # Never cache error/warning text or a partial parse in place of a resume
+            key = None
+
+    job = candidate.job
+    writes.update_resume(
+        raw_text=resume_text,
+        compressed_text=compress_resume(resume_text, job.required_skills, job.description),
+        content_hash=key,
+        is_truncated=truncated
+    )
+
+
+def _miss_metadata_deadline(processing, writes, cached_metadata):
+    """Regex metadata for now; the QUESTIONS stage then goes straight to the question bank."""
+    resume = writes.get_resume()
+    writes.update_resume(
+        extracted_metadata=cached_metadata or fallback_resume_metadata(resume.prompt_text, processing.candidate)
+    )
+    processing.generated_questions = {'deadline_missed': True}
+
+
+def _metadata_stage(processing, writes, is_last_attempt):
+    candidate = processing.candidate
+    resume = writes.get_resume()
+    cached_metadata = resume_cache.get_metadata(resume.content_hash, resume.prompt_text)
+    deadline = settings.QUESTION_GENERATION_DEADLINE_SECONDS
+
+    if settings.GEMINI_COMBINED_GENERATION:
+        # One round trip for metadata and both question sets; the questions are
+        # checkpointed here until the session exists to attach them to.
+        job = candidate.job
+        generate_bundle = lambda: get_gemini_generator().generate_interview_bundle(
+            jd_text=job.description,
+            resume_text=resume.prompt_text,
+            candidate_name=candidate.name,
+            experience_level=job.experience_level,
+            required_skills=job.required_skills,
+            num_oral=job.oral_question_count,
+            num_coding=job.coding_question_count,
+            job_id=job.id
+        )
+        if deadline:
+            finished, bundle = _call_with_deadline(generate_bundle, deadline, is_last_attempt, candidate.id)
+            if not finished:
+                _miss_metadata_deadline(processing, writes, cached_metadata)
+                return
+        else:
+            try:
+                bundle = generate_bundle()
+            except Exception:
+                if not is_last_attempt:
+                    raise
+                # The separate calls below fall back on this final attempt
+                bundle = None
+        if bundle:
+            writes.update_resume(extracted_metadata=cached_metadata or bundle['metadata'])
+            if not cached_metadata:
+                writes.defer(resume_cache.store_metadata, resume.content_hash, resume.prompt_text, bundle['metadata'])
+            processing.generated_questions = {
+                'oral': bundle['oral_questions'],
+                'coding': bundle['coding_questions']
+            }
+            return
+
+    if cached_metadata:
+        # Repeat applicant: skip the LLM metadata call entirely
+        writes.update_resume(extracted_metadata=cached_metadata)
+        return
+
+    if deadline and get_gemini_generator().is_available():
+        finished, metadata = _call_with_deadline(
+            lambda: get_gemini_generator().extract_resume_metadata(resume.prompt_text), deadline, is_last_attempt, candidate.id
+        )
+        if not finished:
+            _miss_metadata_deadline(processing, writes, cached_metadata)
+            return
+    else:
+        metadata = extract_resume_metadata(resume.prompt_text, candidate, allow_fallback=is_last_attempt)
+    writes.update_resume(extracted_metadata=metadata)
+    if 'parsing_status' not in metadata:
+        # Only Gemini output is shared; the regex fallback marks itself with parsing_status
+        writes.defer(resume_cache.store_metadata, resume.content_hash, resume.prompt_text, metadata)
+
+
+def _session_stage(processing, writes, is_last_attempt):
+    writes.ensure_session()
+
+
+def _personalized_questions(session, job, resume_text, question_types):
+    """Gemini question dicts by type ('ORAL'/'CODING'); errors propagate instead of falling back."""
+    generator = get_gemini_generator()
+    questions = {}
+    if 'ORAL' in question_types:
+        questions['ORAL'] = generator.generate_oral_questions(
+            jd_text=job.description,
+            resume_text=resume_text,
+            candidate_name=session.candidate.name,
+            experience_level=job.experience_level,
+            required_skills=job.required_skills,
+            num_questions=session.oral_question_count,
+            allow_fallback=False,
+            job_id=job.id
+        )
+    if 'CODING' in question_types:
+        questions['CODING'] = generator.generate_coding_questions(
+            jd_text=job.description,
+            resume_text=resume_text,
+            experience_level=job.experience_level,
+            required_skills=job.required_skills,
+            num_questions=session.coding_question_count,
+            allow_fallback=False,
+            job_id=job.id
+        )
+    return questions
+
+
+def _questions_within_deadline(writes, job, question_types, deadline_missed, is_last_attempt):
+    """
+    Waits up to QUESTION_GENERATION_DEADLINE_SECONDS for Gemini. Past that,
+    the missing types are filled from the question bank and templates, and
+    an upgrade to personalized questions is scheduled.
+    """
+    session = writes.get_session()
+    resume = writes.get_resume()
+    resume_text = resume.prompt_text
+    finished = False
+    if not deadline_missed:
+        finished, questions = _call_with_deadline(
+            lambda: _personalized_questions(session, job, resume_text, question_types),
+            settings.QUESTION_GENERATION_DEADLINE_SECONDS, is_last_attempt, session.candidate_id
+        )
+    if finished:
+        generated_by = 'gemini' if get_gemini_generator().is_available() else 'fallback'
+        if 'ORAL' in questions:
+            writes.add_questions(build_oral_questions(session, questions['ORAL'], generated_by))
+        if 'CODING' in questions:
+            writes.add_questions(build_coding_questions(session, questions['CODING'], generated_by))
+        return
+
+    print(f"--- [PIPELINE] Filling Candidate {session.candidate_id} from the question bank, upgrade scheduled ---")
+    metadata = resume.extracted_metadata or {}
+    skills = (job.required_skills or '').split(',') + list(metadata.get('top_skills') or [])
+    oral, coding = provisional_questions(session, job, resume_text, skills)
+    if 'ORAL' in question_types:
+        writes.add_questions(build_oral_questions(session, oral, 'template'))
+    if 'CODING' in question_types:
+        writes.add_questions(build_coding_questions(session, coding, 'question-bank'))
+    writes.update_session(questions_provisional=True)
+    writes.defer(
+        upgrade_questions_task, session.candidate_id, schedule=settings.QUESTION_UPGRADE_DELAY_SECONDS,
+        priority=PRIORITY_BULK, queue=job_queue(job.id)
+    )
+
+
+def _questions_stage(processing, writes, is_last_attempt):
+    job = processing.candidate.job
+    session = writes.get_session()
+    resume_text = writes.get_resume().prompt_text
+    combined = processing.generated_questions or {}
+
+    # Question types that already exist are checkpoints from an earlier attempt
+    existing = writes.question_types()
+    missing = [t for t in ('ORAL', 'CODING') if t not in existing]
+    if 'ORAL' in missing and combined.get('oral'):
+        writes.add_questions(build_oral_questions(session, combined['oral'], 'gemini-combined'))
+        missing.remove('ORAL')
+    if 'CODING' in missing and combined.get('coding'):
+        writes.add_questions(build_coding_questions(session, combined['coding'], 'gemini-combined'))
+        missing.remove('CODING')
+
+    if missing and settings.QUESTION_GENERATION_DEADLINE_SECONDS:
+        _questions_within_deadline(writes, job, missing, combined.get('deadline_missed'), is_last_attempt)
+    else:
+        if 'ORAL' in missing:
+            writes.add_questions(
+                generate_oral_questions(session, job.description, resume_text, allow_fallback=is_last_attempt)
+            )
+        if 'CODING' in missing:
+            writes.add_questions(
+                generate_coding_questions(session, job.description, resume_text, allow_fallback=is_last_attempt)
+            )
+
+    if combined:
+        processing.generated_questions = {}
+
+
+def _email_stage(processing, writes, is_last_attempt):
+    link = writes.get_session().link
+    writes.defer(queue_invitation, processing.candidate, link.token)
+
+
+def upgrade_provisional_questions(candidate_id):
+    """
+    Replaces a session's provisional questions with personalized ones, and
+    fallback metadata with Gemini's, unless the candidate has opened the
+    link. Gemini errors propagate so the background task is retried.
+    """
+    session = (
+        InterviewSession.objects
+        .select_related('candidate__job', 'candidate__resume_data', 'link')
+        .filter(candidate_id=candidate_id)
+        .first()
+    )
+    if session is None or not session.questions_provisional:
+        return
+    if session.link.opened_at is not None:
+        print(f"--- [PIPELINE] Candidate {candidate_id} already opened the link, keeping provisional questions ---")
+        return
+    generator = get_gemini_generator()
+    if not generator.is_available():
+        return
+
+    candidate = session.candidate
+    job = candidate.job
+    resume = candidate.resume_data
+    questions, metadata, generated_by = None, None, 'gemini'
+    if settings.GEMINI_COMBINED_GENERATION:
+        # Usually answered from the LLM cache by the call that missed the deadline
+        bundle = generator.generate_interview_bundle(
+            jd_text=job.description,
+            resume_text=resume.prompt_text,
+            candidate_name=candidate.name,
+            experience_level=job.experience_level,
+            required_skills=job.required_skills,
+            num_oral=session.oral_question_count,
+            num_coding=session.coding_question_count,
+            job_id=job.id
+        )
+        if bundle:
+            questions = {'ORAL': bundle['oral_questions'], 'CODING': bundle['coding_questions']}
+            metadata, generated_by = bundle['metadata'], 'gemini-combined'
+    if questions is None:
+        questions = _personalized_questions(session, job, resume.prompt_text, ['ORAL', 'CODING'])
+        if 'parsing_status' in (resume.extracted_metadata or {}):
+            metadata = generator.extract_resume_metadata(resume.prompt_text)
+
+    with transaction.atomic():
+        # Locking the link orders this against the candidate opening it
+        link = InterviewLink.objects.select_for_update().get(session=session)
+        if link.opened_at is not None:
+            print(f"--- [PIPELINE] Candidate {candidate_id} opened the link during the upgrade, keeping provisional questions ---")
+            return
+        session.questions.all().delete()
+        Question.objects.bulk_create(
+            build_oral_questions(session, questions['ORAL'], generated_by)
+            + build_coding_questions(session, questions['CODING'], generated_by)
+        )
+        session.questions_provisional = False
+        session.save(update_fields=['questions_provisional'])
+        interview_bundle.refresh([session.id])
+        upgrade_metadata = metadata is not None and 'parsing_status' in (resume.extracted_metadata or {})
+        if upgrade_metadata:
+            resume.extracted_metadata = metadata
+            resume.save(update_fields=['extracted_metadata'])
+
+    if upgrade_metadata:
+        resume_cache.store_metadata(resume.content_hash, resume.prompt_text, metadata)
+    print(f"--- [PIPELINE] Upgraded Candidate {candidate_id} to personalized questions ---")
+
+
+STAGE_HANDLERS = {
+    'PARSE': _parse_stage,
+    'METADATA': _metadata_stage,
+    'SESSION': _session_stage,
+    'QUESTIONS': _questions_stage,
+    'EMAIL': _email_stage,
+}
+
+
+# --- Orchestration ---
+
+def start_pipeline(candidate_id):
+    """Creates the checkpoint if needed and runs the candidate's current stage."""
+    processing, _ = CandidateProcessing.objects.get_or_create(candidate_id=candidate_id)
+    if processing.status in ('DONE', 'FAILED'):
+        # Finished, or parked in the dead-letter list until explicitly retried
+        return
+    run_stage(candidate_id, processing.pipeline_stage)
+
+
+def _mark_running(processing):
+    """Records the attempt before any work, so a crash mid-stage still counts it."""
+    processing.status = 'RUNNING'
+    processing.attempts += 1
+    with transaction.atomic():
+        processing.save(update_fields=['status', 'attempts', 'updated_at'])
+
+
+def _run_stages(processing):
+    """
+    Runs the candidate's stages back to back from its current one until the
+    pipeline is done or a stage fails, and returns their CandidateWrites.
+    The checkpoint on `processing` then names the next stage to run; after a
+    failure, the failing stage with a retry deferred to the flush, or FAILED
+    once the stage's attempts are exhausted.
+    """
+    writes = persistence.CandidateWrites(processing.candidate, processing)
+    candidate_id = processing.candidate_id
+    while True:
+        stage = processing.pipeline_stage
+        is_last_attempt = processing.attempts >= STAGE_POLICIES[stage].max_attempts
+        try:
+            STAGE_HANDLERS[stage](processing, writes, is_last_attempt)
+        except Exception as e:
+            processing.last_error = f"{type(e).__name__}: {e}"
+            if is_last_attempt:
+                logger.error("Candidate %s FAILED at %s after %s attempts: %s",
+                             candidate_id, stage, processing.attempts, processing.last_error)
+                processing.status = 'FAILED'
+                processing.failed_at = timezone.now()
+            else:
+                delay = backoff_delay(stage, processing.attempts)
+                logger.warning("Candidate %s %s attempt %s failed, retrying in %ss: %s",
+                               candidate_id, stage, processing.attempts, delay, processing.last_error)
+                processing.status = 'RETRYING'
+                writes.defer(run_pipeline_stage_task, candidate_id, stage, schedule=delay, **task_options(processing))
+            return writes
+
+        next_index = STAGES.index(stage) + 1
+        next_stage = STAGES[next_index] if next_index < len(STAGES) else 'DONE'
+        processing.pipeline_stage = next_stage
+        processing.last_error = None
+        print(f"--- [PIPELINE] Candidate {candidate_id} completed {stage} ---")
+        if next_stage == 'DONE':
+            processing.status = 'DONE'
+            processing.attempts = 0
+            return writes
+        # The next stage's first attempt runs right away, in this task
+        processing.attempts = 1
+
+
+def run_stage(candidate_id, stage):
+    """
+    Runs a candidate's pipeline from `stage` and saves the result in one
+    transaction: the rows of every stage that ran, the checkpoint, and the
+    next task (a retry of the failing stage, or the invitation email).
+    """
+    try:
+        processing = CandidateProcessing.objects.select_related('candidate__job').get(candidate_id=candidate_id)
+    except CandidateProcessing.DoesNotExist:
+        return
+
+    if processing.pipeline_stage != stage or processing.status in ('DONE', 'FAILED'):
+        # Stale or duplicate task for a stage the candidate already moved past
+        return
+
+    _mark_running(processing)
+    persistence.flush([_run_stages(processing)])
+
+
+def process_candidates(candidate_ids):
+    """
+    Runs the pipelines of many candidates one after another, each from its
+    checkpoint. A candidate's writes are saved when its run ends, so its
+    questions and invitation do not wait for the rest of the chunk. A
+    candidate whose writes could not be saved is rescheduled on its own.
+    """
+    # The checkpoints were created by enqueue_candidate_processing
+    pending = (
+        CandidateProcessing.objects.select_related('candidate__job')
+        .filter(candidate_id__in=candidate_ids).exclude(status__in=('DONE', 'FAILED'))
+        .order_by('candidate_id')
+    )
+    for processing in pending:
+        _mark_running(processing)
+        writes = _run_stages(processing)
+        try:
+            persistence.flush([writes])
+        except DatabaseError as e:
+            stage = writes.started_stage
+            logger.error("Could not save Candidate %s, rescheduling %s: %s: %s",
+                         processing.candidate_id, stage, type(e).__name__, e)
+            run_pipeline_stage_task(
+                processing.candidate_id, stage, schedule=STAGE_POLICIES[stage].backoff_seconds, **task_options(processing)
+            )
+
+
+def retry_failed(queryset):
+    """
+    Requeues dead-lettered candidates from the stage where they failed.
+    Takes a CandidateProcessing queryset and returns the number retried.
+    """
+    failed = queryset.filter(status='FAILED')
+    stages = list(failed.values_list('candidate_id', 'pipeline_stage'))
+    if not stages:
+        return 0
+    per_job = list(failed.values_list('candidate__job_id').annotate(n=Count('candidate_id')).order_by())
+    CandidateProcessing.objects.filter(candidate_id__in=[c for c, _ in stages]).update(
+        status='PENDING', attempts=0, failed_at=None, updated_at=timezone.now()
+    )
+    # .update() skips the signals that keep JobStats in step
+    for job_id, n in per_job:
+        job_stats.adjust(job_id, processing_failures=-n)
+    enqueue_pipeline_stages(stages)
+    return len(stages)
@@ -0,0 +1,88 @@
+"""
+Provisional interview questions from the CodingQuestionBank and templates.
+
+Used by the question-generation deadline (QUESTION_GENERATION_DEADLINE_SECONDS):
+when Gemini has not answered in time the session is filled from here so the
+invitation can go out, and personalized questions replace these later.
+
+Bank entries are looked up through their indexed skill_set, ranked by the
+number of matching skills, then by role_type and difficulty.
+"""
+
+from django.db.models import Case, Count, IntegerField, Q, When
+from .gemini_service import get_gemini_generator
+from .models import CodingQuestionBank, Skill
+
+LEVEL_DIFFICULTY = [
+    (('intern', 'entry', 'junior', 'fresher', 'graduate', '0-1', '0-2'), 'Easy'),
+    (('senior', 'lead', 'principal', 'staff', 'architect', 'manager'), 'Hard'),
+]
+
+
+def difficulty_for_level(experience_level):
+    """Maps a job's free-text experience level onto the bank's Easy/Medium/Hard."""
+    level = (experience_level or '').lower()
+    for keywords, difficulty in LEVEL_DIFFICULTY:
+        if any(k in level for k in keywords):
+            return difficulty
+    return 'Medium'
+
+
+def select_bank_questions(skills, difficulty, role_type, limit):
+    """
+    Up to `limit` bank entries sharing the most skills with `skills`, preferring
+    the same role_type and difficulty. Entries with no matching skill are only
+    used when nothing matches.
+    """
+    if limit <= 0:
+        return []
+    names = {Skill.normalize(s) for s in skills if Skill.normalize(s)}
+    skill_ids = list(Skill.objects.filter(name__in=names).values_list('id', flat=True))
+
+    ranked = CodingQuestionBank.objects.annotate(
+        role_match=Case(When(role_type__iexact=role_type or '', then=1), default=0, output_field=IntegerField()),
+        difficulty_match=Case(When(difficulty__iexact=difficulty, then=1), default=0, output_field=IntegerField()),
+    )
+    if skill_ids:
+        matched = list(
+            ranked.filter(skill_set__in=skill_ids)
+            .annotate(skill_matches=Count('skill_set', filter=Q(skill_set__in=skill_ids)))
+            .order_by('-skill_matches', '-role_match', '-difficulty_match', 'id')
+            .prefetch_related('skill_set')[:limit]
+        )
+        if matched:
+            return matched
+    return list(ranked.order_by('-role_match', '-difficulty_match', 'id').prefetch_related('skill_set')[:limit])
+
+
+def _bank_question_data(entry):
+    """A bank entry in the coding question dict format generate_coding_questions returns."""
+    return {
+        "problem": entry.text,
+        "expected_skills": [s.name for s in entry.skill_set.all()] or entry.skill_names(),
+        "input_output_format": "",
+        "difficulty": entry.difficulty,
+        "focus_area": entry.role_type,
+        "bank_id": entry.id,
+    }
+
+
+def provisional_questions(session, job, resume_text, skills):
+    """
+    Oral and coding question dicts for a session without calling Gemini:
+    oral from the fallback templates, coding from the bank topped up with
+    templates. Returns (oral, coding).
+    """
+    generator = get_gemini_generator()
+    oral = generator.fallback_oral_questions(
+        session.candidate.name, resume_text, job.required_skills, session.oral_question_count
+    )
+    bank = select_bank_questions(
+        skills, difficulty_for_level(job.experience_level), job.title, session.coding_question_count
+    )
+    coding = [_bank_question_data(entry) for entry in bank]
+    if len(coding) < session.coding_question_count:
+        coding += generator.fallback_coding_questions(
+            resume_text, job.required_skills, session.coding_question_count - len(coding)
+        )
+    return oral, coding
@@ -0,0 +1,219 @@
+"""
+Cross-process rate limiter for Gemini calls.
+
+Every worker reserves capacity from one RateLimitBucket row before calling
+the API, so all processes together stay under GEMINI_RPM_LIMIT requests and
+GEMINI_TPM_LIMIT tokens per minute. Both budgets are token buckets that
+refill continuously and hold at most one minute of capacity.
+
+The effective limits are scaled by an AIMD factor: a 429 halves it (at most
+once per cool-down, so a burst of 429s across workers counts once) and
+drains the bucket, and every successful call adds a little back until the
+configured limits are reached again. Callers wait for capacity, and retry
+after a 429, rather than failing; only GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS
+of waiting raises RateLimitTimeout.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+from .models import RateLimitBucket
+
+BUCKET_NAME = 'gemini'
+MIN_RATE_SCALE = 0.05
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.02
+THROTTLE_COOLDOWN_SECONDS = 5
+MAX_SLEEP_SECONDS = 5
+# Rough prompt size estimate; the real count from the response is reconciled afterwards
+CHARS_PER_TOKEN = 4
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not get capacity within its maximum wait."""
+
+
+def is_rate_limit_error(exc):
+    """True for quota/429 errors from the Gemini SDK."""
+    try:
+        from google.api_core import exceptions as google_exceptions
+        if isinstance(exc, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+            return True
+    except ImportError:
+        pass
+    return getattr(exc, 'code', None) == 429 or '429' in str(exc)
+
+
+def estimate_tokens(prompt):
+    """Tokens to reserve for a prompt: its approximate size plus the expected reply."""
+    return len(prompt) // CHARS_PER_TOKEN + settings.GEMINI_OUTPUT_TOKEN_ESTIMATE
+
+
+class RateLimiter:
+    """
+    Database-backed token bucket with AIMD backoff. State lives in the
+    RateLimitBucket row named `name`; instances are cheap and stateless.
+    """
+
+    def __init__(self, name=BUCKET_NAME, rpm_limit=None, tpm_limit=None, max_wait=None):
+        self.name = name
+        self.rpm_limit = rpm_limit or settings.GEMINI_RPM_LIMIT
+        self.tpm_limit = tpm_limit or settings.GEMINI_TPM_LIMIT
+        self.max_wait = settings.GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS if max_wait is None else max_wait
+
+    def _locked_bucket(self):
+        bucket, _ = RateLimitBucket.objects.select_for_update().get_or_create(
+            name=self.name,
+            defaults={'request_tokens': self.rpm_limit, 'token_tokens': self.tpm_limit}
+        )
+        return bucket
+
+    def reserve(self, tokens):
+        """
+        Takes one request and `tokens` tokens from the bucket if both are
+        available. Returns 0 on success, otherwise the seconds to wait before
+        trying again (nothing is taken).
+        """
+        try:
+            with transaction.atomic():
+                bucket = self._locked_bucket()
+                now = timezone.now()
+                rpm = self.rpm_limit * bucket.rate_scale
+                tpm = self.tpm_limit * bucket.rate_scale
+                elapsed = max((now - bucket.refilled_at).total_seconds(), 0)
+                bucket.request_tokens = min(rpm, bucket.request_tokens + elapsed * rpm / 60)
+                bucket.token_tokens = min(tpm, bucket.token_tokens + elapsed * tpm / 60)
+                bucket.refilled_at = now
+
+                # A prompt larger than the whole budget waits for a full bucket instead of forever
+                tokens = min(tokens, tpm)
+                if bucket.request_tokens >= 1 and bucket.token_tokens >= tokens:
+                    bucket.request_tokens -= 1
+                    bucket.token_tokens -= tokens
+                    wait = 0
+                else:
+                    wait = max(
+                        (1 - bucket.request_tokens) * 60 / rpm,
+                        (tokens - bucket.token_tokens) * 60 / tpm
+                    )
+                bucket.save(update_fields=['request_tokens', 'token_tokens', 'refilled_at'])
+            return wait
+        except OperationalError:
+            # SQLite reports a concurrent writer as "database is locked"; just try again shortly
+            return 0.1
+
+    def acquire(self, tokens, deadline=None):
+        """Blocks until capacity is reserved; raises RateLimitTimeout past the deadline (monotonic)."""
+        deadline = time.monotonic() + self.max_wait if deadline is None else deadline
+        while True:
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"No {self.name} capacity within {self.max_wait}s")
+            # Jitter so waiting workers don't all retry in the same instant
+            time.sleep(min(wait, MAX_SLEEP_SECONDS) * random.uniform(1.0, 1.2))
+
+    def record_throttle(self):
+        """Multiplicative decrease after a 429: halve the rate and empty the bucket."""
+        try:
+            with transaction.atomic():
+                bucket = self._locked_bucket()
+                now = timezone.now()
+                bucket.throttle_count += 1
+                if bucket.throttled_at is None or (now - bucket.throttled_at).total_seconds() > THROTTLE_COOLDOWN_SECONDS:
+                    bucket.rate_scale = max(MIN_RATE_SCALE, bucket.rate_scale * DECREASE_FACTOR)
+                    bucket.request_tokens = 0
+                    bucket.token_tokens = 0
+                    bucket.refilled_at = now
+                    bucket.throttled_at = now
+                    print(f"[GEMINI] Rate limited, scaling quota to {bucket.rate_scale:.2f}x")
+                bucket.save()
+        except OperationalError:
+            pass
+
+    def record_success(self, token_adjustment=0):
+        """
+        Additive increase after a successful call, and reconciliation of the
+        token estimate with the real usage (positive = more tokens than reserved).
+        """
+        updates = {}
+        if token_adjustment:
+            updates['token_tokens'] = F('token_tokens') - token_adjustment
+        try:
+            if updates:
+                RateLimitBucket.objects.filter(name=self.name).update(**updates)
+            RateLimitBucket.objects.filter(name=self.name, rate_scale__lt=1.0).update(
+                rate_scale=Least(F('rate_scale') + INCREASE_STEP, 1.0)
+            )
+        except OperationalError:
+            pass
+
+    def call(self, fn, prompt):
+        """
+        Runs fn() (a Gemini request for `prompt`) once capacity is available,
+        waiting and retrying on 429s until the maximum wait is used up.
+        """
+        reserved = estimate_tokens(prompt)
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            self.acquire(reserved, deadline)
+            try:
+                response = fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or time.monotonic() >= deadline:
+                    raise
+                self.record_throttle()
+                continue
+
+            usage = getattr(response, 'usage_metadata', None)
+            used = getattr(usage, 'total_token_count', None) if usage else None
+            self.record_success(used - reserved if isinstance(used, int) else 0)
+            return response
+
+    async def call_async(self, coro_fn, prompt):
+        """Async counterpart of call(): awaits coro_fn() and sleeps without blocking the event loop."""
+        from asgiref.sync import sync_to_async
+
+        reserved = estimate_tokens(prompt)
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            while True:
+                wait = await sync_to_async(self.reserve)(reserved)
+                if wait <= 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitTimeout(f"No {self.name} capacity within {self.max_wait}s")
+                await asyncio.sleep(min(wait, MAX_SLEEP_SECONDS) * random.uniform(1.0, 1.2))
+
+            try:
+                response = await coro_fn()
+            except Exception as e:
+                if not is_rate_limit_error(e) or time.monotonic() >= deadline:
+                    raise
+                await sync_to_async(self.record_throttle)()
+                continue
+
+            usage = getattr(response, 'usage_metadata', None)
+            used = getattr(usage, 'total_token_count', None) if usage else None
+            await sync_to_async(self.record_success)(used - reserved if isinstance(used, int) else 0)
+            return response
+
+
+# Singleton instance
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the process-wide Gemini rate limiter"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,207 @@
+"""
+Content-addressed cache of parsed resumes, shared across jobs.
+
+The same person often applies to several jobs with the same PDF or link.
+Entries are keyed by a SHA-256 of the uploaded bytes, or of the normalized
+URL plus its ETag/Last-Modified validator, and hold the extracted raw text
+and metadata so a repeat applicant skips both the parse and the LLM
+metadata call. Every EVICT_EVERY_INSERTS stores, the table is brought back
+under RESUME_CACHE_MAX_BYTES by evicting the least recently used entries,
+so it may run over by that many entries per process in between.
+
+Hits and misses, and the entries' hit counts and last access times, are
+kept in memory and written every COUNTER_FLUSH_SECONDS (and by evict() and
+stats()), so a lookup costs a single read.
+
+Metadata is extracted from the resume's prompt text, which is compressed
+against the job's skills and description, so it is stored with a hash of
+that text and only reused for the same text: any job when the resume was
+short enough to send whole, otherwise jobs that compress it the same way.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import ResumeCacheEntry, CacheCounter
+
+COUNTER_NAME = 'resume_cache'
+EVICTION_BATCH_SIZE = 100
+EVICT_EVERY_INSERTS = 100
+COUNTER_FLUSH_SECONDS = 30
+
+_lock = threading.Lock()
+# Hits and misses, and hits per entry pk, not written yet
+_counts = Counter()
+_entry_hits = Counter()
+_counts_flushed_at = time.monotonic()
+_inserts = 0
+
+
+def file_cache_key(field_file):
+    """SHA-256 of an uploaded resume's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def url_cache_key(normalized_url, validator):
+    """
+    SHA-256 of a normalized resume URL plus its ETag or Last-Modified value.
+    Returns None without a validator, since the content may change unseen.
+    """
+    if not validator:
+        return None
+    return hashlib.sha256(f"{normalized_url}\n{validator}".encode('utf-8')).hexdigest()
+
+
+def _entry_size(raw_text, metadata):
+    return len(raw_text.encode('utf-8')) + len(json.dumps(metadata or {}).encode('utf-8'))
+
+
+def _count(field, entry_pk=None):
+    with _lock:
+        _counts[field] += 1
+        if entry_pk is not None:
+            _entry_hits[entry_pk] += 1
+        due = time.monotonic() - _counts_flushed_at >= COUNTER_FLUSH_SECONDS
+    if due:
+        flush_counts()
+
+
+def flush_counts():
+    """Writes the hits and misses counted in this process, and the hit entries' counts and access times."""
+    global _counts, _entry_hits, _counts_flushed_at
+    with _lock:
+        counts, _counts = _counts, Counter()
+        entry_hits, _entry_hits = _entry_hits, Counter()
+        _counts_flushed_at = time.monotonic()
+    for field, amount in counts.items():
+        CacheCounter.increment(COUNTER_NAME, field, amount)
+
+    by_amount = {}
+    for pk, amount in entry_hits.items():
+        by_amount.setdefault(amount, []).append(pk)
+    now = timezone.now()
+    for amount, pks in by_amount.items():
+        ResumeCacheEntry.objects.filter(pk__in=pks).update(
+            hit_count=F('hit_count') + amount, last_accessed_at=now
+        )
+
+
+def lookup(key):
+    """Returns the cached entry for a key (counting a hit) or None (counting a miss)."""
+    if not key:
+        return None
+    entry = ResumeCacheEntry.objects.filter(content_hash=key).first()
+    if entry is None:
+        _count('misses')
+        return None
+    _count('hits', entry.pk)
+    return entry
+
+
+def text_hash(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def get_metadata(key, prompt_text):
+    """
+    Cached metadata for a key, or None if the entry is gone, has none yet or
+    extracted it from a different prompt text.
+    """
+    if not key:
+        return None
+    entry = ResumeCacheEntry.objects.filter(content_hash=key).only('extracted_metadata', 'metadata_text_hash').first()
+    if entry is None or not entry.extracted_metadata or entry.metadata_text_hash != text_hash(prompt_text):
+        return None
+    return entry.extracted_metadata
+
+
+def _inserted():
+    """Enforces the size limit every EVICT_EVERY_INSERTS stores."""
+    global _inserts
+    with _lock:
+        _inserts += 1
+        due = _inserts % EVICT_EVERY_INSERTS == 0
+    if due:
+        evict()
+
+
+def store(key, source, raw_text):
+    """Caches freshly parsed resume text under a key; see _inserted() for the size limit."""
+    if not key:
+        return
+    ResumeCacheEntry.objects.update_or_create(
+        content_hash=key,
+        defaults={
+            'source': source,
+            'raw_text': raw_text,
+            'size_bytes': _entry_size(raw_text, {}),
+            'last_accessed_at': timezone.now()
+        }
+    )
+    _inserted()
+
+
+def store_metadata(key, prompt_text, metadata):
+    """Attaches metadata extracted from prompt_text to an existing entry."""
+    if not key:
+        return
+    entry = ResumeCacheEntry.objects.filter(content_hash=key).first()
+    if entry is None:
+        return
+    entry.extracted_metadata = metadata
+    entry.metadata_text_hash = text_hash(prompt_text)
+    entry.size_bytes = _entry_size(entry.raw_text, metadata)
+    entry.save(update_fields=['extracted_metadata', 'metadata_text_hash', 'size_bytes'])
+    _inserted()
+
+
+def evict(max_bytes=None):
+    """Deletes least recently used entries until the cache fits in max_bytes."""
+    max_bytes = settings.RESUME_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    # Pending access times decide what is least recently used
+    flush_counts()
+    total = ResumeCacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+    evicted = 0
+
+    while total > max_bytes:
+        oldest = list(
+            ResumeCacheEntry.objects.order_by('last_accessed_at').values_list('pk', 'size_bytes')[:EVICTION_BATCH_SIZE]
+        )
+        if not oldest:
+            break
+        batch = []
+        for pk, size in oldest:
+            if total <= max_bytes:
+                break
+            batch.append(pk)
+            total -= size
+        ResumeCacheEntry.objects.filter(pk__in=batch).delete()
+        evicted += len(batch)
+
+    if evicted:
+        CacheCounter.increment(COUNTER_NAME, 'evictions', evicted)
+    return evicted
+
+
+def stats():
+    """Current hit/miss/eviction counts and the cache's size."""
+    flush_counts()
+    counter = CacheCounter.objects.filter(name=COUNTER_NAME).first()
+    totals = ResumeCacheEntry.objects.aggregate(total=Sum('size_bytes'))
+    return {
+        'hits': counter.hits if counter else 0,
+        'misses': counter.misses if counter else 0,
+        'evictions': counter.evictions if counter else 0,
+        'entries': ResumeCacheEntry.objects.count(),
+        'size_bytes': totals['total'] or 0,
+        'max_bytes': settings.RESUME_CACHE_MAX_BYTES,
+    }
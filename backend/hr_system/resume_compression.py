@@ -0,0 +1,189 @@
+"""
+Relevance-based resume compression for prompts.
+
+Fetched resumes can be whole Google Sheets dumps or the text of arbitrary
+web pages, and every Gemini prompt used to carry all of it. compress_resume()
+splits the text into sections, scores each one against the job's required
+skills and description, and keeps the best sections that fit in
+RESUME_PROMPT_TOKEN_BUDGET, in their original order. The opening section
+(name and contact details) is always kept. The result is stored on
+Resume.compressed_text so every later prompt for the candidate reuses it.
+"""
+
+import math
+import re
+import textwrap
+from collections import namedtuple
+from django.conf import settings
+from .rate_limiter import CHARS_PER_TOKEN
+
+ResumeSection = namedtuple('ResumeSection', ['heading', 'text'])
+
+SECTION_MAX_CHARS = 1200
+GAP_MARKER = "[...]"
+
+HEADING_RE = re.compile(
+    r'^\s*(professional\s+)?(summary|profile|objective|about me|experience|work experience|work history|'
+    r'employment( history)?|projects?|personal projects|technical skills|skills|core competencies|'
+    r'education|certifications?|achievements|accomplishments|awards|publications|languages|interests|'
+    r'contact|references|volunteering|internships?)\s*:?\s*$',
+    re.I
+)
+# Sections whose heading alone makes them worth keeping when scores tie
+HEADING_BONUS = {
+    'skills': 2.0, 'technical skills': 2.0, 'core competencies': 2.0,
+    'experience': 2.0, 'work experience': 2.0, 'work history': 1.5, 'employment': 1.5,
+    'projects': 2.0, 'project': 2.0, 'personal projects': 1.5, 'internship': 1.0, 'internships': 1.0,
+    'summary': 1.0, 'profile': 1.0, 'education': 0.5, 'certifications': 0.5,
+}
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'you', 'your', 'our', 'are', 'will', 'this', 'that', 'from', 'have',
+    'has', 'who', 'what', 'job', 'role', 'team', 'work', 'working', 'able', 'should', 'must', 'can',
+    'into', 'about', 'their', 'they', 'them', 'such', 'all', 'any', 'not', 'but', 'also', 'well',
+    'other', 'using', 'use', 'etc', 'including', 'years', 'year', 'experience', 'strong', 'good',
+    'knowledge', 'skills', 'required', 'preferred', 'responsibilities', 'requirements', 'ability',
+}
+WORD_RE = re.compile(r'[a-z][a-z0-9+#.]*[a-z0-9+#]|[a-z]')
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _is_heading(line):
+    stripped = line.strip()
+    if not stripped or len(stripped) > 40:
+        return False
+    if HEADING_RE.match(stripped):
+        return True
+    # Short all-caps lines ("WORK HISTORY", "TOOLS & PLATFORMS")
+    letters = [c for c in stripped if c.isalpha()]
+    return len(letters) >= 4 and all(c.isupper() for c in letters)
+
+
+def _split_long(text):
+    """Breaks a block over SECTION_MAX_CHARS into line-aligned chunks, wrapping overlong lines."""
+    if len(text) <= SECTION_MAX_CHARS:
+        return [text]
+    pieces = []
+    for line in text.splitlines():
+        pieces.extend(textwrap.wrap(line, SECTION_MAX_CHARS) if len(line) > SECTION_MAX_CHARS else [line])
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(piece) + 1 > SECTION_MAX_CHARS:
+            chunks.append("\n".join(current).strip())
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+    chunks.append("\n".join(current).strip())
+    return [c for c in chunks if c]
+
+
+def split_sections(text):
+    """
+    Splits resume text into sections at recognised headings, or at blank
+    lines when there are none. Oversized sections (CSV rows, page dumps)
+    are broken into smaller blocks that keep their heading.
+    """
+    lines = text.splitlines()
+    if any(_is_heading(line) for line in lines):
+        blocks, heading, current = [], '', []
+        for line in lines:
+            if _is_heading(line):
+                if any(l.strip() for l in current):
+                    blocks.append((heading, "\n".join(current).strip()))
+                heading, current = line.strip().rstrip(':').strip(), [line]
+            else:
+                current.append(line)
+        if any(l.strip() for l in current):
+            blocks.append((heading, "\n".join(current).strip()))
+    else:
+        blocks = [('', block.strip()) for block in re.split(r'\n\s*\n', text) if block.strip()]
+
+    return [ResumeSection(heading, part) for heading, block in blocks for part in _split_long(block)]
+
+
+def _skill_terms(required_skills):
+    terms = {t.strip().lower() for t in re.split(r'[,;/\n|]', required_skills or '')}
+    return {t for t in terms if t}
+
+
+def _term_pattern(term):
+    # Custom boundaries so "c++", "c#" and ".net" match, but "java" doesn't match "javascript"
+    return re.compile(r'(?<![\w+#.])' + re.escape(term) + r'(?![\w+#])', re.I)
+
+
+def _jd_terms(jd_text):
+    return {w for w in WORD_RE.findall((jd_text or '').lower()) if len(w) > 2 and w not in STOPWORDS}
+
+
+def score_section(section, skill_patterns, jd_terms):
+    """Relevance of a section: distinct required skills (weighted), JD vocabulary overlap and heading."""
+    text = section.text
+    skill_hits = 0.0
+    for pattern in skill_patterns:
+        count = len(pattern.findall(text))
+        if count:
+            skill_hits += 3 + min(count - 1, 3) * 0.5
+    words = set(WORD_RE.findall(text.lower()))
+    jd_hits = len(words & jd_terms)
+    return skill_hits + jd_hits * 0.5 + HEADING_BONUS.get(section.heading.lower(), 0.0)
+
+
+def compress_resume(resume_text, required_skills='', jd_text='', budget_tokens=None):
+    """
+    Returns the most job-relevant part of resume_text within budget_tokens.
+    Text that already fits is returned unchanged; omitted stretches are
+    marked with [...].
+    """
+    budget_tokens = settings.RESUME_PROMPT_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    if not resume_text or estimate_tokens(resume_text) <= budget_tokens:
+        return resume_text
+
+    sections = split_sections(resume_text)
+    if not sections:
+        return resume_text[:budget_tokens * CHARS_PER_TOKEN]
+
+    skill_patterns = [_term_pattern(t) for t in _skill_terms(required_skills)]
+    jd_terms = _jd_terms(jd_text)
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+
+    # The opening section carries the name and contact details; keep it, capped
+    header = sections[0].text[:budget_chars // 4]
+    chosen = {0: header}
+    remaining = budget_chars - len(header)
+
+    scores = {i: score_section(sections[i], skill_patterns, jd_terms) for i in range(1, len(sections))}
+    # Densest relevance first, so a short skills list beats a long generic page
+    ranked = sorted(
+        scores,
+        key=lambda i: (scores[i] / math.sqrt(len(sections[i].text) + 1), -i),
+        reverse=True
+    )
+    # Irrelevant filler is dropped rather than used to pad out the budget,
+    # unless nothing matches the job at all
+    has_relevant = any(score > 0 for score in scores.values())
+    for i in ranked:
+        if has_relevant and scores[i] <= 0:
+            break
+        text = sections[i].text
+        cost = len(text) + len(GAP_MARKER) + 2
+        if cost <= remaining:
+            chosen[i] = text
+            remaining -= cost
+        elif remaining > 200 and has_relevant:
+            chosen[i] = text[:remaining - len(GAP_MARKER) - 2]
+            remaining = 0
+        if remaining <= 0:
+            break
+
+    parts, previous = [], -1
+    for i in sorted(chosen):
+        if i != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(chosen[i])
+        previous = i
+    if previous != len(sections) - 1:
+        parts.append(GAP_MARKER)
+    return "\n\n".join(parts)
@@ -0,0 +1,301 @@
+"""
+Shared fetcher for resume links.
+
+All resume URL downloads go through one pooled requests.Session (keep-alive,
+so repeated hosts like docs.google.com skip the TCP/TLS handshake) with a
+concurrency limit per host. Bodies are streamed and cut off at
+RESUME_FETCH_MAX_BYTES, and a download that takes longer than
+RESUME_FETCH_DEADLINE_SECONDS overall is abandoned (the requests timeout
+only bounds each read, so a server trickling bytes could hold a worker for
+good). Responses are kept in an on-disk HTTP cache: entries fetched
+recently are served as-is, older ones are revalidated with If-None-Match /
+If-Modified-Since, and a 304 reuses the stored body. Every
+EVICT_EVERY_WRITES stores, entries not checked within
+RESUME_FETCH_CACHE_MAX_AGE_SECONDS are removed, then the least recently
+checked ones until the cache fits in RESUME_FETCH_CACHE_MAX_BYTES.
+
+prefetch() downloads a batch of URLs concurrently (used by roster imports)
+so the per-candidate PARSE stage later finds them in the cache.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import DecodeError, HTTPError as Urllib3Error, ReadTimeoutError
+from django.conf import settings
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+CHUNK_SIZE = 64 * 1024
+EVICT_EVERY_WRITES = 100
+
+
+class FetchResult(namedtuple('FetchResult', [
+    'url', 'status_code', 'content', 'content_type', 'encoding',
+    'etag', 'last_modified', 'from_cache', 'truncated'
+])):
+    """A downloaded (or cached) response body and the headers needed to parse and revalidate it."""
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def validator(self):
+        return self.etag or self.last_modified
+
+
+class ResumeFetcher:
+    """
+    Pooled, cached HTTP fetcher. One instance per process is shared through
+    get_resume_fetcher(); it is safe to use from multiple threads.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, per_host_limit=None,
+                 timeout=None, deadline=None, revalidate_after=None, pool_size=None,
+                 cache_max_bytes=None, cache_max_age=None):
+        self.cache_dir = str(cache_dir or settings.RESUME_FETCH_CACHE_DIR)
+        self.max_bytes = max_bytes or settings.RESUME_FETCH_MAX_BYTES
+        self.per_host_limit = per_host_limit or settings.RESUME_FETCH_PER_HOST_LIMIT
+        self.timeout = timeout or settings.RESUME_FETCH_TIMEOUT_SECONDS
+        self.deadline = deadline or settings.RESUME_FETCH_DEADLINE_SECONDS
+        self.revalidate_after = settings.RESUME_FETCH_REVALIDATE_SECONDS if revalidate_after is None else revalidate_after
+        self.cache_max_bytes = cache_max_bytes or settings.RESUME_FETCH_CACHE_MAX_BYTES
+        self.cache_max_age = cache_max_age or settings.RESUME_FETCH_CACHE_MAX_AGE_SECONDS
+        pool_size = pool_size or settings.RESUME_FETCH_CONCURRENCY
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+
+        self._host_limits = {}
+        self._host_lock = threading.Lock()
+        self._writes = 0
+        self._evict_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # --- Per-host concurrency ---
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    # --- On-disk cache ---
+
+    def _cache_paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + '.json', base + '.body'
+
+    def _read_cache(self, url):
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, content
+
+    def _write_cache(self, url, meta, content):
+        meta_path, body_path = self._cache_paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Write to temp files and rename so readers never see half an entry
+        for path, data, mode in ((body_path, content, 'wb'), (meta_path, json.dumps(meta), 'w')):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def _touch_cache(self, url, meta):
+        meta['checked_at'] = time.time()
+        meta_path, _ = self._cache_paths(url)
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _cache_entries(self):
+        """(last checked, size in bytes, paths) for every entry on disk."""
+        entries = {}
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                base, ext = os.path.splitext(name)
+                if ext not in ('.json', '.body'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = entries.setdefault(os.path.join(dirpath, base), [0, 0, []])
+                # The metadata file is rewritten on every revalidation
+                entry[0] = max(entry[0], stat.st_mtime)
+                entry[1] += stat.st_size
+                entry[2].append(path)
+        return [tuple(entry) for entry in entries.values()]
+
+    def evict(self, max_bytes=None, max_age=None):
+        """
+        Removes entries not fetched or revalidated within max_age seconds,
+        then the least recently checked ones until the cache fits in
+        max_bytes. Returns the number of entries removed.
+        """
+        max_bytes = self.cache_max_bytes if max_bytes is None else max_bytes
+        max_age = self.cache_max_age if max_age is None else max_age
+        entries = sorted(self._cache_entries())
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - max_age
+        evicted = 0
+        for checked_at, size, paths in entries:
+            if checked_at >= cutoff and total <= max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    @staticmethod
+    def _result_from_cache(url, meta, content):
+        return FetchResult(
+            url=url, status_code=200, content=content,
+            content_type=meta.get('content_type', ''), encoding=meta.get('encoding'),
+            etag=meta.get('etag'), last_modified=meta.get('last_modified'),
+            from_cache=True, truncated=meta.get('truncated', False)
+        )
+
+    # --- Fetching ---
+
+    @staticmethod
+    def _read_chunk(response):
+        """
+        The next part of the body, returned as soon as any of it has arrived
+        (iter_content waits for a full chunk, which a server trickling bytes
+        can stretch indefinitely). urllib3 errors are raised as their
+        requests counterparts, as iter_content does.
+        """
+        try:
+            return response.raw.read1(CHUNK_SIZE, decode_content=True)
+        except ReadTimeoutError as e:
+            raise requests.ReadTimeout(e)
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        except Urllib3Error as e:
+            raise requests.ConnectionError(e)
+
+    def fetch(self, url):
+        """
+        Returns a FetchResult for url, from the cache when it is fresh or the
+        server confirms it unchanged. Raises requests.RequestException on
+        network errors, and requests.Timeout when the download overruns the
+        deadline; non-200 responses are returned with an empty body.
+        """
+        meta, cached_content = self._read_cache(url)
+        if meta and time.time() - meta.get('checked_at', 0) < self.revalidate_after:
+            return self._result_from_cache(url, meta, cached_content)
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with self._host_semaphore(url):
+            give_up_at = time.monotonic() + self.deadline
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and meta:
+                    self._touch_cache(url, meta)
+                    return self._result_from_cache(url, meta, cached_content)
+
+                if response.status_code != 200:
+                    return FetchResult(
+                        url=url, status_code=response.status_code, content=b'',
+                        content_type=response.headers.get('Content-Type', ''), encoding=None,
+                        etag=None, last_modified=None, from_cache=False, truncated=False
+                    )
+
+                body = bytearray()
+                truncated = False
+                while True:
+                    if time.monotonic() > give_up_at:
+                        raise requests.Timeout(f"Download of {url} took longer than {self.deadline}s")
+                    chunk = self._read_chunk(response)
+                    if not chunk:
+                        break
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        del body[self.max_bytes:]
+                        truncated = True
+                        break
+                encoding = response.encoding
+
+        result = FetchResult(
+            url=url, status_code=200, content=bytes(body),
+            content_type=response.headers.get('Content-Type', ''), encoding=encoding,
+            etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'),
+            from_cache=False, truncated=truncated
+        )
+        self._write_cache(url, {
+            'url': url,
+            'content_type': result.content_type,
+            'encoding': result.encoding,
+            'etag': result.etag,
+            'last_modified': result.last_modified,
+            'truncated': truncated,
+            'checked_at': time.time(),
+        }, result.content)
+        with self._evict_lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY_WRITES == 0
+        if due:
+            self.evict()
+        return result
+
+    def prefetch(self, urls):
+        """
+        Fetches many URLs concurrently into the cache. Returns {url: FetchResult
+        or exception}; failures are reported rather than raised.
+        """
+        unique_urls = list(dict.fromkeys(u for u in urls if u))
+        if not unique_urls:
+            return {}
+
+        def fetch_one(url):
+            try:
+                return url, self.fetch(url)
+            except Exception as e:
+                return url, e
+
+        workers = min(settings.RESUME_FETCH_CONCURRENCY, len(unique_urls))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(executor.map(fetch_one, unique_urls))
+
+
+# Singleton instance
+_resume_fetcher = None
+_resume_fetcher_lock = threading.Lock()
+
+def get_resume_fetcher() -> ResumeFetcher:
+    """Get or create the process-wide resume fetcher"""
+    global _resume_fetcher
+    with _resume_fetcher_lock:
+        if _resume_fetcher is None:
+            _resume_fetcher = ResumeFetcher()
+        return _resume_fetcher
@@ -1,16 +1,40 @@
 from rest_framework import serializers
-from .models import Job, Candidate, InterviewSession, Evaluation, CheatingLog, Question, Answer
+from .models import Job, Candidate, InterviewSession, Evaluation, CheatingLog, Question, Answer, CandidateImport, CandidateProcessing, JobStats
+from . import job_stats
+
+class JobStatsSerializer(serializers.ModelSerializer):
+    processing = serializers.IntegerField(read_only=True)
+    average_score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = JobStats
+        exclude = ['job', 'score_total']
 
 class JobSerializer(serializers.ModelSerializer):
-    candidates_count = serializers.IntegerField(source='candidates.count', read_only=True)
+    """Counts come from the job's JobStats row (select_related('stats')) rather than per-job COUNT queries."""
+    candidates_count = serializers.SerializerMethodField()
     completed_interviews_count = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
 
     class Meta:
         model = Job
         fields = '__all__'
-    
+
+    def _stats(self, obj):
+        try:
+            return obj.stats
+        except JobStats.DoesNotExist:
+            obj.stats = job_stats.rebuild(obj.id)
+            return obj.stats
+
+    def get_candidates_count(self, obj):
+        return self._stats(obj).candidates
+
     def get_completed_interviews_count(self, obj):
-        return obj.candidates.filter(session__status='COMPLETED').count()
+        return self._stats(obj).completed
+
+    def get_stats(self, obj):
+        return JobStatsSerializer(self._stats(obj)).data
 
 class CandidateSerializer(serializers.ModelSerializer):
     resume_file = serializers.FileField(required=False, allow_null=True)
@@ -18,6 +42,36 @@ class CandidateSerializer(serializers.ModelSerializer):
         model = Candidate
         fields = ['id', 'name', 'email', 'resume_file', 'resume_url', 'job']
 
+class CandidateRowSerializer(serializers.ModelSerializer):
+    """
+    Validates a single CSV roster row entirely in memory.
+    The job is assigned by the caller and (job, email) uniqueness is checked
+    against a preloaded email set, so no queries are issued per row.
+    """
+    class Meta:
+        model = Candidate
+        fields = ['name', 'email', 'resume_url']
+
+class CandidateImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CandidateImport
+        fields = [
+            'id', 'job', 'status', 'rows_processed', 'rows_succeeded', 'rows_failed',
+            'errors', 'last_error', 'created_at', 'started_at', 'completed_at'
+        ]
+
+class CandidateProcessingSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='candidate.name', read_only=True)
+    email = serializers.EmailField(source='candidate.email', read_only=True)
+    job = serializers.IntegerField(source='candidate.job_id', read_only=True)
+
+    class Meta:
+        model = CandidateProcessing
+        fields = [
+            'candidate', 'name', 'email', 'job', 'pipeline_stage', 'status',
+            'attempts', 'last_error', 'failed_at', 'updated_at'
+        ]
+
 class InterviewSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = InterviewSession
@@ -39,6 +93,7 @@ class AnswerSerializer(serializers.ModelSerializer):
         fields = ['id', 'response_text', 'response_file', 'marks', 'feedback']
 
 class QuestionSerializer(serializers.ModelSerializer):
+    """Fields named in the `omit` context entry are left out (CandidateDetailView's ?include=)."""
     answers = AnswerSerializer(many=True, read_only=True)
     class Meta:
         model = Question
@@ -47,3 +102,9 @@ class QuestionSerializer(serializers.ModelSerializer):
             'focus_area', 'difficulty', 'gemini_metadata', 'generated_at', 'is_dynamic',
             'answers'
         ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.context.get('omit', ()):
+            fields.pop(name, None)
+        return fields
@@ -0,0 +1,196 @@
+"""
+Model signal handlers for hr_system (connected in HrSystemConfig.ready).
+"""
+
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Job, Candidate, CodingQuestionBank, InterviewSession, InterviewLink, Question, Evaluation, CandidateProcessing, JobStats
+from .job_context import invalidate_job
+from . import job_stats, job_events
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def drop_job_prompt_context(sender, instance, **kwargs):
+    """An edited or deleted job must not keep serving its old JD prefix."""
+    invalidate_job(instance.id)
+
+
+@receiver(post_save, sender=CodingQuestionBank)
+def index_bank_question_skills(sender, instance, raw=False, **kwargs):
+    """Keeps the indexed skill_set in step with the entry's `skills` text."""
+    if not raw:
+        instance.sync_skills()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def drop_question_bundle(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    A question edited or deleted on its own makes the session's interview
+    bundle stale; the next candidate request rebuilds it. Cascades from a
+    deleted session, candidate or job are skipped, and bulk writes rebuild
+    the bundle themselves (see interview_bundle.py).
+    """
+    if raw:
+        return
+    if kwargs['signal'] is post_delete and not (
+        isinstance(origin, Question) or (isinstance(origin, QuerySet) and origin.model is Question)
+    ):
+        return
+    InterviewSession.objects.filter(pk=instance.session_id).update(question_bundle=None)
+
+
+@receiver(post_save, sender=InterviewSession)
+@receiver(post_delete, sender=InterviewSession)
+def bump_candidate_status_from_session(sender, instance, raw=False, **kwargs):
+    """A session's status shows on the job status endpoint."""
+    if not raw:
+        Candidate.objects.filter(pk=instance.candidate_id).update(status_changed_at=timezone.now())
+
+
+@receiver(post_save, sender=InterviewLink)
+@receiver(post_delete, sender=InterviewLink)
+def bump_candidate_status_from_link(sender, instance, raw=False, **kwargs):
+    """So does the interview link once it has been created."""
+    if not raw:
+        Candidate.objects.filter(session__id=instance.session_id).update(status_changed_at=timezone.now())
+
+
+def _previous(instance, fields, update_fields=None):
+    """The stored values of `fields` before this save, or None for a new row."""
+    if instance._state.adding or instance.pk is None:
+        return None
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return False
+    return type(instance)._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _job_of_session(session):
+    try:
+        return session.candidate.job_id
+    except Candidate.DoesNotExist:
+        return None
+
+
+@receiver(post_save, sender=Job)
+def create_job_stats(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        JobStats.objects.get_or_create(job=instance)
+
+
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def count_candidate(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if kwargs['signal'] is post_delete:
+        job_stats.adjust(instance.job_id, create=False, candidates=-1)
+    elif created:
+        job_stats.adjust(instance.job_id, candidates=1)
+
+
+@receiver(pre_save, sender=InterviewSession)
+@receiver(pre_save, sender=Evaluation)
+@receiver(pre_save, sender=CandidateProcessing)
+def remember_stats_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keeps the counted fields as stored, so post_save can tell what changed."""
+    if raw:
+        return
+    fields = {
+        InterviewSession: ('status',),
+        Evaluation: ('overall_score', 'cheating_flag'),
+        CandidateProcessing: ('status',),
+    }[sender]
+    instance._stats_previous = _previous(instance, fields, update_fields)
+
+
+@receiver(post_save, sender=InterviewSession)
+@receiver(post_delete, sender=InterviewSession)
+def count_session_status(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if kwargs['signal'] is post_delete:
+        job_stats.session_status_changed(_job_of_session(instance), instance.status, None, create=False)
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is False:
+        return
+    old_status = previous[0] if previous else None
+    if old_status != instance.status:
+        job_stats.session_status_changed(_job_of_session(instance), old_status, instance.status)
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+def count_evaluation(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.overall_score, instance.cheating_flag)
+    if kwargs['signal'] is post_delete:
+        job_stats.evaluation_changed(instance.job_id, current, None)
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is False or previous == current:
+        return
+    job_stats.evaluation_changed(instance.job_id, previous, current)
+
+
+@receiver(post_save, sender=CandidateProcessing)
+@receiver(post_delete, sender=CandidateProcessing)
+def count_processing_failure(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if kwargs['signal'] is post_delete:
+        old_status, new_status = instance.status, None
+    else:
+        previous = getattr(instance, '_stats_previous', None)
+        if previous is False:
+            return
+        old_status, new_status = (previous[0] if previous else None), instance.status
+    if (old_status == 'FAILED') == (new_status == 'FAILED'):
+        return
+    job_id = Candidate.objects.filter(pk=instance.candidate_id).values_list('job_id', flat=True).first()
+    job_stats.processing_status_changed(job_id, old_status, new_status, create=new_status is not None)
+
+
+# --- Status board events (streamed by job_events.job_events) ---
+
+@receiver(post_save, sender=Candidate)
+def candidate_added_event(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        job_events.record(instance.job_id, instance.id, 'candidate', job_events.status_row(instance))
+
+
+@receiver(post_save, sender=CandidateProcessing)
+def processing_event(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'status', 'pipeline_stage'} & set(update_fields)):
+        return
+    job_id = instance.candidate.job_id
+    job_events.record(job_id, instance.candidate_id, 'processing', {
+        "id": instance.candidate_id, "stage": instance.pipeline_stage, "state": instance.status
+    })
+
+
+@receiver(post_save, sender=InterviewSession)
+def session_status_event(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if not created and (previous is False or (previous and previous[0] == instance.status)):
+        return
+    job_id = _job_of_session(instance)
+    if job_id is not None:
+        job_events.record(job_id, instance.candidate_id, 'status', {"id": instance.candidate_id, "status": instance.status})
+
+
+@receiver(post_save, sender=InterviewLink)
+def link_created_event(sender, instance, created=False, raw=False, **kwargs):
+    if not created or raw:
+        return
+    candidate = Candidate.objects.filter(session__id=instance.session_id).values_list('id', 'job_id').first()
+    if candidate:
+        candidate_id, job_id = candidate
+        job_events.record(job_id, candidate_id, 'status', {"id": candidate_id, "link": job_events.interview_url(instance.token)})
@@ -0,0 +1,160 @@
+"""
+Skill detection against a skills taxonomy.
+
+The fallbacks used to look for about fifteen hard-coded keywords with
+`kw.lower() in text.lower()`, which missed most skills and matched "Java"
+inside "JavaScript". SkillMatcher loads the taxonomy in
+hr_system/data/skills.json (SKILL_TAXONOMY_PATH): canonical skill names
+grouped by category, each with aliases ("k8s" -> Kubernetes). Every alias
+is compiled into one trie-shaped regex, so a resume is scanned in a single
+pass however large the taxonomy is. The longest alias wins at each position,
+and "C++", "C#" and ".NET" keep their symbols while "Java" does not match
+"JavaScript".
+
+Aliases that are ordinary words or names ("Go", "Spark", "Excel") are
+listed under "case_sensitive" and only match with that exact spelling.
+"""
+
+import json
+import re
+import threading
+from collections import namedtuple
+from django.conf import settings
+
+SkillHit = namedtuple('SkillHit', ['skill', 'category', 'count', 'positions'])
+
+# Same boundaries as resume_compression._term_pattern, plus "&" so "R&D" is not R.
+# A trailing "." only ends a match when no word character follows ("Node." but not "Node.x")
+BOUNDARY_BEFORE = r'(?<![\w+#.&])'
+BOUNDARY_AFTER = r'(?![\w+#&]|\.\w)'
+
+
+def normalize_alias(alias):
+    return " ".join(alias.lower().split())
+
+
+def _trie_pattern(aliases):
+    """A regex alternation of `aliases` factored on shared prefixes; longer aliases are tried first."""
+    trie = {}
+    for alias in aliases:
+        node = trie
+        for ch in alias:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    return _node_pattern(trie)
+
+
+def _node_pattern(node):
+    branches = [
+        (r'\s+' if ch == ' ' else re.escape(ch)) + _node_pattern(child)
+        for ch, child in sorted(node.items()) if ch
+    ]
+    if not branches:
+        return ''
+    ends_here = '' in node
+    if len(branches) == 1 and not ends_here:
+        return branches[0]
+    # A greedy optional group, so the longer alias is preferred over the one ending here
+    return '(?:' + '|'.join(branches) + ')' + ('?' if ends_here else '')
+
+
+class SkillMatcher:
+    """Finds taxonomy skills in text with one compiled pattern."""
+
+    def __init__(self, taxonomy):
+        self.categories = {}
+        self.aliases = {}
+        case_sensitive = {normalize_alias(a): a for a in taxonomy.get('case_sensitive', [])}
+
+        for category, entries in taxonomy['skills'].items():
+            for entry in entries:
+                names = [entry] if isinstance(entry, str) else entry
+                skill = names[0]
+                self.categories.setdefault(skill, category)
+                for alias in names:
+                    # The first entry to claim an alias keeps it
+                    self.aliases.setdefault(normalize_alias(alias), skill)
+
+        exact = sorted(case_sensitive[a] for a in self.aliases if a in case_sensitive)
+        folded = sorted(a for a in self.aliases if a not in case_sensitive)
+        alternatives = [_trie_pattern(folded)]
+        if exact:
+            alternatives.insert(0, '(?-i:' + _trie_pattern(exact) + ')')
+        self.pattern = re.compile(
+            BOUNDARY_BEFORE + '(?:' + '|'.join(alternatives) + ')' + BOUNDARY_AFTER,
+            re.I
+        )
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def canonical(self, name):
+        """The canonical skill for a name or alias, or None when it is not in the taxonomy."""
+        return self.aliases.get(normalize_alias(name or ''))
+
+    def finditer(self, text):
+        """Yields (skill, start, end) for every skill mention in the text."""
+        for match in self.pattern.finditer(text or ''):
+            yield self.aliases[normalize_alias(match.group())], match.start(), match.end()
+
+    def scan(self, text):
+        """SkillHits for the text, most mentioned first (ties in order of first mention)."""
+        positions = {}
+        for skill, start, _ in self.finditer(text):
+            positions.setdefault(skill, []).append(start)
+        hits = [
+            SkillHit(skill, self.categories[skill], len(found), found)
+            for skill, found in positions.items()
+        ]
+        hits.sort(key=lambda hit: (-hit.count, hit.positions[0]))
+        return hits
+
+    def scan_many(self, texts):
+        """scan() over {key: text}, returning {key: hits}."""
+        return {key: self.scan(text) for key, text in texts.items()}
+
+    def top_skills(self, text, limit=None, category=None, prefer=None, hits=None):
+        """
+        Canonical names of the skills found in the text, optionally limited to
+        one category. Skills named in `prefer` (e.g. the job's required skills)
+        come first. Pass `hits` to reuse an earlier scan of the same text.
+        """
+        hits = self.scan(text) if hits is None else hits
+        preferred = {self.canonical(name) for name in prefer or []}
+        ranked = sorted(
+            (hit for hit in hits if category is None or hit.category == category),
+            key=lambda hit: hit.skill not in preferred
+        )
+        names = [hit.skill for hit in ranked]
+        return names[:limit] if limit is not None else names
+
+
+def split_skills(required_skills):
+    """A job's required_skills string as a list of names."""
+    return [s.strip() for s in re.split(r'[,;/\n|]', required_skills or '') if s.strip()]
+
+
+def scan_job_resumes(job):
+    """Scans the resumes of all of a job's candidates in one query: {candidate_id: hits}."""
+    from .models import Resume
+
+    texts = dict(
+        Resume.objects.filter(candidate__job=job).values_list('candidate_id', 'raw_text').iterator()
+    )
+    return get_skill_matcher().scan_many(texts)
+
+
+_skill_matcher = None
+_skill_matcher_lock = threading.Lock()
+
+
+def get_skill_matcher():
+    """Get or create the skill matcher singleton (compiled on first use)"""
+    global _skill_matcher
+    if _skill_matcher is None:
+        with _skill_matcher_lock:
+            if _skill_matcher is None:
+                _skill_matcher = SkillMatcher.from_file(settings.SKILL_TAXONOMY_PATH)
+    return _skill_matcher
@@ -1,151 +1,225 @@
-import os
-import uuid
-from datetime import timedelta
+import csv
 from django.utils import timezone
 from background_task import background
-from .models import Candidate, Resume, InterviewSession, InterviewLink, Question, EmailLog, CodingQuestionBank, Job
-from pypdf import PdfReader
-import google.generativeai as genai
+from background_task.models import Task
+from .models import Candidate, Question, CandidateImport, CandidateProcessing
+from collections import namedtuple
+from .pdf_extraction import extract_pdf_text
+from .skill_matcher import get_skill_matcher
+from .workers import PRIORITY_BULK, PRIORITY_DEFAULT, job_queue
 from django.conf import settings
-from django.core.mail import send_mail
 
-# Configure Gemini
-# genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+ParsedResume = namedtuple('ParsedResume', ['text', 'parsed_ok', 'truncated'])
+
+# Skills kept in top_skills by the regex metadata fallback
+FALLBACK_TOP_SKILLS = 10
 
 @background(schedule=0)
 def process_candidate_task(candidate_id):
-    try:
-        print(f"--- [TASK] Starting processing for Candidate ID: {candidate_id} ---")
-        candidate = Candidate.objects.get(id=candidate_id)
-        job = candidate.job
-
-        # 1. Parse Resume (Non-AI)
-        resume_text = ""
-        if candidate.resume_file:
-            try:
-                reader = PdfReader(candidate.resume_file.path)
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        resume_text += text
-                if not resume_text.strip():
-                    resume_text = f"Warning: PDF file uploaded ({candidate.resume_file.name}) but no text could be extracted."
-            except Exception as e:
-                resume_text = f"Error parsing uploaded PDF ({candidate.resume_file.name}): {str(e)}"
-        elif candidate.resume_url:
-            try:
-                import requests
-                from bs4 import BeautifulSoup
-                
-                # Normalize Google Sheets URLs
-                final_url = candidate.resume_url
-                if "docs.google.com/spreadsheets" in final_url and "pubhtml" in final_url:
-                    # Convert pubhtml to pub?output=csv
-                    import re
-                    # Remove /u/1/ or similar if present
-                    final_url = re.sub(r'/u/\d+/', '/', final_url)
-                    final_url = final_url.replace("/pubhtml", "/pub?output=csv")
-                    print(f"--- [TASK] Normalized Google Sheets URL to: {final_url} ---")
-
-                # Fetch content from URL
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-                print(f"--- [TASK] Fetching URL: {final_url} ---")
-                response = requests.get(final_url, headers=headers, timeout=15)
-                
-                if response.status_code == 200:
-                    content_type = response.headers.get('Content-Type', '')
-                    if 'text/csv' in content_type or final_url.endswith('csv') or 'output=csv' in final_url:
-                        # Parse as CSV
-                        import csv
-                        from io import StringIO
-                        f = StringIO(response.text)
-                        reader = csv.reader(f)
-                        data_rows = [", ".join(row) for row in reader if any(row)]
-                        fetched_text = "\n".join(data_rows)
-                        print(f"--- [TASK] Parsed as CSV: {len(data_rows)} rows ---")
-                    else:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # 1. Try Meta Description (Google Sheets often puts summary here)
-                        meta_desc = soup.find('meta', attrs={"property": "og:description"}) or soup.find('meta', attrs={"name": "description"})
-                        meta_content = meta_desc['content'] if meta_desc and meta_desc.has_attr('content') else ""
-                        
-                        # 2. Try Tables (Ritz tables in Sheets)
-                        rows = []
-                        for row in soup.find_all('tr'):
-                            cols = [td.get_text(strip=True) for td in row.find_all(['td', 'th'])]
-                            if any(cols):
-                                rows.append(" | ".join(cols))
-                        
-                        table_content = "\n".join(rows) if rows else ""
-                        
-                        # Combine or prioritize
-                        fetched_text = f"{meta_content}\n\n{table_content}".strip()
-                        if not fetched_text:
-                            fetched_text = soup.get_text(separator=' ', strip=True)
-                    
-                    print(f"--- [TASK] Successfully fetched {len(fetched_text)} chars from URL ---")
-                    resume_text = f"Resume Source: External Link ({candidate.resume_url})\n\n--- FETCHED CONTENT ---\n{fetched_text}"
-                else:
-                    print(f"--- [TASK] URL Fetch FAILED with Status: {response.status_code} ---")
-                    resume_text = f"Resume Source: External Link ({candidate.resume_url})\n\n[ERROR]: Could not fetch content (Status: {response.status_code})"
-            except Exception as e:
-                resume_text = f"Resume Source: External Link ({candidate.resume_url})\n\n[ERROR]: Failed to fetch/parse URL content: {str(e)}"
-        else:
-            resume_text = "No resume provided. Questions generated based on Job Description only."
-        
-        # 2. Extract Metadata (AI)
-        metadata = extract_resume_metadata(resume_text, candidate)
-        
-        # Avoid creating duplicates if task is retried
-        Resume.objects.update_or_create(
-            candidate=candidate, 
-            defaults={
-                'raw_text': resume_text,
-                'extracted_metadata': metadata
-            }
-        )
+    """
+    Entry point for candidate processing. Starts the staged pipeline
+    (see pipeline.py), or resumes it from the candidate's last checkpoint.
+    """
+    from .pipeline import start_pipeline
 
-        # 3. Create Interview Session with Snapshot
-        session, created = InterviewSession.objects.get_or_create(
-            candidate=candidate,
-            defaults={
-                'oral_question_count': job.oral_question_count,
-                'coding_question_count': job.coding_question_count,
-                'thinking_time': job.thinking_time,
-                'recording_time': job.recording_time,
-                'coding_time': job.coding_time
-            }
-        )
+    print(f"--- [TASK] Starting processing for Candidate ID: {candidate_id} ---")
+    start_pipeline(candidate_id)
 
-        # 3. Generate Interview Link
-        expiry_date = timezone.now() + timedelta(days=7)
-        link, created = InterviewLink.objects.get_or_create(
-            session=session,
-            defaults={
-                'token': str(uuid.uuid4()),
-                'expires_at': expiry_date
-            }
-        )
+@background(schedule=0)
+def process_candidates_task(candidate_ids):
+    """
+    Bulk variant of process_candidate_task: runs the pipeline for a chunk of
+    candidates in one task (see pipeline.process_candidates).
+    """
+    from .pipeline import process_candidates
+
+    print(f"--- [TASK] Starting processing for {len(candidate_ids)} candidates ---")
+    process_candidates(candidate_ids)
+
+@background(schedule=0)
+def run_pipeline_stage_task(candidate_id, stage):
+    """Runs a single pipeline stage. Scheduled by the pipeline itself."""
+    from .pipeline import run_stage
+
+    run_stage(candidate_id, stage)
+
+@background(schedule=0)
+def upgrade_questions_task(candidate_id):
+    """
+    Replaces provisional (question bank) questions with personalized ones,
+    unless the candidate has already opened their link.
+    """
+    from .pipeline import upgrade_provisional_questions
 
-        # 4. Generate Oral Questions (Gemini)
-        if not session.questions.filter(question_type='ORAL').exists():
-            generate_oral_questions(session, job.description, resume_text)
+    upgrade_provisional_questions(candidate_id)
 
-        # 5. Generate Coding Questions (Gemini - DYNAMIC, NO BANK)
-        if not session.questions.filter(question_type='CODING').exists():
-            generate_coding_questions(session, job.description, resume_text)
+def normalize_resume_url(url):
+    """
+    Canonical form of a resume link: lowercase scheme and host, no fragment,
+    and published Google Sheets pages rewritten to their CSV export.
+    """
+    import re
+    from urllib.parse import urlsplit, urlunsplit
+
+    parts = urlsplit(url.strip())
+    final_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ''))
 
-        # 6. Email Link
-        send_interview_email_task(candidate.id, link.token)
+    # Normalize Google Sheets URLs
+    if "docs.google.com/spreadsheets" in final_url and "pubhtml" in final_url:
+        # Convert pubhtml to pub?output=csv
+        # Remove /u/1/ or similar if present
+        final_url = re.sub(r'/u/\d+/', '/', final_url)
+        final_url = final_url.replace("/pubhtml", "/pub?output=csv")
+    return final_url
 
+def parse_resume(candidate):
+    """
+    Extracts raw resume text from the uploaded PDF or the resume link (Non-AI).
+    Unreadable files and failed fetches are reported inside the returned text.
+
+    Returns a ParsedResume. parsed_ok is False when the text is an error or
+    warning message rather than resume content; truncated is set when a PDF
+    hit the extraction deadline, page cap or memory limit.
+    """
+    resume_text = ""
+    parsed_ok = False
+    truncated = False
+    if candidate.resume_file:
+        try:
+            # Runs in the PDF process pool with a deadline and page cap
+            result = extract_pdf_text(candidate.resume_file.path)
+            resume_text = result.text
+            truncated = result.truncated
+            if truncated:
+                print(f"--- [TASK] PDF truncated ({result.reason}): {result.pages_extracted}/{result.pages_total} pages extracted ---")
+            parsed_ok = bool(resume_text.strip())
+            if not parsed_ok:
+                resume_text = f"Warning: PDF file uploaded ({candidate.resume_file.name}) but no text could be extracted."
+        except Exception as e:
+            resume_text = f"Error parsing uploaded PDF ({candidate.resume_file.name}): {str(e)}"
+    elif candidate.resume_url:
+        try:
+            from bs4 import BeautifulSoup
+            from .resume_fetcher import get_resume_fetcher
+            
+            final_url = normalize_resume_url(candidate.resume_url)
+
+            # Fetch content from URL (pooled session, on-disk HTTP cache, size cap)
+            print(f"--- [TASK] Fetching URL: {final_url} ---")
+            response = get_resume_fetcher().fetch(final_url)
+            truncated = response.truncated
+            
+            if response.status_code == 200:
+                content_type = response.content_type
+                if 'text/csv' in content_type or final_url.endswith('csv') or 'output=csv' in final_url:
+                    # Parse as CSV
+                    import csv
+                    from io import StringIO
+                    f = StringIO(response.text)
+                    reader = csv.reader(f)
+                    data_rows = [", ".join(row) for row in reader if any(row)]
+                    fetched_text = "\n".join(data_rows)
+                    print(f"--- [TASK] Parsed as CSV: {len(data_rows)} rows ---")
+                else:
+                    soup = BeautifulSoup(response.content, 'html.parser')
+                    
+                    # 1. Try Meta Description (Google Sheets often puts summary here)
+                    meta_desc = soup.find('meta', attrs={"property": "og:description"}) or soup.find('meta', attrs={"name": "description"})
+                    meta_content = meta_desc['content'] if meta_desc and meta_desc.has_attr('content') else ""
+                    
+                    # 2. Try Tables (Ritz tables in Sheets)
+                    rows = []
+                    for row in soup.find_all('tr'):
+                        cols = [td.get_text(strip=True) for td in row.find_all(['td', 'th'])]
+                        if any(cols):
+                            rows.append(" | ".join(cols))
+                    
+                    table_content = "\n".join(rows) if rows else ""
+                    
+                    # Combine or prioritize
+                    fetched_text = f"{meta_content}\n\n{table_content}".strip()
+                    if not fetched_text:
+                        fetched_text = soup.get_text(separator=' ', strip=True)
+                
+                print(f"--- [TASK] Successfully fetched {len(fetched_text)} chars from URL ---")
+                resume_text = f"Resume Source: External Link ({candidate.resume_url})\n\n--- FETCHED CONTENT ---\n{fetched_text}"
+                parsed_ok = True
+            else:
+                print(f"--- [TASK] URL Fetch FAILED with Status: {response.status_code} ---")
+                resume_text = f"Resume Source: External Link ({candidate.resume_url})\n\n[ERROR]: Could not fetch content (Status: {response.status_code})"
+        except Exception as e:
+            resume_text = f"Resume Source: External Link ({candidate.resume_url})\n\n[ERROR]: Failed to fetch/parse URL content: {str(e)}"
+    else:
+        resume_text = "No resume provided. Questions generated based on Job Description only."
+
+    return ParsedResume(resume_text, parsed_ok, truncated)
+
+@background(schedule=0)
+def import_candidates_task(import_id):
+    """Streams a saved CSV roster into candidates, recording progress on the CandidateImport."""
+    from .ingestion import run_candidate_import
+
+    candidate_import = CandidateImport.objects.select_related('job').get(id=import_id)
+    if candidate_import.status == 'COMPLETED':
+        return
+    try:
+        print(f"--- [TASK] Starting candidate import {import_id} for Job ID: {candidate_import.job_id} "
+              f"from row {candidate_import.rows_processed} ---")
+        run_candidate_import(candidate_import)
+        print(f"--- [TASK] Import {import_id} done: {candidate_import.rows_succeeded} added, {candidate_import.rows_failed} failed ---")
     except Exception as e:
-        print(f"Error processing candidate {candidate_id}: {str(e)}")
+        print(f"Error importing candidates for import {import_id}: {str(e)}")
+        candidate_import.status = 'FAILED'
+        candidate_import.last_error = str(e)
+        candidate_import.completed_at = timezone.now()
+        candidate_import.save(update_fields=['status', 'last_error', 'completed_at'])
+        # A file that is not UTF-8 CSV fails the same way every time; anything
+        # else (database, storage) is retried by background_task, resuming
+        # after the rows already saved
+        if not isinstance(e, (UnicodeDecodeError, csv.Error)):
+            raise
 
-def generate_oral_questions(session, jd_text, resume_text):
+def enqueue_candidate_processing(candidate_ids, job_id=None, priority=PRIORITY_BULK):
+    """
+    Schedules processing for many candidates with a single insert, one
+    process_candidates_task per PIPELINE_BATCH_SIZE candidates, on the job's
+    queue. The priority sticks to the candidate's later pipeline stages.
+    """
+    candidate_ids = list(candidate_ids)
+    CandidateProcessing.objects.bulk_create(
+        [CandidateProcessing(candidate_id=candidate_id, priority=priority) for candidate_id in candidate_ids],
+        ignore_conflicts=True
+    )
+    size = settings.PIPELINE_BATCH_SIZE
+    Task.objects.bulk_create([
+        Task.objects.new_task(
+            process_candidates_task.name, args=(candidate_ids[i:i + size],), priority=priority, queue=job_queue(job_id)
+        )
+        for i in range(0, len(candidate_ids), size)
+    ])
+
+def enqueue_pipeline_stages(stages):
+    """Schedules run_pipeline_stage_task for many (candidate_id, stage) pairs with a single insert."""
+    options = {
+        candidate_id: (priority, job_queue(job_id))
+        for candidate_id, priority, job_id in CandidateProcessing.objects.filter(
+            candidate_id__in=[candidate_id for candidate_id, _ in stages]
+        ).values_list('candidate_id', 'priority', 'candidate__job_id')
+    }
+    new_tasks = []
+    for candidate_id, stage in stages:
+        priority, queue = options.get(candidate_id, (PRIORITY_DEFAULT, None))
+        new_tasks.append(Task.objects.new_task(
+            run_pipeline_stage_task.name, args=(candidate_id, stage), priority=priority, queue=queue
+        ))
+    Task.objects.bulk_create(new_tasks)
+
+def generate_oral_questions(session, jd_text, resume_text, allow_fallback=True):
     """
     Uses Gemini to generate DYNAMIC oral questions based on JD and Resume.
     Each candidate gets unique questions tailored to their background.
+    With allow_fallback=False, Gemini errors propagate so the pipeline can retry.
+    Returns the unsaved Question rows; the caller saves them.
     """
     from .gemini_service import get_gemini_generator
     
@@ -165,12 +239,22 @@ def generate_oral_questions(session, jd_text, resume_text):
         candidate_name=session.candidate.name,
         experience_level=job.experience_level,
         required_skills=job.required_skills,
-        num_questions=session.oral_question_count
+        num_questions=session.oral_question_count,
+        allow_fallback=allow_fallback,
+        job_id=job.id
     )
     
+    print(f"--- [DYNAMIC GENERATION] Generated {len(questions_data)} oral questions ---")
+    return build_oral_questions(session, questions_data, 'gemini' if generator.is_available() else 'fallback')
+
+def build_oral_questions(session, questions_data, generated_by):
+    """Unsaved Question rows for generated oral question dicts."""
+    job = session.candidate.job
+    
     # Create Question objects with full metadata
+    questions = []
     for i, q_data in enumerate(questions_data):
-        Question.objects.create(
+        questions.append(Question(
             session=session,
             text=q_data.get('question', 'Question generation failed'),
             question_type='ORAL',
@@ -180,7 +264,7 @@ def generate_oral_questions(session, jd_text, resume_text):
             focus_area=q_data.get('focus_area', 'General'),
             difficulty=q_data.get('difficulty', 'Medium'),
             gemini_metadata={
-                'generated_by': 'gemini' if generator.is_available() else 'fallback',
+                'generated_by': generated_by,
                 'candidate_id': session.candidate.id,
                 'job_id': job.id,
                 'generation_timestamp': str(timezone.now()),
@@ -188,15 +272,17 @@ def generate_oral_questions(session, jd_text, resume_text):
                 'jd_based': True
             },
             is_dynamic=True
-        )
-    
-    print(f"--- [DYNAMIC GENERATION] Successfully created {len(questions_data)} oral questions ---")
+        ))
+    return questions
 
-def generate_coding_questions(session, jd_text, resume_text):
+def generate_coding_questions(session, jd_text, resume_text, allow_fallback=True):
     """
     Uses Gemini to generate DYNAMIC coding questions based on JD and Resume.
-    NO STATIC QUESTION BANK IS USED.
     Each candidate gets unique coding problems tailored to the role and their skills.
+    The question bank is only used for provisional questions when Gemini misses
+    QUESTION_GENERATION_DEADLINE_SECONDS (see pipeline._questions_within_deadline).
+    With allow_fallback=False, Gemini errors propagate so the pipeline can retry.
+    Returns the unsaved Question rows; the caller saves them.
     """
     from .gemini_service import get_gemini_generator
     
@@ -211,10 +297,20 @@ def generate_coding_questions(session, jd_text, resume_text):
         resume_text=resume_text,
         experience_level=job.experience_level,
         required_skills=job.required_skills,
-        num_questions=session.coding_question_count
+        num_questions=session.coding_question_count,
+        allow_fallback=allow_fallback,
+        job_id=job.id
     )
     
+    print(f"--- [DYNAMIC GENERATION] Generated {len(questions_data)} coding questions ---")
+    return build_coding_questions(session, questions_data, 'gemini' if generator.is_available() else 'fallback')
+
+def build_coding_questions(session, questions_data, generated_by):
+    """Unsaved Question rows for generated coding question dicts, ordered after the oral ones."""
+    job = session.candidate.job
+    
     # Create Question objects with full metadata
+    questions = []
     for i, q_data in enumerate(questions_data):
         # Combine problem and input/output format for the full question text
         full_problem = q_data.get('problem', 'Coding problem generation failed')
@@ -222,7 +318,7 @@ def generate_coding_questions(session, jd_text, resume_text):
         if io_format:
             full_problem += f"\n\n{io_format}"
         
-        Question.objects.create(
+        questions.append(Question(
             session=session,
             text=full_problem,
             question_type='CODING',
@@ -232,7 +328,7 @@ def generate_coding_questions(session, jd_text, resume_text):
             focus_area=q_data.get('focus_area', 'Coding Challenge'),
             difficulty=q_data.get('difficulty', 'Medium'),
             gemini_metadata={
-                'generated_by': 'gemini' if generator.is_available() else 'fallback',
+                'generated_by': generated_by,
                 'candidate_id': session.candidate.id,
                 'job_id': job.id,
                 'generation_timestamp': str(timezone.now()),
@@ -241,122 +337,89 @@ def generate_coding_questions(session, jd_text, resume_text):
                 'problem_type': 'coding_challenge'
             },
             is_dynamic=True
-        )
+        ))
+    return questions
+
+def fallback_resume_metadata(text, candidate):
+    """Regex-based metadata, used when Gemini is unavailable or too slow."""
+    import re
+
+    metadata = {
+        "full_name": candidate.name or "Unknown",
+        "email": candidate.email or "Unknown",
+        "top_skills": [],
+        "experience_years": 0,
+        "summary": "Auto-generated summary from raw text.",
+        "education": "Not Provided",
+        "parsing_status": "Dynamic Fallback (Gemini API Key Missing)"
+    }
+    
+    # 1. Refine Email if unknown
+    if metadata["email"] == "Unknown":
+        emails = re.findall(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+', text)
+        if emails:
+            metadata["email"] = emails[0]
+        
+    # 2. Skill Detection
+    metadata["top_skills"] = get_skill_matcher().top_skills(text, limit=FALLBACK_TOP_SKILLS)
+    
+    # 3. Experience Detection
+    exp_match = re.search(r'(\d+)\+?\s*(years|yrs)\s*(exp|experience)', text, re.I)
+    if exp_match:
+        try:
+            metadata["experience_years"] = int(exp_match.group(1))
+        except:
+            metadata["experience_years"] = 1
     
-    print(f"--- [DYNAMIC GENERATION] Successfully created {len(questions_data)} coding questions ---")
+    return metadata
 
-def extract_resume_metadata(resume_text, candidate):
+def extract_resume_metadata(resume_text, candidate, allow_fallback=True):
     """
     Uses Gemini to extract structured metadata from the resume text.
     If no API key, uses a smart regex-based fallback to avoid "static" data.
+    With allow_fallback=False, Gemini errors propagate so the pipeline can retry.
     """
-    import re
-    
-    def smart_fallback(text, candidate):
-        metadata = {
-            "full_name": candidate.name or "Unknown",
-            "email": candidate.email or "Unknown",
-            "top_skills": [],
-            "experience_years": 0,
-            "summary": "Auto-generated summary from raw text.",
-            "education": "Not Provided",
-            "parsing_status": "Dynamic Fallback (Gemini API Key Missing)"
-        }
-        
-        # 1. Refine Email if unknown
-        if metadata["email"] == "Unknown":
-            emails = re.findall(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+', text)
-            if emails:
-                metadata["email"] = emails[0]
-            
-        # 2. Skill Detection
-        keywords = ["Python", "Java", "JavaScript", "React", "Node", "Django", "SQL", "AWS", "Docker", "Machine Learning", "CSV", "Excel"]
-        for kw in keywords:
-            if kw.lower() in text.lower():
-                metadata["top_skills"].append(kw)
-        
-        # 3. Experience Detection
-        exp_match = re.search(r'(\d+)\+?\s*(years|yrs)\s*(exp|experience)', text, re.I)
-        if exp_match:
-            try:
-                metadata["experience_years"] = int(exp_match.group(1))
-            except:
-                metadata["experience_years"] = 1
-        
-        return metadata
-
-    api_key = os.environ.get("GEMINI_API_KEY")
+    from .gemini_service import get_gemini_generator
+    generator = get_gemini_generator()
     # Pass candidate object to fallback
-    if not api_key:
-        return smart_fallback(resume_text, candidate)
-
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-pro')
-    
-    prompt = f"""
-    Act as a professional HR Data Parser. I will provide you with raw text extracted from a candidate's resume (which may be from a PDF or a CSV table). 
-
-    Your task:
-    1. Extract the following information into a valid JSON object.
-    2. If a field is missing, use "Not Provided".
-    3. For 'top_skills', create a list of the 5 most relevant technical skills.
-    4. For 'experience_years', provide a single integer (e.g., 5). If it's a range, take the highest number.
-
-    JSON Schema:
-    {{
-      "full_name": "string",
-      "email": "string",
-      "top_skills": ["skill1", "skill2"],
-      "experience_years": integer,
-      "summary": "A 2-sentence professional overview",
-      "education": "Highest degree and institution"
-    }}
-
-    Raw Resume Text:
-    ---
-    {resume_text}
-    ---
-
-    Return ONLY the JSON object. Do not include any introductory text or markdown code blocks.
-    """
+    if not generator.is_available():
+        return fallback_resume_metadata(resume_text, candidate)
     
     try:
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip()
-        # Remove markdown code blocks if present
-        if cleaned_response.startswith("```json"):
-            cleaned_response = cleaned_response[7:]
-        if cleaned_response.endswith("```"):
-            cleaned_response = cleaned_response[:-3]
-            
-        import json
-        return json.loads(cleaned_response.strip())
+        return generator.extract_resume_metadata(resume_text)
     except Exception as e:
+        if not allow_fallback:
+            raise
         print(f"Metadata Extraction Error: {str(e)}")
-        return smart_fallback(resume_text, candidate)
+        return fallback_resume_metadata(resume_text, candidate)
 
 @background(schedule=0)
 def send_interview_email_task(candidate_id, token):
-    try:
-        candidate = Candidate.objects.get(id=candidate_id)
-        email_log = EmailLog.objects.create(candidate=candidate)
-        
-        interview_url = f"{settings.FRONTEND_URL}/interview/{token}"
-        
-        subject = f"Interview Invitation for {candidate.job.title}"
-        message = f"Hello {candidate.name},\n\nYou have been invited for an initial screening interview.\n\nPlease use the following link to start your interview: {interview_url}\n\nThis link is for single-use and will expire in 7 days."
-        
-        try:
-            # send_mail(subject, message, settings.EMAIL_HOST_USER, [candidate.email])
-            print(f"MOCK EMAIL SENT TO {candidate.email}: {interview_url}")
-            email_log.status = 'SENT'
-            email_log.sent_at = timezone.now()
-            email_log.save()
-        except Exception as e:
-            email_log.status = 'FAILED'
-            email_log.last_error = str(e)
-            email_log.save()
-            # Retry logic could be added here or via background task retry settings
-            
-    except Exception as e:
-        print(f"Error sending email: {str(e)}")
+    """Queues a candidate's interview invitation for the email dispatcher."""
+    from .email_dispatch import queue_invitation
+
+    candidate = Candidate.objects.select_related('job').filter(id=candidate_id).first()
+    if candidate is None:
+        print(f"Error sending email: Candidate {candidate_id} no longer exists")
+        return
+    queue_invitation(candidate, token)
+
+@background(schedule=0)
+def dispatch_emails_task():
+    """Sends due emails (see email_dispatch.py) and schedules the next run while any are pending."""
+    from .email_dispatch import dispatch, schedule_dispatch
+
+    sent, failed, next_run = dispatch()
+    if sent or failed:
+        print(f"--- [EMAIL] Sent {sent} emails, {failed} failed ---")
+    if next_run is not None:
+        schedule_dispatch(next_run)
+
+@background(schedule=0)
+def prune_job_events_task():
+    """Deletes old status board events; scheduled hourly by `manage.py prune_job_events --schedule`."""
+    from .job_events import prune
+
+    deleted = prune()
+    if deleted:
+        print(f"--- [EVENTS] Pruned {deleted} status board events ---")
@@ -1,3 +1,1278 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from collections import Counter
+from datetime import timedelta
+from unittest import mock, skipIf
+import requests
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import PercentRank, RowNumber
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from background_task.models import Task
+from rest_framework.authtoken.models import Token
+from core.database import database_config
+from .models import (
+    HRUser, Job, Candidate, InterviewSession, InterviewLink, Question, Evaluation, CheatingLog,
+    CandidateProcessing, CandidateImport, CandidateEvent, JobStats, LLMCacheEntry, Skill, EmailLog,
+    ResumeCacheEntry, RateLimitBucket, Resume, Answer
+)
+from .email_dispatch import dispatch, queue_invitation
+from .gemini_service import GeminiQuestionGenerator
+from .ingestion import CandidateIngestor, ingest_candidate_rows
+from . import resume_cache, pdf_extraction, llm_cache, batch_generation, job_context, job_stats, pipeline, email_dispatch, job_events
+from .resume_compression import GAP_MARKER, compress_resume
+from .resume_fetcher import ResumeFetcher
+from .skill_matcher import get_skill_matcher, split_skills
+from .rate_limiter import RateLimiter, RateLimitTimeout
+from .tasks import import_candidates_task
+from .persistence import CandidateWrites, flush
+from .workers import PRIORITY_BULK, PRIORITY_MANUAL, claim_tasks, job_queue, release_tasks
 
-# Create your tests here.
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+JOBS = 4
+CANDIDATES_PER_JOB = 1500
+
+
+class HotQueryPlanTests(TestCase):
+    """
+    Seeds a few thousand candidates and checks the query plans of the hot
+    queries in views.py, pipeline.py and job_events.py: none of them may fall
+    back to scanning a whole table. On SQLite this reads EXPLAIN QUERY PLAN
+    (a full scan is "SCAN <table>"), on Postgres EXPLAIN ("Seq Scan on <table>").
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        jobs = Job.objects.bulk_create([
+            Job(title=f"Job {i}", description="d", required_skills="Python", experience_level="Mid")
+            for i in range(JOBS)
+        ])
+        candidates = Candidate.objects.bulk_create([
+            Candidate(job=job, name=f"c{i}", email=f"c{i}@job{job.id}.com")
+            for job in jobs for i in range(CANDIDATES_PER_JOB)
+        ])
+        sessions = InterviewSession.objects.bulk_create([
+            InterviewSession(candidate=c, oral_question_count=3, coding_question_count=1,
+                             thinking_time=1, recording_time=1, coding_time=1)
+            for c in candidates
+        ])
+        InterviewLink.objects.bulk_create([
+            InterviewLink(session=s, token=f"t{s.id}", expires_at=now + timedelta(days=7)) for s in sessions
+        ])
+        Question.objects.bulk_create([
+            Question(session=s, text="q", question_type=t, expected_skills="", time_limit=1, order=n)
+            for s in sessions for n, t in enumerate(('ORAL', 'ORAL', 'ORAL', 'CODING'))
+        ])
+        CheatingLog.objects.bulk_create([
+            CheatingLog(session=s, event_type='tab_switch', details="") for s in sessions[::3]
+        ])
+        Evaluation.objects.bulk_create([
+            Evaluation(session=s, job_id=c.job_id, overall_score=(c.id * 7) % 100, summary="")
+            for c, s in zip(candidates, sessions)
+        ])
+        CandidateProcessing.objects.bulk_create([
+            CandidateProcessing(candidate=c, status='FAILED' if c.id % 50 == 0 else 'DONE',
+                                failed_at=now if c.id % 50 == 0 else None)
+            for c in candidates
+        ])
+        CandidateEvent.objects.bulk_create([
+            CandidateEvent(job_id=c.job_id, candidate=c, kind='candidate', data={}) for c in candidates
+        ])
+        HRUser.objects.bulk_create([HRUser(username=f"hr{i}", email=f"hr{i}@x.com") for i in range(500)])
+        cls.job = jobs[0]
+        cls.candidate = candidates[0]
+        cls.session = sessions[0]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertNoFullScan(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            scans = re.findall(r'Seq Scan on (\w+)', plan)
+        else:
+            # "SCAN t USING COVERING INDEX" still visits every row
+            scans = re.findall(r'\bSCAN (\w+)', plan)
+        self.assertEqual(scans, [], f"Full scan in:\n{queryset.query}\n{plan}")
+
+    def test_status_board(self):
+        """JobViewSet.status: rows, ?since= and the ETag aggregate"""
+        candidates = Candidate.objects.filter(job_id=self.job.id)
+        self.assertNoFullScan(candidates.select_related('session__link').only(
+            'id', 'name', 'email', 'resume_file', 'resume_url', 'status_changed_at',
+            'session__status', 'session__link__token'
+        ).order_by('id'))
+        self.assertNoFullScan(candidates.filter(status_changed_at__gt=timezone.now() - timedelta(minutes=5)))
+        self.assertNoFullScan(candidates.order_by('-status_changed_at').values('status_changed_at')[:1])
+
+    def test_ranking(self):
+        order = [F('overall_score').desc(), F('id').asc()]
+        self.assertNoFullScan(Evaluation.objects.filter(job=self.job).annotate(
+            position=Window(RowNumber(), order_by=order),
+            percent_rank=Window(PercentRank(), order_by=F('overall_score').desc()),
+        ).order_by(*order).values('position', 'overall_score', 'session__candidate__name'))
+
+    def test_job_stats_max_score(self):
+        """job_stats.evaluation_changed re-reads the top score of one job"""
+        top = Evaluation.objects.filter(job_id=OuterRef('job_id')).order_by('-overall_score')
+        self.assertNoFullScan(JobStats.objects.filter(job_id=self.job.id).annotate(
+            top=Subquery(top.values('overall_score')[:1])
+        ))
+
+    def test_candidate_detail(self):
+        self.assertNoFullScan(Question.objects.filter(session=self.session).order_by('order', 'id'))
+        self.assertNoFullScan(self.session.cheating_logs.order_by('timestamp', 'id')[:100])
+
+    def test_pipeline(self):
+        # QUESTIONS stage: which question types does the session have already?
+        self.assertNoFullScan(Question.objects.filter(session=self.session).values_list('question_type').distinct())
+        self.assertNoFullScan(
+            InterviewSession.objects.select_related('candidate__job', 'candidate__resume_data', 'link')
+            .filter(candidate_id=self.candidate.id)
+        )
+        self.assertNoFullScan(InterviewLink.objects.filter(session__candidate=self.candidate))
+        # interview_bundle.refresh after a batch of questions is saved
+        self.assertNoFullScan(
+            Question.objects.filter(session_id__in=[self.session.id]).order_by('session_id', 'order', 'id')
+        )
+
+    def test_dead_letter_list(self):
+        failed = CandidateProcessing.objects.filter(status='FAILED').select_related('candidate')
+        self.assertNoFullScan(failed.order_by('-failed_at'))
+        self.assertNoFullScan(failed.filter(candidate__job_id=self.job.id).order_by('-failed_at'))
+
+    def test_event_stream(self):
+        self.assertNoFullScan(CandidateEvent.objects.filter(job_id=self.job.id, id__gt=100).order_by('id')[:200])
+
+    def test_lookups(self):
+        self.assertNoFullScan(HRUser.objects.filter(email="hr7@x.com"))
+        self.assertNoFullScan(InterviewLink.objects.select_related('session').filter(token="t1"))
+        self.assertNoFullScan(CandidateImport.objects.filter(job=self.job, idempotency_key="k"))
+        self.assertNoFullScan(LLMCacheEntry.objects.filter(key="k", expires_at__gt=timezone.now()))
+        self.assertNoFullScan(Skill.objects.filter(name__in=["Python", "Django"]))
+
+    def test_email_dispatch(self):
+        self.assertNoFullScan(
+            EmailLog.objects.filter(status='PENDING', next_attempt_at__lte=timezone.now()).order_by('next_attempt_at', 'id')
+        )
+
+
+class RecordingSMTPHandler:
+    """aiosmtpd handler that keeps what it receives and refuses recipients named bounce*."""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('bounce'):
+            return '550 No such user here'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return '250 Message accepted for delivery'
+
+
+@skipIf(Controller is None, "aiosmtpd is not installed")
+class EmailDispatchTests(TestCase):
+    """The dispatcher against a local SMTP server (aiosmtpd)."""
+
+    def setUp(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        self.handler = RecordingSMTPHandler()
+        controller = Controller(self.handler, hostname='127.0.0.1', port=port)
+        controller.start()
+        self.addCleanup(controller.stop)
+        smtp = self.settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1', EMAIL_PORT=port,
+            EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+            EMAIL_SEND_RATE_PER_MINUTE=60, EMAIL_BATCH_SIZE=50, EMAIL_MAX_RETRIES=3, EMAIL_RETRY_BACKOFF_SECONDS=60
+        )
+        smtp.enable()
+        self.addCleanup(smtp.disable)
+        self.job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid")
+
+    def queue(self, *emails):
+        for i, email in enumerate(emails):
+            candidate = Candidate.objects.create(job=self.job, name=f"c{i}", email=email)
+            queue_invitation(candidate, f"token-{i}")
+
+    def test_batch_over_one_connection(self):
+        self.queue(*[f"c{i}@x.com" for i in range(5)])
+        sent, failed, next_run = dispatch()
+        self.assertEqual((sent, failed, next_run), (5, 0, None))
+        self.assertEqual(self.handler.connections, 1)
+        self.assertEqual(sorted(m.rcpt_tos[0] for m in self.handler.messages), [f"c{i}@x.com" for i in range(5)])
+        self.assertIn(b"/interview/token-0", self.handler.messages[0].content)
+        self.assertEqual(EmailLog.objects.filter(status='SENT', sent_at__isnull=False).count(), 5)
+
+    def test_refused_recipient_backs_off(self):
+        self.queue("ok@x.com", "bounce@x.com")
+        sent, failed, next_run = dispatch()
+        self.assertEqual((sent, failed), (1, 1))
+        self.assertAlmostEqual(next_run, 60, delta=5)
+        bounced = EmailLog.objects.get(candidate__email="bounce@x.com")
+        self.assertEqual((bounced.status, bounced.retry_count), ('PENDING', 1))
+        self.assertIn("SMTPRecipientsRefused", bounced.last_error)
+
+        # Not due yet; then the second and third failures double the delay and give up
+        self.assertEqual(dispatch()[:2], (0, 0))
+        EmailLog.objects.filter(pk=bounced.pk).update(next_attempt_at=timezone.now())
+        self.assertAlmostEqual(dispatch()[2], 120, delta=5)
+        EmailLog.objects.filter(pk=bounced.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatch(), (0, 1, None))
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.retry_count), ('FAILED', 3))
+        self.assertEqual(len(self.handler.messages), 1)
+
+    def test_send_rate(self):
+        self.queue(*[f"c{i}@x.com" for i in range(5)])
+        with self.settings(EMAIL_SEND_RATE_PER_MINUTE=3):
+            sent, failed, next_run = dispatch()
+        self.assertEqual((sent, failed), (3, 0))
+        # The bucket refills at 3 a minute: the next batch of 2 needs about 40 seconds
+        self.assertAlmostEqual(next_run, 40, delta=2)
+        # and its claim was handed back rather than held until the lease runs out
+        self.assertEqual(EmailLog.objects.filter(status='PENDING', next_attempt_at__lte=timezone.now()).count(), 2)
+
+    def test_reserves_only_what_was_claimed(self):
+        self.queue(*[f"c{i}@x.com" for i in range(5)])
+        claim = email_dispatch._claim
+        calls = []
+
+        def claimed_elsewhere_first(email_ids):
+            if not calls:
+                # Another dispatcher takes two of the first batch in between
+                EmailLog.objects.filter(id__in=email_ids[:2]).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+            calls.append(email_ids)
+            return claim(email_ids)
+
+        with self.settings(EMAIL_SEND_RATE_PER_MINUTE=4), \
+                mock.patch.object(email_dispatch, '_claim', side_effect=claimed_elsewhere_first):
+            self.assertEqual(dispatch()[:2], (3, 0))
+        # 2 + 1 tokens out of 4, where reserving whole due batches would have needed 4 + 1
+        self.assertEqual([len(ids) for ids in calls], [4, 1])
+        self.assertAlmostEqual(RateLimitBucket.objects.get(name='email').token_tokens, 1, delta=0.1)
+
+
+class CandidateInterviewApiTests(TestCase):
+    """The token-based candidate endpoints in views.py."""
+
+    def setUp(self):
+        job = Job.objects.create(title="Backend", description="d", required_skills="Python", experience_level="Mid",
+                                 oral_question_count=2, coding_question_count=1)
+        self.job = job
+        self.candidate = Candidate.objects.create(job=job, name="Ada", email="ada@x.com")
+        writes = CandidateWrites(self.candidate)
+        session = writes.ensure_session()
+        writes.add_questions([
+            Question(session=session, text=f"q{n}", question_type=t, expected_skills="", time_limit=60, order=n)
+            for n, t in enumerate(('ORAL', 'ORAL', 'CODING'))
+        ])
+        flush([writes])
+        self.session = session
+        self.token = writes._link.token
+
+    def url(self, suffix=''):
+        return f"/api/interview/{self.token}/{suffix}"
+
+    def test_bundle_in_one_query(self):
+        InterviewLink.objects.filter(token=self.token).update(opened_at=timezone.now())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('hr_system_job', queries[0]['sql'])
+        self.assertNotIn('hr_system_resume', queries[0]['sql'])
+        data = response.json()
+        self.assertEqual(data['session']['status'], 'NOT_ATTEMPTED')
+        self.assertEqual((data['interview']['candidate'], data['interview']['job']), ("Ada", "Backend"))
+        self.assertEqual([q['text'] for q in data['interview']['questions']], ["q0", "q1", "q2"])
+        self.assertEqual(data['interview']['config']['coding_question_count'], 1)
+
+    def test_first_open_and_stale_bundle(self):
+        self.assertEqual(self.client.get(self.url()).status_code, 200)
+        self.assertIsNotNone(InterviewLink.objects.get(token=self.token).opened_at)
+        question = self.session.questions.get(order=0)
+        question.text = "edited"
+        question.save()
+        self.assertIsNone(InterviewSession.objects.get(pk=self.session.pk).question_bundle)
+        self.assertEqual(self.client.get(self.url()).json()['interview']['questions'][0]['text'], "edited")
+
+    def test_start_and_complete(self):
+        self.assertEqual(self.client.post(self.url('complete/')).status_code, 409)
+        response = self.client.post(self.url('start/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'IN_PROGRESS')
+        started_at = InterviewSession.objects.get(pk=self.session.pk).started_at
+        # Repeating the transition changes nothing
+        self.assertEqual(self.client.post(self.url('start/')).json()['status'], 'IN_PROGRESS')
+        self.assertEqual(InterviewSession.objects.get(pk=self.session.pk).started_at, started_at)
+        stats = JobStats.objects.get(job=self.job)
+        self.assertEqual((stats.not_attempted, stats.in_progress), (0, 1))
+
+        self.assertEqual(self.client.post(self.url('complete/')).json()['status'], 'COMPLETED')
+        self.assertTrue(InterviewLink.objects.get(token=self.token).is_used)
+        self.assertEqual(JobStats.objects.get(job=self.job).completed, 1)
+        self.assertEqual(self.client.post(self.url('complete/')).status_code, 200)
+        self.assertEqual(self.client.get(self.url()).status_code, 410)
+
+    def test_expired_and_unknown_links(self):
+        InterviewLink.objects.filter(token=self.token).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.client.get(self.url()).status_code, 410)
+        self.assertEqual(self.client.post(self.url('start/')).status_code, 410)
+        self.assertEqual(self.client.get("/api/interview/nope/").status_code, 404)
+
+
+class JobStatusTests(TestCase):
+    """JobViewSet.status: incremental rows and conditional GETs."""
+
+    def setUp(self):
+        self.client.force_login(HRUser.objects.create_user("hr", password="x"))
+        self.job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid")
+        self.url = f"/api/jobs/{self.job.id}/status/"
+
+    def test_unchanged_board_is_not_modified(self):
+        for populated in (False, True):
+            if populated:
+                Candidate.objects.create(job=self.job, name="A", email="a@x.com")
+            etag = self.client.get(self.url)['ETag']
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Candidate.objects.create(job=self.job, name="B", email="b@x.com")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_since_returns_changed_rows_only(self):
+        old = Candidate.objects.create(job=self.job, name="Old", email="old@x.com")
+        new = Candidate.objects.create(job=self.job, name="New", email="new@x.com")
+        cutoff = timezone.now()
+        Candidate.objects.filter(pk=old.pk).update(status_changed_at=cutoff - timedelta(minutes=5))
+        Candidate.objects.filter(pk=new.pk).update(status_changed_at=cutoff + timedelta(minutes=5))
+        rows = self.client.get(self.url, {"since": cutoff.isoformat()}).json()
+        self.assertEqual([row["id"] for row in rows], [new.id])
+        self.assertEqual(self.client.get(self.url, {"since": "yesterday"}).status_code, 400)
+
+
+class JobRankingTests(TestCase):
+    """JobViewSet.ranking: window-function rank and percentile over Evaluation.job."""
+
+    def setUp(self):
+        self.client.force_login(HRUser.objects.create_user("hr", password="x"))
+        self.job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid")
+        self.url = f"/api/jobs/{self.job.id}/ranking/"
+        for name, score in (("low", 40), ("top", 90), ("tie-a", 70), ("tie-b", 70)):
+            Evaluation.objects.create(session=self.session(name), overall_score=score, summary="")
+
+    def session(self, name):
+        candidate = Candidate.objects.create(job=self.job, name=name, email=f"{name}@x.com")
+        return InterviewSession.objects.create(candidate=candidate, oral_question_count=1, coding_question_count=1,
+                                               thinking_time=1, recording_time=1, coding_time=1)
+
+    def test_ranks_by_score_then_id(self):
+        rows = self.client.get(self.url).json()
+        self.assertEqual([(r["rank"], r["name"], r["percentile"]) for r in rows], [
+            (1, "top", 100.0), (2, "tie-a", 66.7), (3, "tie-b", 66.7), (4, "low", 0.0)
+        ])
+        self.assertEqual([r["name"] for r in self.client.get(self.url, {"top": 2}).json()], ["top", "tie-a"])
+        self.assertEqual([r["name"] for r in self.client.get(self.url, {"percentile": 50}).json()], ["top", "tie-a", "tie-b"])
+
+    def test_evaluation_job_is_required(self):
+        with self.assertRaises(IntegrityError):
+            Evaluation.objects.bulk_create([Evaluation(session=self.session("bulk"), summary="")])
+
+
+class JobStatsTests(TestCase):
+    """The signal-maintained JobStats counters never drift from job_stats.rebuild()."""
+
+    FIELDS = ('candidates', 'not_attempted', 'in_progress', 'completed', 'expired', 'evaluated',
+              'score_total', 'max_score', 'cheating_flags', 'processing_failures')
+
+    def setUp(self):
+        self.job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid",
+                                      oral_question_count=1, coding_question_count=0)
+
+    def assertNoDrift(self):
+        stored = JobStats.objects.filter(job=self.job).values_list(*self.FIELDS).get()
+        self.assertEqual(stored, tuple(getattr(job_stats.rebuild(self.job.id), f) for f in self.FIELDS))
+        return dict(zip(self.FIELDS, stored))
+
+    def test_counters_follow_every_write_path(self):
+        ingest_candidate_rows(self.job, [{"name": n, "email": f"{n}@x.com"} for n in ("a", "b", "c")])
+        a, b, c = Candidate.objects.filter(job=self.job).order_by('email')
+        writes = [CandidateWrites(candidate) for candidate in (a, b)]
+        for w in writes:
+            w.ensure_session()
+        flush(writes)
+        self.assertEqual(self.assertNoDrift()['not_attempted'], 2)
+
+        session_a, session_b = a.session, b.session
+        session_a.status = 'COMPLETED'
+        session_a.save()
+        Evaluation.objects.create(session=session_a, overall_score=80, summary="", cheating_flag=True)
+        evaluation_b = Evaluation.objects.create(session=session_b, overall_score=90, summary="")
+        # Lowering the top score looks the maximum up again
+        evaluation_b.overall_score = 50
+        evaluation_b.save()
+        self.assertEqual(self.assertNoDrift()['max_score'], 80)
+
+        CandidateProcessing.objects.filter(candidate=c).update(status='FAILED', failed_at=timezone.now())
+        job_stats.rebuild(self.job.id)
+        pipeline.retry_failed(CandidateProcessing.objects.filter(candidate=c))
+        processing = CandidateProcessing.objects.get(candidate=b)
+        processing.status = 'FAILED'
+        processing.save()
+        self.assertEqual(self.assertNoDrift()['processing_failures'], 1)
+
+        a.delete()
+        self.assertEqual(self.assertNoDrift(), {
+            'candidates': 2, 'not_attempted': 1, 'in_progress': 0, 'completed': 0, 'expired': 0, 'evaluated': 1,
+            'score_total': 50.0, 'max_score': 50.0, 'cheating_flags': 0, 'processing_failures': 1,
+        })
+
+
+class CandidateDetailTests(TestCase):
+    """CandidateDetailView: sparse fieldsets and a query count that does not grow with the data."""
+
+    def setUp(self):
+        self.client.force_login(HRUser.objects.create_user("hr", password="x"))
+        job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid")
+        self.candidate = Candidate.objects.create(job=job, name="Ada", email="ada@x.com")
+        Resume.objects.create(candidate=self.candidate, raw_text="0123456789")
+        self.session = InterviewSession.objects.create(candidate=self.candidate, oral_question_count=1,
+                                                       coding_question_count=0, thinking_time=1, recording_time=1, coding_time=1)
+        Evaluation.objects.create(session=self.session, overall_score=75, summary="ok")
+        self.url = f"/api/candidates/{self.candidate.id}/detail/"
+
+    def add_activity(self, count):
+        for n in range(count):
+            question = Question.objects.create(session=self.session, text=f"q{n}", question_type='ORAL',
+                                               expected_skills="", time_limit=60, order=n)
+            Answer.objects.create(question=question, response_text="a")
+            CheatingLog.objects.create(session=self.session, event_type='tab_switch', details="")
+
+    def queries_for_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return len(queries)
+
+    def test_query_count_is_fixed(self):
+        self.add_activity(1)
+        baseline = self.queries_for_detail()
+        self.add_activity(10)
+        self.assertEqual(self.queries_for_detail(), baseline)
+
+    def test_sparse_fieldsets(self):
+        self.add_activity(2)
+        self.assertEqual(self.client.get(self.url, {"fields": "name,email"}).json(), {"name": "Ada", "email": "ada@x.com"})
+        data = self.client.get(self.url, {"fields": "questions,resume_text", "include": "",
+                                          "resume_offset": 2, "resume_limit": 3}).json()
+        self.assertEqual(set(data), {"questions", "resume_text", "resume_text_length", "resume_truncated"})
+        self.assertNotIn("answers", data["questions"][0])
+        self.assertEqual((data["resume_text"], data["resume_text_length"], data["resume_truncated"]), ("234", 10, True))
+        self.assertEqual(self.client.get(self.url, {"fields": "salary"}).status_code, 400)
+
+
+@override_settings(SSE_STREAM_SECONDS=0.2, SSE_POLL_SECONDS=0.05)
+class JobEventsTests(TransactionTestCase):
+    """
+    The SSE stream resumes from Last-Event-ID and resets once events were
+    pruned, under ASGI (AsyncClient) and WSGI (Client) alike.
+    """
+
+    def setUp(self):
+        self.job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid")
+        candidate = Candidate.objects.create(job=self.job, name="Ada", email="ada@x.com")
+        self.user = HRUser.objects.create_user("hr", password="x")
+        self.token = job_events.stream_token(self.user, self.job.id)
+        self.ids = [
+            CandidateEvent.objects.create(job=self.job, candidate=candidate, kind='status', data={"n": n}).id
+            for n in range(3)
+        ]
+        self.url = f"/api/jobs/{self.job.id}/events/"
+
+    def parse(self, body):
+        return [(int(i), kind) for i, kind in re.findall(r"^id: (\d+)\nevent: (\w+)", body, re.M)]
+
+    def stream(self, last_event_id=None):
+        headers = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}
+
+        async def read():
+            response = await AsyncClient().get(self.url, {"stream_token": self.token}, headers=headers)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            return "".join([chunk.decode() async for chunk in response.streaming_content])
+        return self.parse(asyncio.run(read()))
+
+    def test_resumes_after_last_event_id(self):
+        self.assertEqual(self.stream(self.ids[0]), [(self.ids[1], 'status'), (self.ids[2], 'status')])
+        # A fresh subscription only gets what happens from now on
+        self.assertEqual(self.stream(), [])
+
+    def test_resets_when_missed_events_were_pruned(self):
+        CandidateEvent.objects.filter(id__lt=self.ids[2]).delete()
+        self.assertEqual(self.stream(self.ids[0]), [(self.ids[2], 'reset')])
+
+    def test_streams_under_wsgi(self):
+        response = self.client.get(self.url, {"stream_token": self.token, "last_event_id": self.ids[1]})
+        # A sync iterator: a WSGI server writes each event as it is yielded
+        self.assertFalse(response.is_async)
+        self.assertEqual(self.parse(b"".join(response.streaming_content).decode()), [(self.ids[2], 'status')])
+
+    def test_stream_token(self):
+        self.client.force_login(self.user)
+        token = self.client.post(f"/api/jobs/{self.job.id}/events/token/").json()["token"]
+        self.client.logout()
+        other_job = Job.objects.create(title="Other", description="d", required_skills="Python", experience_level="Mid")
+        api_token = Token.objects.create(user=self.user).key
+        for url, params in ((self.url, {"stream_token": "forged"}), (self.url, {"token": api_token}),
+                            (f"/api/jobs/{other_job.id}/events/", {"stream_token": token})):
+            self.assertEqual(self.client.get(url, params).status_code, 401)
+        with self.settings(SSE_TOKEN_MAX_AGE_SECONDS=-1):
+            self.assertEqual(self.client.get(self.url, {"stream_token": token}).status_code, 401)
+        self.assertEqual(self.client.get(self.url, {"stream_token": token}).status_code, 200)
+
+    def test_prune_command(self):
+        CandidateEvent.objects.filter(id=self.ids[0]).update(created_at=timezone.now() - timedelta(days=2))
+        call_command('prune_job_events', stdout=io.StringIO())
+        self.assertFalse(CandidateEvent.objects.filter(id=self.ids[0]).exists())
+        for _ in range(2):
+            call_command('prune_job_events', '--schedule', stdout=io.StringIO())
+        self.assertEqual(Task.objects.filter(task_name='hr_system.tasks.prune_job_events_task').count(), 1)
+
+class DatabaseConfigTests(SimpleTestCase):
+    """DB_ENGINE selection in core/database.py."""
+
+    def config(self, **env):
+        with mock.patch.dict(os.environ, env):
+            for name in ('DB_ENGINE', 'DB_POOL', 'SQLITE_TUNED', 'SQLITE_PATH'):
+                if name not in env:
+                    os.environ.pop(name, None)
+            return database_config(Path("/srv/app"))
+
+    def test_sqlite(self):
+        tuned = self.config()
+        self.assertEqual((tuned['ENGINE'], tuned['NAME']), ('django.db.backends.sqlite3', "/srv/app/db.sqlite3"))
+        self.assertEqual(tuned['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL', tuned['OPTIONS']['init_command'])
+        self.assertNotIn('OPTIONS', self.config(SQLITE_TUNED='False', SQLITE_PATH="/tmp/x.db"))
+
+    def test_postgres(self):
+        pooled = self.config(DB_ENGINE='PostgreSQL', DB_POOL_MAX_SIZE='4')
+        self.assertEqual(pooled['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((pooled['CONN_MAX_AGE'], pooled['OPTIONS']['pool']['max_size']), (0, 4))
+        persistent = self.config(DB_ENGINE='postgres', DB_POOL='False', DB_CONN_MAX_AGE='30')
+        self.assertEqual((persistent['CONN_MAX_AGE'], persistent['OPTIONS']), (30, {}))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.config(DB_ENGINE='mysql')
+
+
+class ClaimTasksTests(TestCase):
+    """workers.claim_tasks: priority first, then round-robin across job queues."""
+
+    def task(self, name, queue, priority=PRIORITY_BULK, minutes_ago=10):
+        return Task.objects.create(task_name=name, task_params="[[], {}]", task_hash=name, queue=queue,
+                                   priority=priority, run_at=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def test_priority_then_round_robin(self):
+        for n in (1, 2, 3):
+            self.task(f"a{n}", job_queue(1), minutes_ago=10 - n)
+        self.task("b1", job_queue(2), minutes_ago=1)
+        self.task("manual", job_queue(3), priority=PRIORITY_MANUAL, minutes_ago=0)
+        self.task("later", job_queue(2), minutes_ago=-5)
+
+        claimed = claim_tasks("w1", limit=4)
+        # job 2's only task goes ahead of job 1's backlog although it was queued last
+        self.assertEqual([t.task_name for t in claimed], ["manual", "a1", "b1", "a2"])
+        self.assertTrue(all(t.locked_by == "w1" for t in claimed))
+        self.assertEqual([t.task_name for t in claim_tasks("w2", limit=4)], ["a3"])
+
+        self.assertEqual(release_tasks("w1", [claimed[0].id]), 1)
+        self.assertEqual([t.task_name for t in claim_tasks("w2", limit=4, task_names=["manual"])], ["manual"])
+
+
+class CandidateIngestionTests(TestCase):
+    """Roster ingestion (ingestion.py) and the resumable CandidateImport task."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid")
+
+    def roster_import(self, content):
+        candidate_import = CandidateImport(job=self.job)
+        candidate_import.file.save('roster.csv', ContentFile(content), save=True)
+        return candidate_import
+
+    def test_report_shape(self):
+        Candidate.objects.create(job=self.job, name="Old", email="old@x.com")
+        rows = [
+            {"Candidate Name": "Ada", "Candidate Email": "ada@x.com", "Resume Link": ""},
+            {"name": "Old", "email": "old@x.com"},
+            {"name": "No email"},
+            {"name": "Bad", "email": "not-an-email"},
+            {"name": "Ada again", "email": "ada@x.com"},
+        ]
+        results = ingest_candidate_rows(self.job, rows)
+        self.assertEqual(results["success"], ["ada@x.com"])
+        self.assertEqual([e["row"] for e in results["errors"]], rows[1:])
+        self.assertEqual(results["errors"][0]["error"], "Duplicate email: old@x.com")
+        self.assertEqual(results["errors"][1]["error"], "Missing email column")
+        self.assertIn("email", results["errors"][2]["error"])
+        self.assertEqual(JobStats.objects.get(job=self.job).candidates, 2)
+
+    def test_integrity_error_falls_back_to_single_rows(self):
+        ingestor = CandidateIngestor(self.job)
+        # Inserted by a concurrent upload after the ingestor read the job's emails
+        Candidate.objects.create(job=self.job, name="Raced", email="b@x.com")
+        for email in ("a@x.com", "b@x.com", "c@x.com"):
+            ingestor.add_row({"name": "n", "email": email})
+        created = ingestor.flush()
+        self.assertEqual([c.email for c in created], ["a@x.com", "c@x.com"])
+        self.assertEqual(ingestor.results["errors"], [{"row": {"name": "n", "email": "b@x.com"}, "error": "Duplicate email: b@x.com"}])
+        self.assertEqual(Candidate.objects.filter(job=self.job).count(), 3)
+
+    def test_interrupted_import_resumes(self):
+        rows = "\n".join(f"c{i},c{i}@x.com" for i in range(10))
+        candidate_import = self.roster_import(f"name,email\n{rows}\nno email,\n".encode())
+        from . import ingestion
+        real_enqueue = ingestion.enqueue_candidate_processing
+        calls = []
+
+        def enqueue_then_fail(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 3:
+                raise ConnectionError("database went away")
+            return real_enqueue(*args, **kwargs)
+
+        # The worker dies during the third chunk of four rows
+        with mock.patch.object(ingestion, 'enqueue_candidate_processing', enqueue_then_fail):
+            with self.assertRaises(ConnectionError):
+                ingestion.run_candidate_import(candidate_import, chunk_size=4)
+        candidate_import.refresh_from_db()
+        # The third chunk rolled back with its progress
+        self.assertEqual((candidate_import.status, candidate_import.rows_processed, candidate_import.rows_succeeded), ('RUNNING', 8, 8))
+        self.assertEqual(Candidate.objects.filter(job=self.job).count(), 8)
+
+        import_candidates_task.now(candidate_import.id)
+        candidate_import.refresh_from_db()
+        self.assertEqual(candidate_import.status, 'COMPLETED')
+        self.assertEqual(
+            (candidate_import.rows_processed, candidate_import.rows_succeeded, candidate_import.rows_failed), (11, 10, 1)
+        )
+        self.assertEqual([e["error"] for e in candidate_import.errors], ["Missing email column"])
+        self.assertEqual(Candidate.objects.filter(job=self.job).count(), 10)
+
+    def test_transient_error_is_retried(self):
+        candidate_import = self.roster_import(b"name,email\nc,c@x.com\n")
+        with mock.patch('hr_system.ingestion.enqueue_candidate_processing', side_effect=ConnectionError("database went away")):
+            with self.assertRaises(ConnectionError):
+                import_candidates_task.now(candidate_import.id)
+        candidate_import.refresh_from_db()
+        self.assertEqual((candidate_import.status, candidate_import.last_error), ('FAILED', "database went away"))
+        self.assertFalse(Candidate.objects.filter(job=self.job).exists())
+
+    def test_unreadable_file_is_not_retried(self):
+        candidate_import = self.roster_import(b"name,email\n\xff\xfe,x@x.com\n")
+        import_candidates_task.now(candidate_import.id)
+        candidate_import.refresh_from_db()
+        self.assertEqual(candidate_import.status, 'FAILED')
+        self.assertIn("utf-8", candidate_import.last_error)
+
+
+class ResumeCacheTests(TestCase):
+    """The content-addressed resume cache (resume_cache.py)."""
+
+    def setUp(self):
+        # Counts left pending by other tests' lookups stay out of these
+        pending = {'_counts': Counter(), '_entry_hits': Counter(), '_inserts': 0, '_counts_flushed_at': time.monotonic()}
+        for name, value in pending.items():
+            patcher = mock.patch.object(resume_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_hit_and_miss(self):
+        resume_cache.store("a" * 64, 'FILE', "resume text")
+        with self.assertNumQueries(1):
+            self.assertEqual(resume_cache.lookup("a" * 64).raw_text, "resume text")
+        self.assertIsNone(resume_cache.lookup("b" * 64))
+        stats = resume_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+        self.assertEqual(ResumeCacheEntry.objects.get().hit_count, 1)
+
+    def test_evicts_least_recently_used(self):
+        for key in ("a", "b", "c"):
+            resume_cache.store(key * 64, 'FILE', "x" * 100)
+        # Touch "a" so "b" is the least recently used
+        ResumeCacheEntry.objects.filter(content_hash="a" * 64).update(last_accessed_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(resume_cache.evict(max_bytes=250), 1)
+        self.assertEqual(
+            sorted(ResumeCacheEntry.objects.values_list('content_hash', flat=True)), ["a" * 64, "c" * 64]
+        )
+        self.assertEqual(resume_cache.stats()['evictions'], 1)
+
+    def test_evicts_every_nth_insert(self):
+        with mock.patch.object(resume_cache, 'evict') as evict:
+            for i in range(resume_cache.EVICT_EVERY_INSERTS - 1):
+                resume_cache.store(f"{i:064d}", 'FILE', "resume text")
+            evict.assert_not_called()
+            resume_cache.store_metadata(f"{0:064d}", "resume text", {"top_skills": ["Go"]})
+            evict.assert_called_once_with()
+
+    def test_metadata_only_reused_for_the_same_prompt_text(self):
+        resume_cache.store("a" * 64, 'FILE', "full resume")
+        resume_cache.store_metadata("a" * 64, "sections picked for job 1", {"top_skills": ["Go"]})
+        self.assertEqual(resume_cache.get_metadata("a" * 64, "sections picked for job 1"), {"top_skills": ["Go"]})
+        self.assertIsNone(resume_cache.get_metadata("a" * 64, "sections picked for job 2"))
+
+
+class JobContextTests(TestCase):
+    """Per-job prompt prefixes (job_context.py)."""
+
+    def setUp(self):
+        self.builds = []
+        self.addCleanup(job_context._contexts.clear)
+        self.addCleanup(job_context._job_keys.clear)
+
+    def context(self, jd_text, job_id=None):
+        def build_prefix():
+            self.builds.append(jd_text)
+            return f"JD: {jd_text}"
+        return job_context.get_job_context('oral', jd_text, "Python", "Mid", build_prefix, "gemini", job_id=job_id)
+
+    def test_prefix_built_once_per_job_fields(self):
+        first = self.context("Backend role")
+        self.assertIs(self.context("Backend role"), first)
+        self.assertEqual(first.full_prompt("Candidate: Jane"), "JD: Backend role\n\nCandidate: Jane")
+        # An edit made elsewhere changes the fingerprint, so the prefix is rebuilt
+        self.assertEqual(self.context("Backend role, remote").prefix, "JD: Backend role, remote")
+        self.assertEqual(self.builds, ["Backend role", "Backend role, remote"])
+
+    def test_small_prefix_is_not_cached_server_side(self):
+        self.assertIsNone(self.context("Backend role").cached_model())
+        with self.settings(GEMINI_CONTEXT_CACHING=False, GEMINI_CONTEXT_CACHE_MIN_TOKENS=0):
+            self.assertIsNone(self.context("Backend role").cached_model())
+
+    @override_settings(GEMINI_CONTEXT_CACHING=True, GEMINI_CONTEXT_CACHE_MIN_TOKENS=0)
+    def test_only_permanent_errors_stop_caching(self):
+        from google.api_core import exceptions as google_exceptions
+        from google.generativeai import caching
+
+        context = self.context("Backend role")
+        with mock.patch.object(caching.CachedContent, 'create', side_effect=google_exceptions.ServiceUnavailable("busy")):
+            self.assertIsNone(context.cached_model())
+        self.assertFalse(context._caching_failed)
+        # Inline until the retry time, then tried again
+        with mock.patch.object(caching.CachedContent, 'create') as create:
+            self.assertIsNone(context.cached_model())
+        create.assert_not_called()
+        context._retry_caching_at = 0
+        with mock.patch.object(caching.CachedContent, 'create', side_effect=google_exceptions.InvalidArgument("too small")) as create:
+            self.assertIsNone(context.cached_model())
+        create.assert_called_once()
+        self.assertTrue(context._caching_failed)
+
+    def test_saving_the_job_drops_its_contexts(self):
+        job = Job.objects.create(title="Job", description="Backend role", required_skills="Python", experience_level="Mid")
+        context = self.context("Backend role", job_id=job.id)
+        context.cached_content = handle = mock.Mock()
+        job.save()
+        handle.delete.assert_called_once_with()
+        self.assertIsNone(context.cached_content)
+        self.context("Backend role", job_id=job.id)
+        self.assertEqual(self.builds, ["Backend role", "Backend role"])
+
+
+class SkillMatcherTests(SimpleTestCase):
+    """Skill detection against the bundled taxonomy (skill_matcher.py)."""
+
+    def setUp(self):
+        self.matcher = get_skill_matcher()
+
+    def test_aliases_and_boundaries(self):
+        text = "Wrote JavaScript and C++ services on k8s; used golang, R&D budget. Node.js, go to market."
+        self.assertEqual(
+            sorted(self.matcher.top_skills(text)), ["C++", "Go", "JavaScript", "Kubernetes", "Node.js"]
+        )
+
+    def test_case_sensitive_aliases(self):
+        self.assertEqual(self.matcher.top_skills("Services in Go"), ["Go"])
+        self.assertEqual(self.matcher.top_skills("ready to go"), [])
+
+    def test_ranks_preferred_then_by_mentions(self):
+        text = "Kubernetes, Kubernetes, Python and Java"
+        self.assertEqual(self.matcher.top_skills(text), ["Kubernetes", "Python", "Java"])
+        self.assertEqual(self.matcher.top_skills(text, limit=2, prefer=split_skills("java; python3")), ["Python", "Java"])
+        self.assertEqual(self.matcher.top_skills(text, category="DevOps"), ["Kubernetes"])
+
+
+class ResumeCompressionTests(SimpleTestCase):
+    """Relevance-based resume compression (resume_compression.py)."""
+
+    RESUME = "\n".join([
+        "Jane Doe", "jane@example.com",
+        "HOBBIES", "Gardening and long walks. " * 20,
+        "Skills", "Django, PostgreSQL, Docker",
+        "VOLUNTEERING", "Taught JavaScript at a weekend club. " * 20,
+    ])
+
+    def test_text_within_budget_is_unchanged(self):
+        self.assertEqual(compress_resume("Jane Doe\nSkills\nDjango", "Django", budget_tokens=100), "Jane Doe\nSkills\nDjango")
+
+    def test_keeps_header_and_relevant_sections(self):
+        compressed = compress_resume(self.RESUME, "Django, Java", budget_tokens=100)
+        self.assertTrue(compressed.startswith("Jane Doe\njane@example.com"))
+        self.assertIn("Django, PostgreSQL, Docker", compressed)
+        # Filler is dropped and "Java" does not match "JavaScript"
+        self.assertNotIn("Gardening", compressed)
+        self.assertNotIn("JavaScript", compressed)
+        self.assertEqual(compressed.count(GAP_MARKER), 2)
+
+
+def _pdf_bytes(pages):
+    """A PDF whose page n has the text "Page n"."""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'), NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    for n in range(pages):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 700 Td (Page {n}) Tj ET".encode())
+        page[NameObject('/Contents')] = writer._add_object(content)
+        page[NameObject('/Resources')] = DictionaryObject({NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})})
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class PdfExtractionTests(SimpleTestCase):
+    """pdf_extraction.extract_pdf_text in its worker process pool."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.addClassCleanup(pdf_extraction._reset_pool)
+        cls.directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.directory, ignore_errors=True)
+
+    def pdf(self, pages):
+        path = os.path.join(self.directory, f"{pages}.pdf")
+        with open(path, 'wb') as f:
+            f.write(_pdf_bytes(pages))
+        return path
+
+    def test_chunks_come_back_in_page_order(self):
+        with self.settings(PDF_EXTRACTION_PAGES_PER_CHUNK=4):
+            result = pdf_extraction.extract_pdf_text(self.pdf(10), deadline=60, max_pages=50)
+        self.assertEqual(re.findall(r'Page (\d+)', result.text), [str(n) for n in range(10)])
+        self.assertEqual((result.pages_total, result.pages_extracted, result.truncated, result.reason), (10, 10, False, None))
+
+    def test_page_cap(self):
+        result = pdf_extraction.extract_pdf_text(self.pdf(8), deadline=60, max_pages=3)
+        self.assertEqual((result.pages_total, result.pages_extracted, result.truncated, result.reason), (8, 3, True, 'page_limit'))
+
+    def test_deadline_then_recovers(self):
+        result = pdf_extraction.extract_pdf_text(self.pdf(5), deadline=0, max_pages=50)
+        self.assertEqual((result.truncated, result.reason), (True, 'deadline'))
+        # The stuck pool was replaced
+        result = pdf_extraction.extract_pdf_text(self.pdf(5), deadline=60, max_pages=50)
+        self.assertEqual((result.pages_extracted, result.truncated), (5, False))
+
+    def test_deadline_miss_spares_other_callers(self):
+        # Another caller with a document in flight on the shared pool
+        pool = pdf_extraction._acquire_pool()
+        other = pool.executor.submit(pdf_extraction._count_pages, self.pdf(6))
+        result = pdf_extraction.extract_pdf_text(self.pdf(5), deadline=0, max_pages=50)
+        self.assertEqual(result.reason, 'deadline')
+        self.assertEqual(other.result(timeout=60), 6)
+        self.assertTrue(pool.retired)
+        self.assertIsNot(pdf_extraction._acquire_pool(), pool)
+        pdf_extraction._release_pool(pdf_extraction._pool)
+        # Its workers go once the last caller is done with it
+        pdf_extraction._release_pool(pool)
+        with self.assertRaises(RuntimeError):
+            pool.executor.submit(pdf_extraction._count_pages, self.pdf(6))
+
+
+class ResumeHTTPHandler(BaseHTTPRequestHandler):
+    """
+    Serves a resume page with an ETag; /big is larger than the fetch limit
+    and /slow trickles its body out over two seconds.
+    """
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b"<p>Python developer</p>" * (1000 if self.path == '/big' else 1)
+        pieces = [body[i:i + 2] for i in range(0, len(body), 2)] if self.path == '/slow' else [body]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            for piece in pieces:
+                self.wfile.write(piece)
+                self.wfile.flush()
+                if len(pieces) > 1:
+                    time.sleep(0.2)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class ResumeFetcherTests(SimpleTestCase):
+    """resume_fetcher.ResumeFetcher against a local HTTP server."""
+
+    def setUp(self):
+        ResumeHTTPHandler.requests = []
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ResumeHTTPHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base = f"http://127.0.0.1:{server.server_port}"
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.fetcher = ResumeFetcher(cache_dir=cache_dir, max_bytes=1000, revalidate_after=0)
+
+    def test_revalidates_with_etag(self):
+        first = self.fetcher.fetch(f"{self.base}/a")
+        self.assertEqual((first.status_code, first.from_cache, first.etag), (200, False, '"v1"'))
+        second = self.fetcher.fetch(f"{self.base}/a")
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(ResumeHTTPHandler.requests, [('/a', None), ('/a', '"v1"')])
+
+    def test_fresh_entry_skips_the_request(self):
+        self.fetcher.revalidate_after = 3600
+        self.fetcher.fetch(f"{self.base}/a")
+        self.assertTrue(self.fetcher.fetch(f"{self.base}/a").from_cache)
+        self.assertEqual(len(ResumeHTTPHandler.requests), 1)
+
+    def test_size_limit(self):
+        result = self.fetcher.fetch(f"{self.base}/big")
+        self.assertEqual((result.truncated, len(result.content)), (True, 1000))
+
+    def test_deadline_covers_the_whole_download(self):
+        self.fetcher.deadline = 0.5
+        with self.assertRaises(requests.Timeout):
+            self.fetcher.fetch(f"{self.base}/slow")
+
+    def test_evicts_old_then_least_recently_checked_entries(self):
+        for name in ("old", "a", "b"):
+            self.fetcher.fetch(f"{self.base}/{name}")
+        week_ago = time.time() - 7 * 24 * 3600
+        for path in self.fetcher._cache_paths(f"{self.base}/old"):
+            os.utime(path, (week_ago, week_ago))
+        self.assertEqual(self.fetcher.evict(max_age=24 * 3600), 1)
+        self.assertIsNone(self.fetcher._read_cache(f"{self.base}/old")[0])
+
+        entry_size = max(size for _, size, _ in self.fetcher._cache_entries())
+        hour_ago = time.time() - 3600
+        for path in self.fetcher._cache_paths(f"{self.base}/a"):
+            os.utime(path, (hour_ago, hour_ago))
+        self.assertEqual(self.fetcher.evict(max_bytes=entry_size), 1)
+        self.assertIsNone(self.fetcher._read_cache(f"{self.base}/a")[0])
+        self.assertIsNotNone(self.fetcher._read_cache(f"{self.base}/b")[0])
+
+    def test_prefetch(self):
+        urls = [f"{self.base}/p{i}" for i in range(6)]
+        results = self.fetcher.prefetch(urls + urls[:2] + [None])
+        self.assertEqual(sorted(results), sorted(urls))
+        self.assertTrue(all(r.status_code == 200 for r in results.values()))
+        self.assertEqual(len(ResumeHTTPHandler.requests), 6)
+
+
+class LLMCacheTests(TestCase):
+    """The two tiers of the Gemini response cache (llm_cache.py)."""
+
+    def setUp(self):
+        self.cache = llm_cache.LLMResponseCache(ttl_seconds=3600, memory_entries=2, max_entries=1000)
+
+    def test_memory_hit_costs_no_query(self):
+        self.cache.set("k", "model", "reply")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get("k"), "reply")
+
+    def test_database_tier_refills_memory(self):
+        self.cache.set("k", "model", "reply")
+        self.cache.clear_memory()
+        self.assertEqual(self.cache.get("k"), "reply")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get("k"), "reply")
+        # Another process's cache sees the row too
+        self.assertEqual(llm_cache.LLMResponseCache().get("k"), "reply")
+
+    def test_memory_tier_is_lru(self):
+        for key in ("a", "b", "c"):
+            self.cache.set(key, "model", key)
+        self.assertEqual(list(self.cache._memory), ["b", "c"])
+
+    def test_expired_entries_miss(self):
+        self.cache.set("k", "model", "reply")
+        self.cache.clear_memory()
+        LLMCacheEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(self.cache.get("k"))
+
+    def test_counts_are_flushed_in_batches(self):
+        self.cache.set("k", "model", "reply")
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                self.cache.get("k")
+        self.assertIsNone(self.cache.get("missing"))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (5, 1))
+
+    def test_evicts_every_nth_insert(self):
+        self.cache.max_entries = 3
+        with mock.patch.object(llm_cache, 'EVICT_EVERY_INSERTS', 4):
+            for i in range(3):
+                self.cache.set(f"k{i}", "model", "reply")
+            self.assertEqual(LLMCacheEntry.objects.count(), 3)
+            for i in range(3, 5):
+                self.cache.set(f"k{i}", "model", "reply")
+        # The fourth store evicted down to 3, the fifth did not check
+        self.assertEqual(LLMCacheEntry.objects.count(), 4)
+        self.assertFalse(LLMCacheEntry.objects.filter(key="k0").exists())
+
+
+class InterviewBundleTests(TestCase):
+    """generate_interview_bundle gives up on unusable replies only; API errors reach the caller."""
+
+    def setUp(self):
+        self.generator = GeminiQuestionGenerator()
+        self.generator.model = mock.Mock()
+
+    def bundle(self, error):
+        with mock.patch.object(self.generator, '_generate_json', side_effect=error):
+            return self.generator.generate_interview_bundle("jd", "resume", "n", "Mid", "Python", 1, 1)
+
+    def test_unusable_reply_falls_back_to_separate_calls(self):
+        self.assertIsNone(self.bundle(ValueError("Expecting value: line 1 column 1 (char 0)")))
+
+    def test_rate_limit_errors_are_raised(self):
+        with self.assertRaises(RateLimitTimeout):
+            self.bundle(RateLimitTimeout("no capacity within 60s"))
+        with self.assertRaises(RuntimeError):
+            self.bundle(RuntimeError("429 RESOURCE_EXHAUSTED"))
+
+
+class RateLimiterTests(TestCase):
+    """The shared token bucket and its AIMD backoff (rate_limiter.py)."""
+
+    def setUp(self):
+        self.limiter = RateLimiter('test', rpm_limit=60, tpm_limit=6000, max_wait=0)
+
+    def test_bucket_runs_dry(self):
+        self.assertEqual(self.limiter.reserve(1000), 0)
+        # 5000 tokens left: a 6000-token prompt is capped at the whole budget and waits for 1000 more
+        self.assertAlmostEqual(self.limiter.reserve(6000), 10, delta=0.1)
+        for _ in range(59):
+            self.assertEqual(self.limiter.reserve(1), 0)
+        # Requests refill at one a second
+        self.assertAlmostEqual(self.limiter.reserve(1), 1, delta=0.1)
+
+    def test_throttle_halves_once_per_cooldown(self):
+        self.limiter.reserve(1)
+        self.limiter.record_throttle()
+        self.limiter.record_throttle()
+        bucket = RateLimitBucket.objects.get(name='test')
+        self.assertEqual((bucket.rate_scale, bucket.throttle_count, bucket.request_tokens), (0.5, 2, 0))
+        # At half rate a request refills every two seconds
+        self.assertAlmostEqual(self.limiter.reserve(1), 2, delta=0.1)
+
+    def test_success_adds_back_up_to_the_limit(self):
+        self.limiter.reserve(1)
+        self.limiter.record_throttle()
+        for _ in range(30):
+            self.limiter.record_success()
+        self.assertEqual(RateLimitBucket.objects.get(name='test').rate_scale, 1.0)
+
+    def test_call_retries_after_429(self):
+        attempts = []
+
+        def request():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise Exception("429 Resource has been exhausted")
+            return "reply"
+
+        limiter = RateLimiter('test', rpm_limit=600, tpm_limit=10 ** 6, max_wait=30)
+        self.assertEqual(limiter.call(request, "prompt"), "reply")
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(RateLimitBucket.objects.get(name='test').throttle_count, 1)
+
+    def test_gives_up_past_max_wait(self):
+        for _ in range(60):
+            self.limiter.reserve(1)
+        with self.assertRaises(RateLimitTimeout):
+            self.limiter.acquire(1)
+
+
+class ProcessCandidatesTests(TestCase):
+    """pipeline.process_candidates saves each candidate as soon as its run ends."""
+
+    def setUp(self):
+        job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid")
+        self.candidates = [Candidate.objects.create(job=job, name=n, email=f"{n}@x.com") for n in ("a", "b")]
+        CandidateProcessing.objects.bulk_create([CandidateProcessing(candidate=c) for c in self.candidates])
+        self.seen = []
+
+        def stage(processing, writes, is_last_attempt):
+            self.seen.append(dict(CandidateProcessing.objects.values_list('candidate_id', 'status')))
+        patcher = mock.patch.dict(pipeline.STAGE_HANDLERS, {name: stage for name in pipeline.STAGES})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_each_candidate_is_saved_before_the_next_runs(self):
+        first, second = self.candidates
+        pipeline.process_candidates([first.id, second.id])
+        self.assertEqual(self.seen[len(pipeline.STAGES)], {first.id: 'DONE', second.id: 'RUNNING'})
+        self.assertEqual(set(CandidateProcessing.objects.values_list('status', flat=True)), {'DONE'})
+
+    def test_unsaved_candidate_is_rescheduled_alone(self):
+        first, second = self.candidates
+        with mock.patch.object(pipeline.persistence, 'flush', side_effect=[DatabaseError("locked"), None]):
+            pipeline.process_candidates([first.id, second.id])
+        task = Task.objects.get(task_name='hr_system.tasks.run_pipeline_stage_task')
+        self.assertEqual(task.params(), ([first.id, 'PARSE'], {}))
+
+
+class GenerationDeadlineTests(SimpleTestCase):
+    """Only a Gemini call that overruns the deadline is a miss; errors are retried."""
+
+    def test_overrun_is_a_miss(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.assertEqual(pipeline._call_with_deadline(release.wait, 0.05, False, 1), (False, None))
+
+    def test_errors_propagate_until_the_final_attempt(self):
+        def fail():
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+        self.assertEqual(pipeline._call_with_deadline(lambda: 'ok', 5, False, 1), (True, 'ok'))
+        with self.assertRaises(RuntimeError):
+            pipeline._call_with_deadline(fail, 5, False, 1)
+        self.assertEqual(pipeline._call_with_deadline(fail, 5, True, 1), (False, None))
+
+
+class StubGenerator:
+    """Answers the async question calls of GeminiQuestionGenerator without Gemini."""
+
+    def is_available(self):
+        return True
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.allow_fallback = []
+
+    async def generate_oral_questions_async(self, **kwargs):
+        self.allow_fallback.append(kwargs['allow_fallback'])
+        if kwargs['candidate_name'] in self.failing:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return [{"question": "Tell me about Python"}] * kwargs['num_questions']
+
+    async def generate_coding_questions_async(self, **kwargs):
+        self.allow_fallback.append(kwargs['allow_fallback'])
+        return [{"problem": "Reverse a list"}] * kwargs['num_questions']
+
+
+class BatchGenerationTests(TransactionTestCase):
+    """
+    batch_generation keeps the candidates' pipeline checkpoints in step.
+    Questions are saved from a sync_to_async thread, hence the committed data.
+    """
+
+    def setUp(self):
+        self.job = Job.objects.create(title="Job", description="d", required_skills="Python", experience_level="Mid",
+                                      oral_question_count=2, coding_question_count=1)
+        self.generator = StubGenerator(failing={"failing@x.com"})
+        patcher = mock.patch.object(batch_generation, 'get_gemini_generator', return_value=self.generator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def candidate(self, email, stage, status):
+        candidate = Candidate.objects.create(job=self.job, name=email, email=email)
+        Resume.objects.create(candidate=candidate, raw_text="Python developer")
+        CandidateProcessing.objects.create(candidate=candidate, pipeline_stage=stage, status=status)
+        return candidate
+
+    def test_checkpoints(self):
+        waiting = self.candidate("waiting@x.com", 'QUESTIONS', 'RETRYING')
+        early = self.candidate("early@x.com", 'METADATA', 'PENDING')
+        running = self.candidate("running@x.com", 'QUESTIONS', 'RUNNING')
+
+        sessions, unparsed = batch_generation.prepare_job_sessions(self.job)
+        self.assertEqual(sorted(s.candidate_id for s in sessions), [waiting.id, early.id])
+        self.assertFalse(InterviewSession.objects.filter(candidate=running).exists())
+        result = asyncio.run(batch_generation.generate_for_candidates(sessions))
+        self.assertEqual(result["questions"], 6)
+
+        processing = CandidateProcessing.objects.get(candidate=waiting)
+        self.assertEqual((processing.pipeline_stage, processing.status, processing.attempts), ('EMAIL', 'PENDING', 0))
+        email_task = Task.objects.get(task_name='hr_system.tasks.run_pipeline_stage_task')
+        self.assertEqual(email_task.params(), ([waiting.id, 'EMAIL'], {}))
+        # Still needs its metadata; SESSION and QUESTIONS will find their rows
+        self.assertEqual(CandidateProcessing.objects.get(candidate=early).pipeline_stage, 'METADATA')
+        self.assertEqual(Question.objects.filter(session__candidate=early).count(), 3)
+        self.assertIsNotNone(InterviewSession.objects.get(candidate=waiting).question_bundle)
+
+    def test_skips_a_pipeline_that_started_meanwhile(self):
+        candidate = self.candidate("c@x.com", 'QUESTIONS', 'PENDING')
+        sessions, _ = batch_generation.prepare_job_sessions(self.job)
+        CandidateProcessing.objects.filter(candidate=candidate).update(status='RUNNING')
+        asyncio.run(batch_generation.generate_for_candidates(sessions))
+        self.assertFalse(Question.objects.filter(session__candidate=candidate).exists())
+        self.assertEqual(CandidateProcessing.objects.get(candidate=candidate).pipeline_stage, 'QUESTIONS')
+
+    def test_gemini_failure_stays_retryable(self):
+        failing = self.candidate("failing@x.com", 'QUESTIONS', 'RETRYING')
+        sessions, _ = batch_generation.prepare_job_sessions(self.job)
+        result = asyncio.run(batch_generation.generate_for_candidates(sessions))
+        self.assertEqual(list(result["failed"]), [failing.id])
+        self.assertEqual(set(self.generator.allow_fallback), {False})
+        self.assertFalse(Question.objects.filter(session__candidate=failing).exists())
+        self.assertEqual(CandidateProcessing.objects.get(candidate=failing).pipeline_stage, 'QUESTIONS')
+        # The next run finds it again
+        sessions, _ = batch_generation.prepare_job_sessions(self.job)
+        self.assertEqual([s.candidate_id for s in sessions], [failing.id])
@@ -1,12 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import JobViewSet, CandidateDetailView, LoginView
+from .views import (
+    JobViewSet, CandidateDetailView, LoginView, ProcessingFailureViewSet,
+    CandidateInterviewView, CandidateInterviewTransitionView
+)
+from .job_events import job_events
 
 router = DefaultRouter()
 router.register(r'jobs', JobViewSet)
+router.register(r'pipeline/failed', ProcessingFailureViewSet, basename='processing-failure')
 
 urlpatterns = [
+    path('jobs/<int:job_id>/events/', job_events, name='job-events'),
     path('', include(router.urls)),
     path('candidates/<int:candidate_id>/detail/', CandidateDetailView.as_view(), name='candidate-detail'),
     path('auth/login/', LoginView.as_view(), name='login'),
+    path('interview/<str:token>/', CandidateInterviewView.as_view(), name='candidate-interview'),
+    path('interview/<str:token>/start/', CandidateInterviewTransitionView.as_view(transition='start'), name='candidate-interview-start'),
+    path('interview/<str:token>/complete/', CandidateInterviewTransitionView.as_view(transition='complete'), name='candidate-interview-complete'),
 ]
@@ -2,16 +2,56 @@ from rest_framework import viewsets, status, views
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
-from .models import Job, Candidate, InterviewSession, Evaluation, CheatingLog, Question, HRUser
+from django.db import IntegrityError, transaction
+from .models import Job, Candidate, InterviewSession, InterviewLink, Evaluation, Question, HRUser, CandidateImport, CandidateProcessing
 from rest_framework.authtoken.models import Token
-from .serializers import JobSerializer, CandidateSerializer, InterviewSessionSerializer, EvaluationSerializer, CheatingLogSerializer, QuestionSerializer
-from .tasks import process_candidate_task
+from .serializers import JobSerializer, CandidateSerializer, EvaluationSerializer, CheatingLogSerializer, QuestionSerializer, CandidateImportSerializer, CandidateProcessingSerializer
+from .tasks import enqueue_candidate_processing, import_candidates_task
+from .workers import PRIORITY_BULK, PRIORITY_MANUAL, job_queue
+from .ingestion import ingest_candidate_rows
+from .pipeline import retry_failed
+from .job_events import status_row, stream_token
+from . import interview_bundle
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import Length, PercentRank, RowNumber, Substr
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
 import csv
+import datetime
+import hashlib
 import io
+import json
+
+
+class StatusCursorPagination(CursorPagination):
+    """Opt-in pagination for JobViewSet.status (?cursor= or ?page_size=)."""
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+def _parse_since(value):
+    """An ISO 8601 timestamp or HTTP date as an aware datetime, or None if neither."""
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, datetime.timezone.utc)
+    seconds = parse_http_date_safe(value)
+    if seconds is None:
+        return None
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
 
 class JobViewSet(viewsets.ModelViewSet):
-    queryset = Job.objects.all().order_by('-created_at')
+    queryset = Job.objects.select_related('stats').order_by('-created_at')
     serializer_class = JobSerializer
 
     @action(detail=True, methods=['post'])
@@ -21,6 +61,10 @@ class JobViewSet(viewsets.ModelViewSet):
         # Determine if it's a bulk upload or manual add
         file = request.FILES.get('file')
         
+        if file and file.name.endswith('.csv') and request.query_params.get('mode') == 'async':
+            # Large roster: save to disk and stream it in the background
+            return self._start_candidate_import(request, job, file)
+
         if file and file.name.endswith('.csv'):
             # Bulk Upload (CSV)
             try:
@@ -28,38 +72,7 @@ class JobViewSet(viewsets.ModelViewSet):
                 io_string = io.StringIO(decoded_file)
                 reader = csv.DictReader(io_string)
                 
-                results = {"success": [], "errors": []}
-                
-                for row in reader:
-                    # Clean and normalize headers
-                    clean_row = {k.strip().lower(): v for k, v in row.items()}
-                    
-                    name = clean_row.get('candidate name') or clean_row.get('name')
-                    email = clean_row.get('candidate email') or clean_row.get('email')
-                    resume_url = clean_row.get('resume link') or clean_row.get('resume url') or clean_row.get('link') or clean_row.get('resume_url')
-                    
-                    if not email:
-                        results["errors"].append({"row": row, "error": "Missing email column"})
-                        continue
-                    
-                    if Candidate.objects.filter(job=job, email=email).exists():
-                        results["errors"].append({"row": row, "error": f"Duplicate email: {email}"})
-                        continue
-                    
-                    candidate_data = {
-                        'name': name or 'Unknown',
-                        'email': email,
-                        'resume_url': resume_url,
-                        'job': job.id
-                    }
-                    
-                    serializer = CandidateSerializer(data=candidate_data)
-                    if serializer.is_valid():
-                        candidate = serializer.save(job=job)
-                        process_candidate_task(candidate.id)
-                        results["success"].append(email)
-                    else:
-                        results["errors"].append({"row": row, "error": serializer.errors})
+                results = ingest_candidate_rows(job, reader)
                 
                 return Response(results, status=status.HTTP_201_CREATED)
             except Exception as e:
@@ -71,60 +84,350 @@ class JobViewSet(viewsets.ModelViewSet):
         serializer = CandidateSerializer(data=data)
         if serializer.is_valid():
             candidate = serializer.save()
-            process_candidate_task(candidate.id)
+            # Ahead of any bulk import's backlog (see workers.py)
+            enqueue_candidate_processing([candidate.id], job.id, priority=PRIORITY_MANUAL)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _start_candidate_import(self, request, job, file):
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            existing = CandidateImport.objects.filter(job=job, idempotency_key=idempotency_key).first()
+            if existing:
+                return Response(CandidateImportSerializer(existing).data, status=status.HTTP_200_OK)
+
+        candidate_import = CandidateImport(job=job, idempotency_key=idempotency_key)
+        try:
+            with transaction.atomic():
+                candidate_import.file = file
+                candidate_import.save()
+        except IntegrityError:
+            # A concurrent retry with the same key won the race
+            candidate_import.file.delete(save=False)
+            existing = CandidateImport.objects.get(job=job, idempotency_key=idempotency_key)
+            return Response(CandidateImportSerializer(existing).data, status=status.HTTP_200_OK)
+
+        import_candidates_task(candidate_import.id, priority=PRIORITY_BULK, queue=job_queue(job.id))
+        return Response(CandidateImportSerializer(candidate_import).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], url_path='events/token')
+    def events_token(self, request, pk=None):
+        """A short-lived token that opens the job's event stream (EventSource cannot send headers)."""
+        job = get_object_or_404(Job.objects.only('id'), pk=pk)
+        return Response({"token": stream_token(request.user, job.id), "expires_in": settings.SSE_TOKEN_MAX_AGE_SECONDS})
+
+    @action(detail=True, methods=['get'], url_path=r'imports/(?P<import_id>\d+)')
+    def import_status(self, request, pk=None, import_id=None):
+        candidate_import = get_object_or_404(CandidateImport, pk=import_id, job_id=pk)
+        return Response(CandidateImportSerializer(candidate_import).data)
+
     @action(detail=True, methods=['get'])
     def status(self, request, pk=None):
-        job = get_object_or_404(Job, pk=pk)
-        candidates = job.candidates.all()
+        """
+        Candidate status board. Rows come from one joined query.
+        ?since=<timestamp> returns only candidates changed after it (ISO 8601
+        or an HTTP date such as a previous Last-Modified). ?cursor= or
+        ?page_size= switches to cursor pagination. Responses carry an ETag and
+        Last-Modified, so unchanged polls get a 304.
+        """
+        candidates = Candidate.objects.filter(job_id=pk)
+        since = request.query_params.get('since')
+        if since:
+            since_at = _parse_since(since)
+            if since_at is None:
+                return Response({"error": "Invalid 'since' timestamp"}, status=status.HTTP_400_BAD_REQUEST)
+            candidates = candidates.filter(status_changed_at__gt=since_at)
+
+        # Count catches deletions, the latest change catches everything else
+        stats = Candidate.objects.filter(job_id=pk).aggregate(total=Count('id'), changed_at=Max('status_changed_at'))
+        changed_at = stats['changed_at']
+        if not stats['total']:
+            # An empty board keeps the same validators until the first candidate arrives
+            changed_at = get_object_or_404(Job.objects.only('created_at'), pk=pk).created_at
+        etag = quote_etag(hashlib.md5(
+            f"{pk}:{stats['total']}:{changed_at.isoformat()}:{request.GET.urlencode()}".encode()
+        ).hexdigest())
+        last_modified = int(changed_at.timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        candidates = candidates.select_related('session__link').only(
+            'id', 'name', 'email', 'resume_file', 'resume_url', 'status_changed_at',
+            'session__status', 'session__link__token'
+        )
+        paginator = None
+        if 'cursor' in request.query_params or 'page_size' in request.query_params:
+            paginator = StatusCursorPagination()
+            candidates = paginator.paginate_queryset(candidates, request, view=self)
+        else:
+            candidates = candidates.order_by('id')
+
         data = []
         for c in candidates:
             session = getattr(c, 'session', None)
-            data.append({
-                "id": c.id,
-                "name": c.name,
-                "email": c.email,
-                "link": f"{settings.FRONTEND_URL}/interview/{c.session.link.token}" if session and hasattr(session, 'link') else "Generating...",
-                "status": session.status if session else "Processing",
-                "resume_file": c.resume_file.url if c.resume_file else None,
-                "resume_url": c.resume_url
-            })
-        return Response(data)
+            data.append(status_row(c, session, getattr(session, 'link', None) if session else None))
+        response = paginator.get_paginated_response(data) if paginator else Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
 
     @action(detail=True, methods=['get'])
     def ranking(self, request, pk=None):
+        """
+        Evaluations ranked by overall score, with rank and percentile computed
+        by window functions over the (job, overall_score) index. ?top=N keeps
+        the best N, ?percentile=P those at or above the P-th percentile, and
+        ?limit= / ?offset= paginate.
+        """
         job = get_object_or_404(Job, pk=pk)
-        evaluations = Evaluation.objects.filter(session__candidate__job=job).order_by('-overall_score')
-        data = []
-        for i, ev in enumerate(evaluations):
-            data.append({
-                "rank": i + 1,
-                "name": ev.session.candidate.name,
-                "email": ev.session.candidate.email,
-                "score": ev.overall_score,
-                "cheating": ev.cheating_flag
-            })
-        return Response(data)
+        order = [F('overall_score').desc(), F('id').asc()]
+        evaluations = Evaluation.objects.filter(job=job).annotate(
+            position=Window(RowNumber(), order_by=order),
+            percent_rank=Window(PercentRank(), order_by=F('overall_score').desc()),
+        ).order_by(*order).values(
+            'position', 'percent_rank', 'overall_score', 'cheating_flag',
+            'session__candidate_id', 'session__candidate__name', 'session__candidate__email'
+        )
+
+        try:
+            top = int(request.query_params.get('top', 0))
+            percentile = float(request.query_params.get('percentile', 0))
+        except ValueError:
+            return Response({"error": "'top' and 'percentile' must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        if top > 0:
+            evaluations = evaluations.filter(position__lte=top)
+        if percentile > 0:
+            evaluations = evaluations.filter(percent_rank__lte=1 - percentile / 100)
+
+        paginator = None
+        if 'limit' in request.query_params:
+            paginator = LimitOffsetPagination()
+            evaluations = paginator.paginate_queryset(evaluations, request, view=self)
+
+        data = [{
+            "rank": ev['position'],
+            "candidate_id": ev['session__candidate_id'],
+            "name": ev['session__candidate__name'],
+            "email": ev['session__candidate__email'],
+            "score": ev['overall_score'],
+            "percentile": round((1 - ev['percent_rank']) * 100, 1),
+            "cheating": ev['cheating_flag']
+        } for ev in evaluations]
+        return paginator.get_paginated_response(data) if paginator else Response(data)
+
+class ProcessingFailureViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Dead-letter listing: candidates whose processing exhausted a stage's retries.
+    Filter with ?job=<id>; POST retry/ requeues them from the failed stage.
+    """
+    serializer_class = CandidateProcessingSerializer
+
+    def get_queryset(self):
+        queryset = CandidateProcessing.objects.filter(status='FAILED').select_related('candidate').order_by('-failed_at')
+        job_id = self.request.query_params.get('job')
+        if job_id:
+            queryset = queryset.filter(candidate__job_id=job_id)
+        return queryset
+
+    @action(detail=False, methods=['post'])
+    def retry(self, request):
+        queryset = self.get_queryset()
+        candidate_ids = request.data.get('candidate_ids')
+        if candidate_ids:
+            queryset = queryset.filter(candidate_id__in=candidate_ids)
+        return Response({"retried": retry_failed(queryset)})
 
 class CandidateDetailView(views.APIView):
+    """
+    A candidate's resume, questions with answers, evaluation and cheating logs
+    in a fixed number of queries. ?fields= picks the sections to return (name,
+    email, resume_text, questions, evaluation, cheating_logs) and ?include=
+    the heavy question parts (gemini_metadata, answers); both default to
+    everything. Resume text is returned resume_limit characters at a time from
+    resume_offset, and cheating logs logs_limit at a time from logs_offset.
+    """
+    SECTIONS = ('name', 'email', 'resume_text', 'questions', 'evaluation', 'cheating_logs')
+    QUESTION_EXTRAS = ('gemini_metadata', 'answers')
+    resume_limit = 20000
+    max_resume_limit = 200000
+    logs_limit = 100
+    max_logs_limit = 1000
+
+    def _param_list(self, request, name, allowed):
+        if name not in request.query_params:
+            return set(allowed)
+        requested = {v.strip() for v in request.query_params[name].split(',') if v.strip()}
+        unknown = requested - set(allowed)
+        if unknown:
+            raise ValueError(f"Unknown {name}: {', '.join(sorted(unknown))}. Choose from {', '.join(allowed)}")
+        return requested
+
+    def _window(self, request, prefix, default, maximum):
+        offset = int(request.query_params.get(f'{prefix}_offset', 0))
+        limit = int(request.query_params.get(f'{prefix}_limit', default))
+        if offset < 0 or limit < 0:
+            raise ValueError(f"'{prefix}_offset' and '{prefix}_limit' must not be negative")
+        return offset, min(limit, maximum)
+
     def get(self, request, candidate_id):
-        candidate = get_object_or_404(Candidate, id=candidate_id)
+        try:
+            fields = self._param_list(request, 'fields', self.SECTIONS)
+            include = self._param_list(request, 'include', self.QUESTION_EXTRAS)
+            resume_offset, resume_limit = self._window(request, 'resume', self.resume_limit, self.max_resume_limit)
+            logs_offset, logs_limit = self._window(request, 'logs', self.logs_limit, self.max_logs_limit)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One query for the candidate, resume, session and evaluation. The resume
+        # text is cut in the database so a huge raw_text is never loaded whole.
+        queryset = Candidate.objects.select_related(
+            'resume_data', 'session__evaluation'
+        ).defer('resume_data__raw_text', 'resume_data__compressed_text')
+        if 'resume_text' in fields:
+            queryset = queryset.annotate(
+                resume_page=Substr('resume_data__raw_text', resume_offset + 1, resume_limit),
+                resume_length=Length('resume_data__raw_text'),
+            )
+        if 'cheating_logs' in fields:
+            queryset = queryset.annotate(cheating_log_count=Count('session__cheating_logs'))
+        candidate = get_object_or_404(queryset, id=candidate_id)
         session = getattr(candidate, 'session', None)
         resume = getattr(candidate, 'resume_data', None)
         evaluation = getattr(session, 'evaluation', None) if session else None
-        
-        data = {
-            "name": candidate.name,
-            "email": candidate.email,
-            "resume_text": resume.raw_text if resume else "Not parsed yet",
-            "questions": QuestionSerializer(session.questions.all(), many=True).data if session else [],
-            "evaluation": EvaluationSerializer(evaluation).data if evaluation else None,
-            "cheating_logs": CheatingLogSerializer(session.cheating_logs.all(), many=True).data if session else []
-        }
+
+        data = {}
+        if 'name' in fields:
+            data["name"] = candidate.name
+        if 'email' in fields:
+            data["email"] = candidate.email
+        if 'resume_text' in fields:
+            data["resume_text"] = (candidate.resume_page or "") if resume else "Not parsed yet"
+            data["resume_text_length"] = candidate.resume_length or 0
+            data["resume_truncated"] = bool(resume) and resume_offset + resume_limit < candidate.resume_length
+        if 'questions' in fields:
+            questions = []
+            if session:
+                questions = Question.objects.filter(session=session).order_by('order', 'id')
+                if 'gemini_metadata' not in include:
+                    questions = questions.defer('gemini_metadata')
+                if 'answers' in include:
+                    questions = questions.prefetch_related('answers')
+            omit = set(self.QUESTION_EXTRAS) - include
+            data["questions"] = QuestionSerializer(questions, many=True, context={'omit': omit}).data
+        if 'evaluation' in fields:
+            data["evaluation"] = EvaluationSerializer(evaluation).data if evaluation else None
+        if 'cheating_logs' in fields:
+            logs = []
+            if session and candidate.cheating_log_count:
+                logs = session.cheating_logs.order_by('timestamp', 'id')[logs_offset:logs_offset + logs_limit]
+            data["cheating_logs"] = CheatingLogSerializer(logs, many=True).data
+            data["cheating_logs_count"] = candidate.cheating_log_count
         return Response(data)
 
+def _interview_link(token):
+    """The link with its session in one query on the unique token; no Job, Resume or Question rows."""
+    return get_object_or_404(
+        InterviewLink.objects.select_related('session').only(
+            'session', 'token', 'expires_at', 'is_used', 'opened_at',
+            'session__candidate_id', 'session__status', 'session__started_at', 'session__completed_at',
+            'session__questions_provisional', 'session__question_bundle'
+        ),
+        token=token
+    )
+
+def _interview_state(link):
+    session = link.session
+    return {
+        "status": session.status,
+        "expires_at": link.expires_at,
+        "started_at": session.started_at,
+        "completed_at": session.completed_at,
+    }
+
+def _interview_gone(link):
+    return Response(
+        {"error": "This interview link has expired or was already used", "status": link.session.status},
+        status=status.HTTP_410_GONE
+    )
+
+class CandidateInterviewView(views.APIView):
+    """
+    The candidate's side of the interview at /interview/<token>. The token
+    is the credential, so there is no authentication. Returns the session
+    state and its pre-serialized question bundle (see interview_bundle.py)
+    spliced in as is, from a single indexed query. The first GET records
+    the link as opened, which keeps a provisional question set from being
+    swapped for personalized questions the candidate has not seen.
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, token):
+        link = _interview_link(token)
+        if link.is_expired:
+            return _interview_gone(link)
+        if link.opened_at is None and link.mark_opened() and link.session.questions_provisional:
+            # An upgrade may have replaced the questions since they were read
+            link.session.refresh_from_db(fields=['questions_provisional', 'question_bundle'])
+        body = '{"session":%s,"interview":%s}' % (
+            json.dumps(_interview_state(link), cls=DjangoJSONEncoder), interview_bundle.get(link.session)
+        )
+        return HttpResponse(body, content_type='application/json')
+
+class CandidateInterviewTransitionView(views.APIView):
+    """
+    POST interview/<token>/start/ and complete/: NOT_ATTEMPTED -> IN_PROGRESS
+    and IN_PROGRESS -> COMPLETED. The session row is locked for the check
+    and the save, so concurrent requests for the same link make one
+    transition, and repeating a transition already made returns the current
+    state. Completing uses up the link. The session's post_save handlers
+    move the JobStats counters and post the status board event.
+    """
+    authentication_classes = []
+    permission_classes = []
+    # transition: (allowed from, new status, timestamp field)
+    TRANSITIONS = {
+        'start': ('NOT_ATTEMPTED', 'IN_PROGRESS', 'started_at'),
+        'complete': ('IN_PROGRESS', 'COMPLETED', 'completed_at'),
+    }
+    transition = None
+
+    def post(self, request, token):
+        source, target, timestamp_field = self.TRANSITIONS[self.transition]
+        link = _interview_link(token)
+        if link.session.status == target:
+            return Response(_interview_state(link))
+        if link.is_expired:
+            return _interview_gone(link)
+        if link.session.status != source:
+            return Response(
+                {"error": f"Cannot {self.transition} an interview that is {link.session.status}", "status": link.session.status},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        with transaction.atomic():
+            session = (
+                InterviewSession.objects.select_for_update(of=('self',))
+                .select_related('candidate').get(pk=link.session_id)
+            )
+            if session.status == source:
+                setattr(session, timestamp_field, timezone.now())
+                session.status = target
+                session.save(update_fields=['status', timestamp_field])
+                if target == 'COMPLETED':
+                    InterviewLink.objects.filter(pk=link.pk).update(is_used=True)
+        link.session = session
+        if session.status != target:
+            return Response(
+                {"error": f"Cannot {self.transition} an interview that is {session.status}", "status": session.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        if link.opened_at is None:
+            link.mark_opened()
+        return Response(_interview_state(link))
+
 class LoginView(views.APIView):
     permission_classes = []
     def post(self, request):
@@ -0,0 +1,150 @@
+"""
+Task priorities, per-job queues and the worker pool behind `manage.py run_workers`.
+
+background_task's `process_tasks` is one process running one task at a time
+in priority order, so a 10k-row import queued ahead of a manual add kept it
+waiting, and the I/O-bound Gemini and resume downloads ran serially.
+
+Tasks are now scheduled with a priority (PRIORITY_MANUAL for candidates added
+by hand, PRIORITY_BULK for imports; a candidate keeps its priority through
+all of its pipeline stages via CandidateProcessing.priority) and on their
+job's queue, "job-<id>". run_workers starts N worker processes that each
+claim a batch of ready tasks at a time. A claim takes the highest priority
+first and, within a priority, interleaves the job queues: every job's first
+task, then every job's second, so one large import cannot monopolize the
+workers. Claiming is atomic: `SELECT ... FOR UPDATE SKIP LOCKED` on
+PostgreSQL, a guarded UPDATE of the claimed rows on SQLite. Claimed tasks run
+through background_task's own runner, so retries and CompletedTask records
+behave exactly as under process_tasks (which keeps working too).
+"""
+
+import os
+import signal
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+PRIORITY_MANUAL = 10
+PRIORITY_DEFAULT = 0
+PRIORITY_BULK = -10
+
+
+def job_queue(job_id):
+    return f"job-{job_id}" if job_id else None
+
+
+def task_options(processing):
+    """Scheduling kwargs for a candidate's next task: its priority, on its job's queue."""
+    return {'priority': processing.priority, 'queue': job_queue(processing.candidate.job_id)}
+
+
+def _ready_tasks(task_names=None):
+    from background_task.models import Task
+
+    now = timezone.now()
+    ready = Task.objects.unlocked(now).filter(run_at__lte=now, failed_at=None)
+    if task_names is not None:
+        ready = ready.filter(task_name__in=task_names)
+    return ready
+
+
+def claim_tasks(worker_name, limit, task_names=None):
+    """
+    Locks up to `limit` ready tasks for this worker and returns them, highest
+    priority first and round-robin across job queues within a priority.
+    """
+    from background_task.models import Task
+
+    ready = _ready_tasks(task_names)
+    # Postgres cannot lock rows in a query with window functions, so pick the
+    # ids first and lock whichever of them nobody else holds
+    picked = list(ready.annotate(
+        turn=Window(RowNumber(), partition_by=[F('queue')], order_by=[F('priority').desc(), F('run_at').asc()])
+    ).order_by('-priority', 'turn', 'run_at').values_list('id', flat=True)[:limit])
+    if not picked:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        claimable = ready.filter(id__in=picked)
+        if connection.features.has_select_for_update_skip_locked:
+            claimable = Task.objects.filter(id__in=list(
+                claimable.select_for_update(skip_locked=True).values_list('id', flat=True)
+            ))
+        # On SQLite the unlocked filter in this UPDATE is the claim: a task
+        # another worker locked since it was picked no longer matches
+        claimable.update(locked_by=worker_name, locked_at=now)
+    claimed = Task.objects.filter(id__in=picked, locked_by=worker_name, locked_at=now)
+    order = {task_id: i for i, task_id in enumerate(picked)}
+    return sorted(claimed, key=lambda task: order[task.id])
+
+
+def release_tasks(worker_name, task_ids=None):
+    """Unlocks tasks claimed by a worker that stopped or died before running them."""
+    from background_task.models import Task
+
+    claimed = Task.objects.filter(locked_by=worker_name)
+    if task_ids is not None:
+        claimed = claimed.filter(id__in=task_ids)
+    return claimed.update(locked_by=None, locked_at=None)
+
+
+def queue_stats():
+    """
+    Queue depth and lag: ready tasks per priority and per queue, with the age
+    of the oldest ready task, plus how many are running and scheduled later.
+    """
+    from background_task.models import Task
+
+    now = timezone.now()
+    ready = _ready_tasks()
+    by_priority = list(ready.values('priority').annotate(depth=Count('id'), oldest=Min('run_at')).order_by('-priority'))
+    by_queue = list(ready.values('queue').annotate(depth=Count('id'), oldest=Min('run_at')).order_by('-depth'))
+    for row in by_priority + by_queue:
+        row['lag_seconds'] = round((now - row.pop('oldest')).total_seconds(), 1)
+    return {
+        'ready': sum(row['depth'] for row in by_priority),
+        'running': Task.objects.locked(now).count(),
+        'scheduled': Task.objects.filter(run_at__gt=now, locked_by=None).count(),
+        'by_priority': by_priority,
+        'by_queue': by_queue,
+    }
+
+
+def work(stop, batch_size, poll_seconds):
+    """
+    A worker process: claims batches and runs them until `stop` (a
+    multiprocessing.Event) is set. Runs in a spawned child of run_workers.
+    """
+    import django
+    django.setup()
+    # Ctrl+C reaches the whole process group; the supervisor sets `stop` so
+    # the current task finishes instead of being interrupted
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from django.db import close_old_connections
+    from background_task.tasks import tasks, autodiscover
+
+    autodiscover()
+    worker_name = str(os.getpid())
+    task_names = list(tasks._tasks)
+    print(f"--- [WORKERS] Worker {worker_name} started ---")
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            batch = claim_tasks(worker_name, batch_size, task_names)
+        except Exception as e:
+            print(f"--- [WORKERS] Worker {worker_name} could not claim tasks: {e} ---")
+            batch = []
+        if not batch:
+            stop.wait(poll_seconds)
+            continue
+        for i, task in enumerate(batch):
+            if stop.is_set():
+                release_tasks(worker_name, [t.id for t in batch[i:]])
+                break
+            # background_task's runner deletes the task on success and
+            # reschedules it (or records the failure) on error
+            tasks.run_task(task)
+            close_old_connections()
+    print(f"--- [WORKERS] Worker {worker_name} stopped ---")
@@ -9,10 +9,76 @@ const InterviewStatus = () => {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
+        // Live updates over Server-Sent Events, falling back to polling every 30s while the stream is down
+        let source = null;
+        let poll = null;
+        let reconnect = null;
+        let lastEventId = null;
+        let stopped = false;
+
+        const startPolling = () => {
+            if (!poll) poll = setInterval(fetchStatus, 30000);
+        };
+        const stopPolling = () => {
+            clearInterval(poll);
+            poll = null;
+        };
+        const retryLater = (delay) => {
+            startPolling();
+            reconnect = setTimeout(connect, delay);
+        };
+        const tracked = (handler) => (e) => {
+            lastEventId = e.lastEventId || lastEventId;
+            handler(e);
+        };
+        const patchRow = (e) => {
+            const change = JSON.parse(e.data);
+            setCandidates((rows) => rows.map((c) => (c.id === change.id ? { ...c, ...change } : c)));
+        };
+        const addRow = (e) => {
+            const row = JSON.parse(e.data);
+            setCandidates((rows) => (rows.some((c) => c.id === row.id) ? rows : [...rows, row]));
+        };
+
+        const connect = async () => {
+            let token;
+            try {
+                // A short-lived token for this job's stream, so the API token never goes in a URL
+                token = (await api.post(`/jobs/${id}/events/token/`)).data.token;
+            } catch (err) {
+                console.error(err);
+                retryLater(30000);
+                return;
+            }
+            if (stopped) return;
+            const params = new URLSearchParams({ stream_token: token });
+            if (lastEventId) params.set('last_event_id', lastEventId);
+            source = new EventSource(`${api.defaults.baseURL}/jobs/${id}/events/?${params}`);
+            source.addEventListener('open', stopPolling);
+            source.addEventListener('candidate', tracked(addRow));
+            source.addEventListener('processing', tracked(patchRow));
+            source.addEventListener('status', tracked(patchRow));
+            source.addEventListener('reset', tracked(fetchStatus)); // Missed events were pruned
+            source.onerror = () => {
+                startPolling();
+                // The browser retries on its own unless the server refused the stream
+                // (an expired token, say); then start over with a fresh token
+                if (source.readyState === EventSource.CLOSED) {
+                    source.close();
+                    retryLater(5000);
+                }
+            };
+        };
+
         fetchStatus();
-        const interval = setInterval(fetchStatus, 30000); // Poll every 30s
-        return () => clearInterval(interval);
-    }, []);
+        connect();
+        return () => {
+            stopped = true;
+            clearTimeout(reconnect);
+            stopPolling();
+            if (source) source.close();
+        };
+    }, [id]);
 
     const fetchStatus = async () => {
         try {
@@ -90,6 +156,9 @@ const InterviewStatus = () => {
                                                 }`}>
                                                 {c.status.replace('_', ' ')}
                                             </span>
+                                            {c.status === 'Processing' && c.stage && (
+                                                <div className="text-xs text-gray-400 mt-1">{c.stage} · {c.state}</div>
+                                            )}
                                         </td>
                                         <td className="px-6 py-4 whitespace-nowrap text-right text-sm font-medium">
                                             <Link to={`/candidate/${c.id}`} className="text-indigo-600 hover:text-indigo-900 hover:bg-indigo-50 px-3 py-1.5 rounded-md transition-colors inline-flex items-center">